@@ -0,0 +1,59 @@
+"""add prompt experiments
+
+Revision ID: 3f1a7c2d9b64
+Revises: 8ecce8f969b4
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a7c2d9b64'
+down_revision: Union[str, None] = '8ecce8f969b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Prompt variants taking part in an A/B experiment
+    op.add_column('system_prompts', sa.Column('experiment', sa.String(), nullable=True))
+    op.add_column('system_prompts', sa.Column('traffic_weight', sa.Integer(), nullable=False, server_default='100'))
+    op.create_index(op.f('ix_system_prompts_experiment'), 'system_prompts', ['experiment'], unique=False)
+
+    # The existing meal plan prompt becomes the control variant
+    op.execute("UPDATE system_prompts SET experiment = 'meal_plan' WHERE name = 'meal_plan'")
+
+    # One row per generation attempt for per-variant metrics
+    op.create_table('meal_plan_generations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('system_prompt_id', sa.Integer(), nullable=True),
+    sa.Column('experiment', sa.String(), nullable=True),
+    sa.Column('variant', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('repair_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['system_prompt_id'], ['system_prompts.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_meal_plan_generations_id'), 'meal_plan_generations', ['id'], unique=False)
+    op.create_index(op.f('ix_meal_plan_generations_user_id'), 'meal_plan_generations', ['user_id'], unique=False)
+    op.create_index(op.f('ix_meal_plan_generations_created_at'), 'meal_plan_generations', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_meal_plan_generations_created_at'), table_name='meal_plan_generations')
+    op.drop_index(op.f('ix_meal_plan_generations_user_id'), table_name='meal_plan_generations')
+    op.drop_index(op.f('ix_meal_plan_generations_id'), table_name='meal_plan_generations')
+    op.drop_table('meal_plan_generations')
+    op.drop_index(op.f('ix_system_prompts_experiment'), table_name='system_prompts')
+    op.drop_column('system_prompts', 'traffic_weight')
+    op.drop_column('system_prompts', 'experiment')
@@ -0,0 +1,114 @@
+"""add meal store
+
+Revision ID: a6c1e9d3f5b8
+Revises: f4b9d2c8a6e3
+Create Date: 2026-10-19 22:00:00.000000
+
+Creates the content-addressed meals table, the per-plan meal slots and, on
+PostgreSQL, the meal_plan_documents view that rebuilds plan_data for SQL
+consumers. Existing plans keep their full documents until
+scripts/intern_meal_plans.py moves their meals into the store.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c1e9d3f5b8'
+down_revision: Union[str, None] = 'f4b9d2c8a6e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# plan_data as the application sees it; archived plans (plan_data NULL) are not expanded
+DOCUMENTS_VIEW = """
+CREATE VIEW meal_plan_documents AS
+SELECT p.id AS meal_plan_id,
+       CASE WHEN p.meals_interned
+            THEN p.plan_data || jsonb_build_object('weekly_plan', COALESCE(w.weekly_plan, '{}'::jsonb))
+            ELSE p.plan_data
+       END AS plan_data
+FROM meal_plans p
+LEFT JOIN LATERAL (
+    SELECT jsonb_object_agg(week, days ORDER BY first_slot) AS weekly_plan
+    FROM (
+        SELECT week, MIN(first_slot) AS first_slot, jsonb_object_agg(day, meals ORDER BY first_slot) AS days
+        FROM (
+            SELECT week, day, MIN(slot) AS first_slot, jsonb_object_agg(meal_type, items ORDER BY slot) AS meals
+            FROM (
+                SELECT s.week, s.day, s.meal_type, s.slot,
+                       COALESCE(jsonb_agg(m.data ORDER BY s.position) FILTER (WHERE m.id IS NOT NULL), '[]'::jsonb) AS items
+                FROM meal_plan_meals s
+                LEFT JOIN meals m ON m.id = s.meal_id
+                WHERE s.meal_plan_id = p.id
+                GROUP BY s.week, s.day, s.meal_type, s.slot
+            ) slots
+            GROUP BY week, day
+        ) days
+        GROUP BY week
+    ) weeks
+) w ON p.meals_interned
+"""
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    document_type = postgresql.JSONB() if is_postgresql else sa.JSON()
+
+    op.create_table('meals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('data', document_type, nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('portions', sa.String(), nullable=True),
+    sa.Column('calories', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    op.create_index(op.f('ix_meals_name'), 'meals', ['name'], unique=False)
+    op.create_table('meal_plan_meals',
+    sa.Column('meal_plan_id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.SmallInteger(), nullable=False),
+    sa.Column('position', sa.SmallInteger(), nullable=False),
+    sa.Column('week', sa.String(), nullable=False),
+    sa.Column('day', sa.String(), nullable=False),
+    sa.Column('meal_type', sa.String(), nullable=False),
+    sa.Column('meal_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['meal_plan_id'], ['meal_plans.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['meal_id'], ['meals.id']),
+    sa.PrimaryKeyConstraint('meal_plan_id', 'slot', 'position')
+    )
+    op.create_index('ix_meal_plan_meals_meal_id', 'meal_plan_meals', ['meal_id'], unique=False)
+    op.add_column('meal_plans', sa.Column('meals_interned', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+
+    if is_postgresql:
+        op.execute(DOCUMENTS_VIEW)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Put the meals back into the documents before dropping the store
+        archived = bind.scalar(sa.text('SELECT COUNT(*) FROM meal_plans WHERE meals_interned AND plan_data IS NULL'))
+        if archived:
+            raise RuntimeError(
+                f'{archived} archived plans use the meal store; run scripts/compact_meal_plans.py --restore first'
+            )
+        op.execute("""
+            UPDATE meal_plans p SET plan_data = d.plan_data, meals_interned = false
+            FROM meal_plan_documents d
+            WHERE d.meal_plan_id = p.id AND p.meals_interned
+        """)
+        op.execute('DROP VIEW meal_plan_documents')
+    elif bind.scalar(sa.text('SELECT COUNT(*) FROM meal_plans WHERE meals_interned')):
+        raise RuntimeError('Plans use the meal store; downgrading is only supported on PostgreSQL')
+
+    op.drop_column('meal_plans', 'meals_interned')
+    op.drop_index('ix_meal_plan_meals_meal_id', table_name='meal_plan_meals')
+    op.drop_table('meal_plan_meals')
+    op.drop_index(op.f('ix_meals_name'), table_name='meals')
+    op.drop_table('meals')
@@ -0,0 +1,44 @@
+"""add rate limit buckets
+
+Revision ID: a7c2e9f4d1b8
+Revises: f1a9d5c3b7e4
+Create Date: 2026-10-22 09:00:00.000000
+
+State of the shared rate limiter backend (RATE_LIMIT_BACKEND=postgres). On
+PostgreSQL the table is UNLOGGED: it is rewritten on nearly every limited
+request, and losing it in a crash only resets the limits.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9f4d1b8'
+down_revision: Union[str, None] = 'f1a9d5c3b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE UNLOGGED TABLE rate_limit_buckets ("
+            "key VARCHAR NOT NULL PRIMARY KEY, "
+            "full_at DOUBLE PRECISION NOT NULL)"
+        )
+    else:
+        op.create_table(
+            'rate_limit_buckets',
+            sa.Column('key', sa.String(), nullable=False),
+            sa.Column('full_at', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('key')
+        )
+    op.create_index(op.f('ix_rate_limit_buckets_full_at'), 'rate_limit_buckets', ['full_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rate_limit_buckets_full_at'), table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
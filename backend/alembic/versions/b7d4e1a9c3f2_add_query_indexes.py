@@ -0,0 +1,78 @@
+"""add query indexes
+
+Revision ID: b7d4e1a9c3f2
+Revises: 3f1a7c2d9b64
+Create Date: 2026-10-19 12:00:00.000000
+
+Indexes are built with CREATE INDEX CONCURRENTLY so the migration can run
+against a live database. A concurrent build that fails leaves an INVALID
+index behind; drop it and rerun the migration.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e1a9c3f2'
+down_revision: Union[str, None] = '3f1a7c2d9b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    # Keep only the latest answer per question before enforcing uniqueness
+    op.execute("""
+        DELETE FROM user_responses
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM user_responses GROUP BY user_id, question_id
+        )
+    """)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_user_responses_user_question', 'user_responses', ['user_id', 'question_id'],
+            unique=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_user_responses_created_at', 'user_responses', ['created_at'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_meal_plans_user_id_created_at', 'meal_plans', ['user_id', 'created_at'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_meal_plans_created_at', 'meal_plans', ['created_at'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_users_pending_approval', 'users', ['created_at'],
+            postgresql_where=sa.text('is_approved = false AND is_active = true'),
+            sqlite_where=sa.text('is_approved = 0 AND is_active = 1'),
+            postgresql_concurrently=True
+        )
+
+    if is_postgresql:
+        # Promote the unique index to a constraint so ON CONFLICT can name it
+        op.execute(
+            "ALTER TABLE user_responses ADD CONSTRAINT uq_user_responses_user_question "
+            "UNIQUE USING INDEX uq_user_responses_user_question"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('uq_user_responses_user_question', 'user_responses', type_='unique')
+    else:
+        op.drop_index('uq_user_responses_user_question', table_name='user_responses')
+
+    op.drop_index('ix_users_pending_approval', table_name='users')
+    op.drop_index('ix_meal_plans_created_at', table_name='meal_plans')
+    op.drop_index('ix_meal_plans_user_id_created_at', table_name='meal_plans')
+    op.drop_index('ix_user_responses_created_at', table_name='user_responses')
@@ -0,0 +1,31 @@
+"""add question seed values
+
+Revision ID: b9e4c7a2d5f1
+Revises: e8b3c6d1f4a2
+Create Date: 2026-10-20 20:00:00.000000
+
+questions.seed_values records what the seed last wrote to each seeded column,
+so the seed (app/seeds/run_seeds.py) rolls out changes only to columns an admin
+has not edited. Existing questions take their current values as that record on
+the next seed run.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4c7a2d5f1'
+down_revision: Union[str, None] = 'e8b3c6d1f4a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('questions', sa.Column('seed_values', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('questions', 'seed_values')
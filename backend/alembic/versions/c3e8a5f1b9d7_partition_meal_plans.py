@@ -0,0 +1,187 @@
+"""partition meal plans by created_at
+
+Revision ID: c3e8a5f1b9d7
+Revises: a6c1e9d3f5b8
+Create Date: 2026-10-20 09:00:00.000000
+
+Marks every plan but each user's newest one inactive, and links meal slots to
+plans by (id, created_at). On PostgreSQL meal_plans then becomes a table
+partitioned by range of created_at without copying data: the existing table is
+attached as meal_plans_legacy, covering everything before the first day of next
+month, and monthly partitions follow. The (id, created_at) primary key index is
+built concurrently and the legacy range CHECK validated before the swap, so
+the swap itself only holds its lock for catalog changes. The application keeps
+creating partitions ahead (services/plan_partitions.py).
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a5f1b9d7'
+down_revision: Union[str, None] = 'a6c1e9d3f5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_MONTHS = 3
+
+# Indexes of meal_plans, renamed on the legacy partition so the partitioned table can use the names
+INDEXES = {
+    'ix_meal_plans_id': 'CREATE INDEX ix_meal_plans_id ON meal_plans (id)',
+    'ix_meal_plans_user_id_created_at': 'CREATE INDEX ix_meal_plans_user_id_created_at ON meal_plans (user_id, created_at)',
+    'ix_meal_plans_created_at': 'CREATE INDEX ix_meal_plans_created_at ON meal_plans (created_at)',
+    'ix_meal_plans_plan_data': 'CREATE INDEX ix_meal_plans_plan_data ON meal_plans USING gin (plan_data jsonb_path_ops)',
+}
+FOREIGN_KEYS = [
+    'ALTER TABLE meal_plans ADD CONSTRAINT meal_plans_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)',
+    'ALTER TABLE meal_plans ADD CONSTRAINT fk_meal_plans_archive_dictionary_id '
+    'FOREIGN KEY (archive_dictionary_id) REFERENCES plan_archive_dictionaries (id)',
+]
+
+RETIRE_SUPERSEDED = """
+UPDATE meal_plans SET is_active = false
+WHERE (is_active IS NULL OR is_active = true)
+  AND EXISTS (SELECT 1 FROM meal_plans newer
+              WHERE newer.user_id = meal_plans.user_id
+                AND (newer.created_at > meal_plans.created_at
+                     OR (newer.created_at = meal_plans.created_at AND newer.id > meal_plans.id)))
+"""
+RECOUNT_ACTIVE = """
+UPDATE stat_counters SET value = (SELECT COUNT(*) FROM meal_plans WHERE is_active)
+WHERE name = 'meal_plans_active'
+"""
+
+# Same definition as in a6c1e9d3f5b8; a view follows its table through a rename, so it is recreated
+DOCUMENTS_VIEW = """
+CREATE VIEW meal_plan_documents AS
+SELECT p.id AS meal_plan_id,
+       CASE WHEN p.meals_interned
+            THEN p.plan_data || jsonb_build_object('weekly_plan', COALESCE(w.weekly_plan, '{}'::jsonb))
+            ELSE p.plan_data
+       END AS plan_data
+FROM meal_plans p
+LEFT JOIN LATERAL (
+    SELECT jsonb_object_agg(week, days ORDER BY first_slot) AS weekly_plan
+    FROM (
+        SELECT week, MIN(first_slot) AS first_slot, jsonb_object_agg(day, meals ORDER BY first_slot) AS days
+        FROM (
+            SELECT week, day, MIN(slot) AS first_slot, jsonb_object_agg(meal_type, items ORDER BY slot) AS meals
+            FROM (
+                SELECT s.week, s.day, s.meal_type, s.slot,
+                       COALESCE(jsonb_agg(m.data ORDER BY s.position) FILTER (WHERE m.id IS NOT NULL), '[]'::jsonb) AS items
+                FROM meal_plan_meals s
+                LEFT JOIN meals m ON m.id = s.meal_id
+                WHERE s.meal_plan_id = p.id
+                GROUP BY s.week, s.day, s.meal_type, s.slot
+            ) slots
+            GROUP BY week, day
+        ) days
+        GROUP BY week
+    ) weeks
+) w ON p.meals_interned
+"""
+
+
+def _add_months(moment, months):
+    month = moment.month - 1 + months
+    return moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    op.execute(RETIRE_SUPERSEDED)
+    op.execute(RECOUNT_ACTIVE)
+    op.execute('UPDATE meal_plans SET created_at = COALESCE(updated_at, start_date) WHERE created_at IS NULL')
+    op.add_column('meal_plan_meals', sa.Column('meal_plan_created_at', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE meal_plan_meals SET meal_plan_created_at =
+            (SELECT created_at FROM meal_plans WHERE meal_plans.id = meal_plan_meals.meal_plan_id)
+    """)
+    if not is_postgresql:
+        return
+
+    op.alter_column('meal_plans', 'created_at', nullable=False)
+    op.alter_column('meal_plan_meals', 'meal_plan_created_at', nullable=False)
+    boundary = _add_months(datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0), 1)
+
+    # Slow steps, outside the swap: the new primary key index and the legacy range check
+    with op.get_context().autocommit_block():
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS meal_plans_id_created_at_key ON meal_plans (id, created_at)')
+    op.execute(f"ALTER TABLE meal_plans ADD CONSTRAINT meal_plans_legacy_range CHECK (created_at < '{boundary}') NOT VALID")
+    op.execute('ALTER TABLE meal_plans VALIDATE CONSTRAINT meal_plans_legacy_range')
+
+    # The swap
+    op.execute('DROP VIEW IF EXISTS meal_plan_documents')
+    op.drop_constraint('meal_plan_meals_meal_plan_id_fkey', 'meal_plan_meals', type_='foreignkey')
+    op.execute('ALTER TABLE meal_plans DROP CONSTRAINT meal_plans_pkey')
+    op.execute('ALTER TABLE meal_plans ADD CONSTRAINT meal_plans_pkey PRIMARY KEY USING INDEX meal_plans_id_created_at_key')
+    op.execute('ALTER TABLE meal_plans RENAME TO meal_plans_legacy')
+    op.execute('ALTER TABLE meal_plans_legacy RENAME CONSTRAINT meal_plans_pkey TO meal_plans_legacy_pkey')
+    for index in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {index} RENAME TO {index.replace("ix_meal_plans", "meal_plans_legacy")}')
+
+    op.execute("""
+        CREATE TABLE meal_plans (LIKE meal_plans_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)
+        PARTITION BY RANGE (created_at)
+    """)
+    op.execute('ALTER TABLE meal_plans DROP CONSTRAINT meal_plans_legacy_range')
+    op.execute('ALTER TABLE meal_plans ADD CONSTRAINT meal_plans_pkey PRIMARY KEY (id, created_at)')
+    for create_index in INDEXES.values():
+        op.execute(create_index)
+    for foreign_key in FOREIGN_KEYS:
+        op.execute(foreign_key)
+    op.execute('ALTER SEQUENCE meal_plans_id_seq OWNED BY meal_plans.id')
+
+    # Matching indexes and constraints of the legacy table are adopted, and the check spares the range scan
+    op.execute(f"ALTER TABLE meal_plans ATTACH PARTITION meal_plans_legacy FOR VALUES FROM (MINVALUE) TO ('{boundary}')")
+    op.execute('ALTER TABLE meal_plans_legacy DROP CONSTRAINT meal_plans_legacy_range')
+    start = boundary
+    for _ in range(PREMAKE_MONTHS):
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE meal_plans_p{start.year:04d}_{start.month:02d} PARTITION OF meal_plans "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        start = end
+
+    op.execute("""
+        ALTER TABLE meal_plan_meals ADD CONSTRAINT fk_meal_plan_meals_meal_plan
+        FOREIGN KEY (meal_plan_id, meal_plan_created_at) REFERENCES meal_plans (id, created_at)
+        ON DELETE CASCADE ON UPDATE CASCADE NOT VALID
+    """)
+    op.execute('ALTER TABLE meal_plan_meals VALIDATE CONSTRAINT fk_meal_plan_meals_meal_plan')
+    op.execute(DOCUMENTS_VIEW)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_column('meal_plan_meals', 'meal_plan_created_at')
+        return
+
+    # Copy the partitions back into a plain table; plans already exported by retention stay exported
+    op.execute('DROP VIEW IF EXISTS meal_plan_documents')
+    op.drop_constraint('fk_meal_plan_meals_meal_plan', 'meal_plan_meals', type_='foreignkey')
+    op.execute('ALTER TABLE meal_plans RENAME TO meal_plans_partitioned')
+    op.execute("""
+        CREATE TABLE meal_plans (LIKE meal_plans_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)
+    """)
+    op.execute('INSERT INTO meal_plans SELECT * FROM meal_plans_partitioned')
+    op.execute('ALTER SEQUENCE meal_plans_id_seq OWNED BY meal_plans.id')
+    op.execute('DROP TABLE meal_plans_partitioned')
+
+    op.execute('ALTER TABLE meal_plans ADD CONSTRAINT meal_plans_pkey PRIMARY KEY (id)')
+    for create_index in INDEXES.values():
+        op.execute(create_index)
+    for foreign_key in FOREIGN_KEYS:
+        op.execute(foreign_key)
+    op.create_foreign_key(
+        'meal_plan_meals_meal_plan_id_fkey', 'meal_plan_meals', 'meal_plans',
+        ['meal_plan_id'], ['id'], ondelete='CASCADE'
+    )
+    op.drop_column('meal_plan_meals', 'meal_plan_created_at')
+    op.execute(DOCUMENTS_VIEW)
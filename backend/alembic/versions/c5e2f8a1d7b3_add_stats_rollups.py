@@ -0,0 +1,64 @@
+"""add stats rollups
+
+Revision ID: c5e2f8a1d7b3
+Revises: b7d4e1a9c3f2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2f8a1d7b3'
+down_revision: Union[str, None] = 'b7d4e1a9c3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COUNTER_QUERIES = {
+    'users_total': "SELECT COUNT(*) FROM users",
+    'users_active': "SELECT COUNT(*) FROM users WHERE is_active = true",
+    'users_admin': "SELECT COUNT(*) FROM users WHERE is_admin = true",
+    'questions_total': "SELECT COUNT(*) FROM questions",
+    'questions_active': "SELECT COUNT(*) FROM questions WHERE is_active = true",
+    'meal_plans_total': "SELECT COUNT(*) FROM meal_plans",
+    'meal_plans_active': "SELECT COUNT(*) FROM meal_plans WHERE is_active = true",
+    'users_with_plans': "SELECT COUNT(DISTINCT user_id) FROM meal_plans",
+}
+
+
+def upgrade() -> None:
+    op.create_table('stat_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('question_response_daily',
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('response_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('question_id', 'day')
+    )
+    op.create_index(op.f('ix_question_response_daily_day'), 'question_response_daily', ['day'], unique=False)
+
+    # Backfill from the current data; afterwards the API keeps them up to date
+    for name, query in COUNTER_QUERIES.items():
+        op.execute(f"INSERT INTO stat_counters (name, value, updated_at) VALUES ('{name}', ({query}), now())")
+    op.execute("""
+        INSERT INTO question_response_daily (question_id, day, response_count)
+        SELECT question_id, CAST(created_at AS DATE), COUNT(*)
+        FROM user_responses
+        WHERE created_at IS NOT NULL
+        GROUP BY question_id, CAST(created_at AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_question_response_daily_day'), table_name='question_response_daily')
+    op.drop_table('question_response_daily')
+    op.drop_table('stat_counters')
@@ -0,0 +1,42 @@
+"""add user profiles
+
+Revision ID: d4f7b2e9a1c6
+Revises: c3e8a5f1b9d7
+Create Date: 2026-10-20 14:00:00.000000
+
+Creates user_profiles, the materialized questionnaire document per user. Rows
+are built on the user's next save or generation, or for everyone at once with
+scripts/benchmark_user_profiles.py --build.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b2e9a1c6'
+down_revision: Union[str, None] = 'c3e8a5f1b9d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    document_type = postgresql.JSONB() if op.get_bind().dialect.name == 'postgresql' else sa.JSON()
+
+    op.create_table('user_profiles',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('document', document_type, nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('path_index_version', sa.String(length=16), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_profiles')
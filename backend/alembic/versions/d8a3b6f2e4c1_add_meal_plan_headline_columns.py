@@ -0,0 +1,91 @@
+"""add meal plan headline columns
+
+Revision ID: d8a3b6f2e4c1
+Revises: c5e2f8a1d7b3
+Create Date: 2026-10-19 16:00:00.000000
+
+The columns are backfilled from plan_data in batches. The headline logic is
+copied here rather than imported so the migration keeps working if the
+application code changes later.
+
+"""
+from numbers import Number
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3b6f2e4c1'
+down_revision: Union[str, None] = 'c5e2f8a1d7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HEADLINE_COLUMNS = ['daily_calories', 'macro_protein', 'macro_carbs', 'macro_fats', 'day_count', 'meal_count']
+BACKFILL_BATCH_SIZE = 500
+
+
+def _whole_number(value):
+    if isinstance(value, bool) or not isinstance(value, Number):
+        return None
+    return int(round(value))
+
+
+def _mapping(value):
+    return value if isinstance(value, dict) else {}
+
+
+def _headline(plan_data):
+    plan_data = _mapping(plan_data)
+    macros = _mapping(plan_data.get('macros'))
+    day_count = 0
+    meal_count = 0
+    for week in _mapping(plan_data.get('weekly_plan')).values():
+        for day in _mapping(week).values():
+            day_count += 1
+            for meals in _mapping(day).values():
+                meal_count += len(meals) if isinstance(meals, list) else 1
+    return {
+        'daily_calories': _whole_number(plan_data.get('daily_calories')),
+        'macro_protein': _whole_number(macros.get('protein')),
+        'macro_carbs': _whole_number(macros.get('carbs')),
+        'macro_fats': _whole_number(macros.get('fats')),
+        'day_count': day_count,
+        'meal_count': meal_count,
+    }
+
+
+def upgrade() -> None:
+    for column in HEADLINE_COLUMNS:
+        op.add_column('meal_plans', sa.Column(column, sa.Integer(), nullable=True))
+
+    if op.get_context().as_sql:
+        # Offline (--sql) runs cannot read plan_data; new columns stay NULL until the next plan write
+        return
+
+    bind = op.get_bind()
+    meal_plans = sa.table('meal_plans', sa.column('id', sa.Integer()), sa.column('plan_data', sa.JSON()),
+                          *(sa.column(column, sa.Integer()) for column in HEADLINE_COLUMNS))
+    update = (
+        meal_plans.update()
+        .where(meal_plans.c.id == sa.bindparam('plan_id'))
+        .values({column: sa.bindparam(column) for column in HEADLINE_COLUMNS})
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(meal_plans.c.id, meal_plans.c.plan_data)
+            .where(meal_plans.c.id > last_id)
+            .order_by(meal_plans.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(update, [{'plan_id': plan_id, **_headline(plan_data)} for plan_id, plan_data in rows])
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    for column in reversed(HEADLINE_COLUMNS):
+        op.drop_column('meal_plans', column)
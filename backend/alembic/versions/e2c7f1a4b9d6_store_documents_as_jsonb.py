@@ -0,0 +1,54 @@
+"""store documents as jsonb
+
+Revision ID: e2c7f1a4b9d6
+Revises: d8a3b6f2e4c1
+Create Date: 2026-10-19 18:00:00.000000
+
+Changing the column type rewrites meal_plans and user_responses under an
+ACCESS EXCLUSIVE lock, so run it in a maintenance window on large databases.
+The GIN indexes are then built concurrently. Other databases keep plain JSON
+columns and need no changes.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c7f1a4b9d6'
+down_revision: Union[str, None] = 'd8a3b6f2e4c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DOCUMENT_COLUMNS = [
+    ('meal_plans', 'plan_data', 'ix_meal_plans_plan_data'),
+    ('user_responses', 'response_value', 'ix_user_responses_response_value'),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, column, _ in DOCUMENT_COLUMNS:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, column, index in DOCUMENT_COLUMNS:
+            op.create_index(
+                index, table, [column], unique=False,
+                postgresql_using='gin', postgresql_ops={column: 'jsonb_path_ops'},
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, column, index in DOCUMENT_COLUMNS:
+        op.drop_index(index, table_name=table)
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE json USING {column}::json')
@@ -0,0 +1,44 @@
+"""unique question field_key
+
+Revision ID: e8b3c6d1f4a2
+Revises: d4f7b2e9a1c6
+Create Date: 2026-10-20 18:00:00.000000
+
+field_key identifies a question to the seed upsert (app/seeds/run_seeds.py) and
+to the profile documents, so it becomes unique. The index is built
+concurrently; if a build fails it leaves an INVALID index behind, drop it and
+rerun the migration.
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c6d1f4a2'
+down_revision: Union[str, None] = 'd4f7b2e9a1c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates carry answers, so they are not merged automatically
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            'SELECT field_key FROM questions GROUP BY field_key HAVING COUNT(*) > 1'
+        )).scalars().all()
+        if duplicates:
+            raise RuntimeError(f'Questions share a field_key, rename or merge them first: {sorted(duplicates)}')
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_questions_field_key', 'questions', ['field_key'],
+            unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_questions_field_key', table_name='questions')
@@ -0,0 +1,29 @@
+"""add user token version
+
+Revision ID: f1a9d5c3b7e4
+Revises: b9e4c7a2d5f1
+Create Date: 2026-10-21 09:00:00.000000
+
+Access tokens carry the user's token_version; incrementing it revokes them.
+Tokens issued before this migration have no version and match 0.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9d5c3b7e4'
+down_revision: Union[str, None] = 'b9e4c7a2d5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default=sa.text('0')))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,60 @@
+"""add plan archive
+
+Revision ID: f4b9d2c8a6e3
+Revises: e2c7f1a4b9d6
+Create Date: 2026-10-19 20:00:00.000000
+
+Adds the columns for compressed archival storage of historical plans. Plans are
+only moved into it by the compaction job (scripts/compact_meal_plans.py or
+PLAN_ARCHIVE_INTERVAL_MINUTES), not by this migration.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9d2c8a6e3'
+down_revision: Union[str, None] = 'e2c7f1a4b9d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('plan_archive_dictionaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dictionary', sa.LargeBinary(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('meal_plans', sa.Column('archived_data', sa.LargeBinary(), nullable=True))
+    op.add_column('meal_plans', sa.Column('archive_dictionary_id', sa.Integer(), nullable=True))
+    op.add_column('meal_plans', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_foreign_key(
+        'fk_meal_plans_archive_dictionary_id', 'meal_plans', 'plan_archive_dictionaries',
+        ['archive_dictionary_id'], ['id']
+    )
+    op.alter_column('meal_plans', 'plan_data', existing_type=sa.JSON(), nullable=True)
+    op.create_check_constraint(
+        'ck_meal_plans_has_document', 'meal_plans', 'plan_data IS NOT NULL OR archived_data IS NOT NULL'
+    )
+
+
+def downgrade() -> None:
+    # Archived documents can only be decompressed by the application
+    archived = op.get_bind().scalar(sa.text('SELECT COUNT(*) FROM meal_plans WHERE archived_data IS NOT NULL'))
+    if archived:
+        raise RuntimeError(
+            f'{archived} meal plans are archived; run scripts/compact_meal_plans.py --restore before downgrading'
+        )
+
+    op.drop_constraint('ck_meal_plans_has_document', 'meal_plans', type_='check')
+    op.alter_column('meal_plans', 'plan_data', existing_type=sa.JSON(), nullable=False)
+    op.drop_constraint('fk_meal_plans_archive_dictionary_id', 'meal_plans', type_='foreignkey')
+    op.drop_column('meal_plans', 'archived_at')
+    op.drop_column('meal_plans', 'archive_dictionary_id')
+    op.drop_column('meal_plans', 'archived_data')
+    op.drop_table('plan_archive_dictionaries')
@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Minimal in-process metrics registry.
+# Metrics are per worker process; they are exported in Prometheus text format
+# on /metrics and as JSON on /api/admin/metrics.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry: Dict[str, "Metric"] = {}
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _format_labels(labelnames: Tuple[str, ...], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self):
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, description, labelnames=()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in list(self._values.items())]
+
+    def snapshot(self):
+        return {",".join(key) or "value": value for key, value in list(self._values.items())}
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, description, labelnames=()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[_label_key(self.labelnames, labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, callback: Callable[[], float], **labels):
+        """Compute the value when the metric is read"""
+        self._callbacks[_label_key(self.labelnames, labels)] = callback
+
+    def _collect(self) -> Dict[Tuple[str, ...], float]:
+        values = dict(self._values)
+        for key, callback in list(self._callbacks.items()):
+            try:
+                values[key] = callback()
+            except Exception:
+                continue
+        return values
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._collect().items()]
+
+    def snapshot(self):
+        return {",".join(key) or "value": value for key, value in self._collect().items()}
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    def render(self):
+        lines = []
+        for key, counts in list(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {self._sums[key]}")
+        return lines
+
+    def snapshot(self):
+        result = {}
+        for key, counts in list(self._counts.items()):
+            total = sum(counts)
+            result[",".join(key) or "value"] = {
+                "count": total,
+                "sum": self._sums[key],
+                "mean": self._sums[key] / total if total else None,
+                "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), counts)}
+            }
+        return result
+
+class RateMeter:
+    """Events per second over a sliding window of one-second buckets"""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window = window_seconds
+        self._buckets = [0] * window_seconds
+        self._seconds = [0] * window_seconds
+
+    def mark(self, count: int = 1):
+        now = int(time.monotonic())
+        index = now % self.window
+        with _lock:
+            if self._seconds[index] != now:
+                self._seconds[index] = now
+                self._buckets[index] = 0
+            self._buckets[index] += count
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        total = sum(count for second, count in zip(self._seconds, self._buckets) if now - second < self.window)
+        return total / self.window
+
+def _get_or_create(cls, name, description, labelnames, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description, labelnames, **kwargs)
+            _registry[name] = metric
+        return metric
+
+def counter(name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return _get_or_create(Counter, name, description, labelnames)
+
+def gauge(name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return _get_or_create(Gauge, name, description, labelnames)
+
+def histogram(name: str, description: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(_registry.values()):
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def snapshot(prefix: Optional[str] = None) -> Dict:
+    """All metrics (optionally only those starting with prefix) as a JSON-friendly dict"""
+    return {
+        name: metric.snapshot()
+        for name, metric in list(_registry.items())
+        if prefix is None or name.startswith(prefix)
+    }
@@ -0,0 +1,105 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from fastapi import HTTPException, Query, status
+from sqlalchemy import text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from .config import get_settings
+
+settings = get_settings()
+
+# Keyset (cursor) pagination.
+#
+# Listings are ordered by a unique sort key such as (created_at, id). A page is
+# fetched with WHERE (sort key) > (last key of the previous page), which an
+# index on the sort key answers in constant time however deep the page is.
+# The cursor is the previous page's last key, base64-encoded so clients treat
+# it as opaque.
+
+class PageParams:
+    """Query parameters shared by paginated endpoints"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        limit: Optional[int] = Query(None, ge=1, description="Page size (capped at PAGE_SIZE_MAX)"),
+        include_total: bool = Query(False, description="Include a planner estimate of the total row count")
+    ):
+        self.cursor = cursor
+        self.limit = min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+        self.include_total = include_total
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(listing: str, values: Sequence[Any]) -> str:
+    payload = json.dumps({"l": listing, "v": [_encode_value(value) for value in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(listing: str, cursor: str, key_length: int) -> List[Any]:
+    """Decode a cursor issued for this listing, or fail with 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(value) for value in payload["v"]]
+        if payload["l"] != listing or len(values) != key_length:
+            raise ValueError("cursor does not belong to this listing")
+        return values
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+async def estimate_count(db: AsyncSession, query: Select) -> Optional[int]:
+    """Row count estimate from the planner (EXPLAIN), without running COUNT(*)"""
+    if db.bind.dialect.name != "postgresql":
+        return None
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    sort_key: Sequence,
+    page: PageParams,
+    listing: str,
+    descending: bool = False,
+    transform: Optional[Callable[[Any], Any]] = None
+) -> Dict:
+    """
+    Fetch one page of query ordered by sort_key (columns that together are unique,
+    ending with the primary key). Returns the Page envelope as a dict.
+    """
+    paged = query
+    if page.cursor:
+        after = tuple_(*sort_key)
+        values = tuple_(*decode_cursor(listing, page.cursor, len(sort_key)))
+        paged = paged.where(after < values if descending else after > values)
+    paged = paged.order_by(*(column.desc() if descending else column.asc() for column in sort_key))
+
+    # One extra row tells whether there is a next page
+    rows = (await db.scalars(paged.limit(page.limit + 1))).all()
+    has_more = len(rows) > page.limit
+    rows = rows[:page.limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(listing, [getattr(rows[-1], column.key) for column in sort_key])
+
+    return {
+        "items": [transform(row) for row in rows] if transform else rows,
+        "next_cursor": next_cursor,
+        "limit": page.limit,
+        "total_estimate": await estimate_count(db, query) if page.include_total else None
+    }
@@ -0,0 +1,103 @@
+import time
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from . import metrics
+
+# Connection pool instrumentation. Checkout wait time is measured by the pool
+# subclass below; everything else comes from pool events attached to the engine.
+
+CHECKOUT_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+checkouts_total = metrics.counter("db_pool_checkouts_total", "Connections checked out of the pool", ("pool",))
+checkout_timeouts_total = metrics.counter("db_pool_checkout_timeouts_total", "Checkouts that hit pool_timeout", ("pool",))
+connects_total = metrics.counter("db_pool_connects_total", "New DBAPI connections opened", ("pool",))
+invalidations_total = metrics.counter("db_pool_invalidations_total", "Connections invalidated (hard or soft)", ("pool", "kind"))
+checkout_wait_seconds = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("pool",), buckets=CHECKOUT_WAIT_BUCKETS
+)
+connections_in_use = metrics.gauge("db_pool_connections_in_use", "Connections currently checked out", ("pool",))
+connections_idle = metrics.gauge("db_pool_connections_idle", "Idle connections held in the pool", ("pool",))
+pool_overflow = metrics.gauge("db_pool_overflow", "Connections open beyond pool_size (negative while below)", ("pool",))
+pool_size = metrics.gauge("db_pool_size", "Configured pool_size", ("pool",))
+
+_checkout_rates: Dict[str, metrics.RateMeter] = {}
+
+class CheckoutTimingMixin:
+    """Records how long each checkout waited for a connection"""
+
+    metrics_name = "primary"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            checkout_timeouts_total.inc(pool=self.metrics_name)
+            raise
+        finally:
+            checkout_wait_seconds.observe(time.perf_counter() - started, pool=self.metrics_name)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+class InstrumentedQueuePool(CheckoutTimingMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """Attach pool event listeners and gauges for the engine's pool"""
+    pool = engine.pool
+    if isinstance(pool, CheckoutTimingMixin):
+        pool.metrics_name = name
+    rate = _checkout_rates.setdefault(name, metrics.RateMeter())
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connects_total.inc(pool=name)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts_total.inc(pool=name)
+        rate.mark()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        invalidations_total.inc(pool=name, kind="hard")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        invalidations_total.inc(pool=name, kind="soft")
+
+    # Read live values from the current pool (engine.pool changes if the engine is disposed)
+    if isinstance(pool, QueuePool):
+        connections_in_use.set_function(lambda: engine.pool.checkedout(), pool=name)
+        connections_idle.set_function(lambda: engine.pool.checkedin(), pool=name)
+        pool_overflow.set_function(lambda: engine.pool.overflow(), pool=name)
+        pool_size.set_function(lambda: engine.pool.size(), pool=name)
+
+def pool_stats(name: str = "primary") -> Dict:
+    """Current pool state and rates for the admin metrics endpoint"""
+    rate = _checkout_rates.get(name)
+    wait = checkout_wait_seconds.snapshot().get(name, {})
+    return {
+        "checkouts_per_second": rate.rate() if rate else None,
+        "checkouts_total": checkouts_total.value(pool=name),
+        "checkout_timeouts_total": checkout_timeouts_total.value(pool=name),
+        "checkout_wait_seconds": wait,
+        "connects_total": connects_total.value(pool=name),
+        "invalidations": {
+            "hard": invalidations_total.value(pool=name, kind="hard"),
+            "soft": invalidations_total.value(pool=name, kind="soft")
+        },
+        "in_use": connections_in_use.snapshot().get(name),
+        "idle": connections_idle.snapshot().get(name),
+        "overflow": pool_overflow.snapshot().get(name),
+        "size": pool_size.snapshot().get(name)
+    }
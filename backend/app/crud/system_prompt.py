@@ -115,6 +115,7 @@ Make sure each meal is practical, achievable, and aligned with their daily routi
             prompt_text=meal_plan_prompt,
             description="System prompt for generating personalized meal plans based on user responses",
             is_active=True,
+            experiment="meal_plan",
             created_by_id=created_by_id
         )
         db.add(prompt)
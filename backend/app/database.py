@@ -1,17 +1,83 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .core.config import get_settings
+from .core.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool, instrument_engine
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL)
+def pool_options(url: str, poolclass) -> dict:
+    """Pool configuration from settings (SQLite uses SQLAlchemy's defaults)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def async_database_url(url: str) -> str:
+    """Derive the asyncpg URL from DATABASE_URL (postgres://, postgresql:// or postgresql+psycopg2://)"""
+    if url.startswith("sqlite"):
+        return make_url(url).set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    parsed = make_url(url).set(drivername="postgresql+asyncpg")
+
+    # asyncpg takes "ssl" instead of libpq's "sslmode"
+    query = dict(parsed.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.render_as_string(hide_password=False)
+
+def create_db_engine(url: str, name: str = "sync"):
+    """Synchronous engine, used by Alembic, seeding and scripts"""
+    db_engine = create_engine(url, **pool_options(url, InstrumentedQueuePool))
+    instrument_engine(db_engine, name)
+    return db_engine
+
+def create_async_db_engine(url: str, name: str = "primary"):
+    """Async (asyncpg) engine used by the API"""
+    db_engine = create_async_engine(url, **pool_options(url, InstrumentedAsyncAdaptedQueuePool))
+    instrument_engine(db_engine.sync_engine, name)
+    return db_engine
+
+engine = create_db_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_db_engine(settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+class ReplicaSession(Session):
+    """Session bound to the read replica"""
+
+@event.listens_for(ReplicaSession, "before_flush")
+def refuse_replica_writes(session, flush_context, instances):
+    # A stand-in replica (a second URL for the primary) would accept writes, so catch routing mistakes here
+    raise RuntimeError("Read replica sessions cannot write; use get_db for this endpoint")
+
+# Optional read replica, used by GET endpoints through services/read_replica.py
+replica_engine = (
+    create_async_db_engine(async_database_url(settings.READ_REPLICA_URL), "replica")
+    if settings.READ_REPLICA_URL else None
+)
+ReplicaSessionLocal = (
+    async_sessionmaker(
+        replica_engine, class_=AsyncSession, sync_session_class=ReplicaSession,
+        autoflush=False, expire_on_commit=False
+    )
+    if replica_engine is not None else None
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
@@ -1,23 +1,30 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .core.config import get_settings
 from .routers import users, questions, meal_plans, admin
 from .middleware.error_handler import error_handler_middleware
-from .seeds.run_seeds import run_all_seeds
-from .database import SessionLocal
+from .middleware.rate_limit import RateLimitMiddleware
+from .middleware.compression import CompressionMiddleware
+from .middleware.http_cache import ConditionalGetMiddleware
+from .seeds.run_seeds import run_seeds_in_background
+from .database import async_engine, replica_engine, AsyncSessionLocal
+from .core.metrics import render_prometheus
+from .services import stats  # registers the stats counter listeners
+from .services import plan_archive  # registers the archived plan decompression listeners
+from .services import meal_store  # registers the meal interning listeners
+from .services import read_replica
+from .services import auth_cache  # registers the auth cache invalidation listeners
+from .services import plan_retention  # registers the plan retirement listener
+from .services.password_hashing import password_pool
+from .services.loop_monitor import LoopMonitorMiddleware, loop_monitor
 
 settings = get_settings()
 
-# Run seeds based on environment
 print(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
-if settings.DEBUG:
-    try:
-        print("Development mode: Running database seeds...")
-        run_all_seeds()
-    except Exception as e:
-        print(f"Warning: Database seeding failed: {str(e)}")
-        print("Application will continue with existing database state")
 
 app = FastAPI(
     title="Meal Plan Generator",
@@ -25,6 +32,18 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Innermost, so its frame is on the stack of whatever blocks the loop during a request
+if settings.LOOP_MONITOR_ENABLED:
+    app.add_middleware(LoopMonitorMiddleware)
+
+# ETags are computed on the uncompressed body, so conditional GET sits inside compression
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+
+# Rate limits sit inside CORS, so browsers can read 429 responses
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +56,10 @@ app.add_middleware(
 # Add global error handler middleware
 app.middleware("http")(error_handler_middleware)
 
+# Keep a user's reads on the primary until the read replica has their writes
+if settings.READ_REPLICA_URL:
+    app.middleware("http")(read_replica.track_writes_middleware)
+
 # Include routers with proper prefixes
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(questions.router, prefix="/api/questions", tags=["questions"])
@@ -52,12 +75,23 @@ async def health_check():
         "service": "meal-plan-generator"
     }
 
+if settings.METRICS_ENABLED and not settings.METRICS_TOKEN:
+    print("Warning: METRICS_ENABLED is set without METRICS_TOKEN; /metrics is not served")
+elif settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["health"], include_in_schema=False)
+    async def metrics(authorization: Optional[str] = Header(None)):
+        """Prometheus metrics for this worker process"""
+        if not hmac.compare_digest(authorization or "", f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+        return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Global HTTP exception handler"""
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None),  # e.g. Retry-After, WWW-Authenticate
     )
 
 @app.exception_handler(Exception)
@@ -71,7 +105,39 @@ async def general_exception_handler(request, exc):
         },
     )
 
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
     """Run startup tasks"""
-    pass 
\ No newline at end of file
+    # Seeding runs once in the background, so the app serves requests (and health checks) right away
+    if settings.DEBUG or settings.SEED_ON_STARTUP:
+        background_tasks.append(asyncio.create_task(run_seeds_in_background()))
+    if settings.LOOP_MONITOR_ENABLED:
+        background_tasks.append(asyncio.create_task(loop_monitor.run()))
+    # Until the revocation map is loaded, tokens are checked against the database
+    background_tasks.append(asyncio.create_task(auth_cache.refresh_revocations_periodically()))
+    if async_engine.dialect.name == "postgresql":
+        background_tasks.append(asyncio.create_task(auth_cache.listen_for_invalidations()))
+    if settings.PLAN_ARCHIVE_INTERVAL_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(
+            plan_archive.run_compaction_periodically(AsyncSessionLocal, settings.PLAN_ARCHIVE_INTERVAL_MINUTES)
+        ))
+    if settings.READ_REPLICA_URL:
+        background_tasks.append(asyncio.create_task(
+            read_replica.run_status_checks(settings.REPLICA_STATUS_INTERVAL_SECONDS)
+        ))
+    if settings.PLAN_MAINTENANCE_INTERVAL_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(
+            plan_retention.run_maintenance_periodically(AsyncSessionLocal, settings.PLAN_MAINTENANCE_INTERVAL_MINUTES)
+        ))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and close pooled database connections"""
+    for task in background_tasks:
+        task.cancel()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    password_pool.shutdown() 
\ No newline at end of file
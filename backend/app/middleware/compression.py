@@ -0,0 +1,132 @@
+import gzip
+from typing import Dict, List, Optional, Tuple
+from ..core import metrics
+from ..core.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, clients get gzip
+    brotli = None
+
+settings = get_settings()
+
+# Response compression with Accept-Encoding negotiation.
+#
+# Meal plan documents and the question catalogue are large, repetitive JSON.
+# Responses of at least COMPRESSION_MINIMUM_SIZE bytes with a text-like
+# content type are compressed with brotli when the client accepts it and the
+# brotli package is installed, otherwise gzip. Smaller bodies are sent as
+# they are: the headers would eat the saving. Streaming responses (more than
+# one body message) and responses that already have a Content-Encoding pass
+# through untouched. A strong ETag set further in (see http_cache.py) gets
+# the encoding appended, since the compressed bytes are a different
+# representation.
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"image/svg+xml")
+
+bytes_total = metrics.counter("http_compression_bytes_total", "Response body bytes before and after compression", ("encoding", "stage"))
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """{"gzip": 1.0, "br": 0.5} from "gzip, br;q=0.5"; codings with q=0 are left out"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if coding and quality > 0:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = parse_accept_encoding(header)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    wildcard = accepted.get("*", 0)
+    ranked = [(accepted.get(coding, wildcard), coding) for coding in candidates]
+    # Highest quality wins; on a tie, the order above (brotli compresses JSON better)
+    quality, coding = max(ranked, key=lambda item: item[0]) if ranked else (0, None)
+    return coding if quality > 0 else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            headers: List[Tuple[bytes, bytes]] = list(start.get("headers", []))
+            if message.get("more_body") or not self._compressible(headers, body):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            bytes_total.inc(len(body), encoding=encoding, stage="before")
+            bytes_total.inc(len(compressed), encoding=encoding, stage="after")
+            rewritten = []
+            vary = b"Accept-Encoding"
+            for name, value in headers:
+                if name == b"content-length":
+                    continue
+                if name == b"vary":
+                    vary = value if b"accept-encoding" in value.lower() else value + b", Accept-Encoding"
+                    continue
+                if name == b"etag" and value.startswith(b'"'):
+                    value = value[:-1] + f'-{encoding}"'.encode()
+                rewritten.append((name, value))
+            rewritten += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary)
+            ]
+            await send({**start, "headers": rewritten})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, headers: List[Tuple[bytes, bytes]], body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,104 @@
+import hashlib
+from typing import List, Optional, Tuple
+from fastapi import Request
+from ..core import metrics
+
+# Conditional GET for large JSON listings and documents.
+#
+# Routes opt in with the conditional_get dependency. Their successful
+# responses get a strong ETag (a hash of the body) and
+# "Cache-Control: no-cache", so browsers keep the payload but revalidate it on
+# every use. A request whose If-None-Match holds the current ETag gets 304 Not
+# Modified without a body. The handler still runs, since the ETag is the hash
+# of what it returns; what is saved is the transfer and the client's parsing.
+# The hash is over the uncompressed body; CompressionMiddleware, further out,
+# appends the encoding to the ETag, and the suffix is ignored when comparing.
+
+ENCODING_SUFFIXES = (b"-br", b"-gzip")
+
+responses_total = metrics.counter("http_conditional_responses_total", "Responses of conditional GET routes", ("result",))  # full, not_modified
+
+def conditional_get(request: Request) -> None:
+    """Dependency marking a GET route's responses for ETags and If-None-Match handling"""
+    request.state.conditional_get = True
+
+def etag_for(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+def matching_tag(if_none_match: bytes, etag: bytes) -> Optional[bytes]:
+    """The If-None-Match entry matching the current ETag, as the client has it (encoding suffix included)"""
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*":
+            return etag
+        # Weak comparison, as If-None-Match requires
+        tag = candidate[2:] if candidate.startswith(b"W/") else candidate
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix + b'"'):
+                tag = tag[:-len(suffix) - 1] + b'"'
+                break
+        if tag == etag:
+            return candidate
+    return None
+
+class ConditionalGetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        passthrough = False
+
+        async def send_with_etag(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # The route's dependency has run by the time it responds
+                if message["status"] != 200 or not scope.get("state", {}).get("conditional_get"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if message.get("more_body"):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            etag = etag_for(body)
+            headers: List[Tuple[bytes, bytes]] = [
+                (name, value) for name, value in start.get("headers", []) if name not in (b"etag", b"cache-control")
+            ]
+            authorized = any(name == b"authorization" for name, _ in scope["headers"])
+            headers += [
+                (b"etag", etag),
+                (b"cache-control", b"private, no-cache" if authorized else b"no-cache")
+            ]
+            if_none_match = next((value for name, value in scope["headers"] if name == b"if-none-match"), None)
+            matched = matching_tag(if_none_match, etag) if if_none_match is not None else None
+            if matched is not None:
+                responses_total.inc(result="not_modified")
+                # Echo the tag the client holds, which is the one a full response would carry
+                headers = [
+                    (name, matched if name == b"etag" else value) for name, value in headers
+                    if name not in (b"content-length", b"content-type")
+                ]
+                await send({**start, "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            responses_total.inc(result="full")
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_with_etag)
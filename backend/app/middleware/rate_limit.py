@@ -0,0 +1,226 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, text
+from ..core import metrics
+from ..core.config import get_settings
+from ..database import async_engine
+from ..models.models import RateLimitBucket
+from ..services.read_replica import token_user_id
+
+settings = get_settings()
+
+# Per-client rate limits for expensive endpoints.
+#
+# Login and registration cost a bcrypt call each and generation a GPT-4 call,
+# so one client could starve everyone else. Each policy is a token bucket of
+# `limit` requests refilling over `period` seconds, kept as a single number per
+# client (GCRA): the time at which the client's bucket is full again. A request
+# is allowed if, after adding its cost, the bucket would be full within
+# `period`. Anonymous routes are keyed by client IP, generation by user id.
+# Behind a reverse proxy the connection comes from the proxy, so the client IP
+# must be read from the header the proxy adds (RATE_LIMIT_CLIENT_IP_HEADER);
+# without it every client shares the proxy's bucket.
+#
+# The in-process backend is a dict, so a check costs microseconds but limits
+# apply per worker. RATE_LIMIT_BACKEND=postgres keeps the buckets in the
+# rate_limit_buckets table, shared by every worker, at the cost of one
+# statement per limited request. Routes without a policy are passed through
+# after a dict lookup. Responses carry RateLimit-Limit, RateLimit-Remaining,
+# RateLimit-Reset and RateLimit-Policy; refused requests get 429 with
+# Retry-After.
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+# Expired buckets are swept from the shared table at most this often
+PRUNE_INTERVAL_SECONDS = 300
+
+decisions_total = metrics.counter("rate_limit_decisions_total", "Rate limited requests by policy and outcome", ("policy", "result"))
+backend_errors_total = metrics.counter("rate_limit_backend_errors_total", "Checks that failed open because the backend was unavailable")
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    limit: int
+    period: float
+    key: str  # "ip" or "user" (falls back to the IP for anonymous requests)
+
+    @property
+    def interval(self) -> float:
+        """Seconds one request takes to refill"""
+        return self.period / self.limit
+
+def parse_rate(rate: str) -> Optional[Tuple[int, float]]:
+    """"10/minute" -> (10, 60.0); an empty string disables the policy"""
+    if not rate:
+        return None
+    count, _, unit = rate.partition("/")
+    return int(count), float(UNITS[unit.strip().rstrip("s")])
+
+def configured_policies() -> Dict[Tuple[str, str], Policy]:
+    policies = {}
+    routes = (
+        ("login", settings.RATE_LIMIT_LOGIN, "ip", ("/api/users/login",)),
+        ("register", settings.RATE_LIMIT_REGISTER, "ip", ("/api/users/register", "/api/users/register/first-admin")),
+        ("refresh", settings.RATE_LIMIT_REFRESH, "ip", ("/api/users/refresh",)),
+        ("generate", settings.RATE_LIMIT_GENERATE, "user", ("/api/meal-plans/generate",))
+    )
+    for name, rate, key, paths in routes:
+        parsed = parse_rate(rate)
+        if parsed is None:
+            continue
+        for path in paths:
+            policies[("POST", path)] = Policy(name, parsed[0], parsed[1], key)
+    return policies
+
+class MemoryBackend:
+    """Buckets in this process"""
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._full_at: Dict[str, float] = {}
+
+    async def hit(self, key: str, policy: Policy, now: float) -> Tuple[bool, float]:
+        """Take one request from the bucket; returns whether it was allowed and when the bucket is full again"""
+        full_at = max(self._full_at.get(key, now), now)
+        if full_at + policy.interval - now > policy.period:
+            return False, full_at
+        if len(self._full_at) >= self.max_keys:
+            self._prune(now)
+        self._full_at[key] = full_at + policy.interval
+        return True, full_at + policy.interval
+
+    def _prune(self, now: float) -> None:
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > now}
+        # Every client is mid-burst; dropping the oldest half only makes limits more lenient
+        if len(self._full_at) >= self.max_keys:
+            self._full_at = dict(sorted(self._full_at.items(), key=lambda item: item[1])[len(self._full_at) // 2:])
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+class PostgresBackend:
+    """Buckets in rate_limit_buckets, shared by every worker"""
+    name = "postgres"
+
+    # Takes the request from the bucket only if it fits; no row back means refused
+    HIT = text("""
+        INSERT INTO rate_limit_buckets AS bucket (key, full_at)
+        VALUES (:key, CAST(:now AS double precision) + CAST(:interval AS double precision))
+        ON CONFLICT (key) DO UPDATE SET full_at = GREATEST(bucket.full_at + :interval, excluded.full_at)
+        WHERE GREATEST(bucket.full_at + :interval, excluded.full_at) <= :deadline
+        RETURNING full_at
+    """)
+
+    def __init__(self):
+        self._pruned_at = 0.0
+
+    async def hit(self, key: str, policy: Policy, now: float) -> Tuple[bool, float]:
+        async with async_engine.begin() as connection:
+            full_at = await connection.scalar(
+                self.HIT, {"key": key, "now": now, "interval": policy.interval, "deadline": now + policy.period}
+            )
+            if full_at is not None:
+                allowed = True
+            else:
+                allowed = False
+                full_at = await connection.scalar(select(RateLimitBucket.full_at).where(RateLimitBucket.key == key))
+            if now - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = now
+                await connection.execute(delete(RateLimitBucket).where(RateLimitBucket.full_at < now))
+        return allowed, full_at
+
+def create_backend():
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresBackend()
+    return MemoryBackend()
+
+backend = create_backend()
+
+def client_ip(scope) -> str:
+    if settings.RATE_LIMIT_CLIENT_IP_HEADER:
+        name = settings.RATE_LIMIT_CLIENT_IP_HEADER.lower().encode()
+        for header, value in scope["headers"]:
+            if header == name:
+                # The last entry is the one our own proxy added; earlier ones are client-supplied
+                return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def rate_limit_headers(policy: Policy, allowed: bool, full_at: float, now: float) -> Dict[str, str]:
+    remaining = max(0, math.floor((policy.period - (full_at - now)) / policy.interval + 1e-9)) if allowed else 0
+    headers = {
+        "RateLimit-Limit": str(policy.limit),
+        "RateLimit-Remaining": str(remaining),
+        "RateLimit-Reset": str(math.ceil(full_at - now)),
+        "RateLimit-Policy": f"{policy.limit};w={int(policy.period)}"
+    }
+    if not allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(full_at + policy.interval - now - policy.period)))
+    return headers
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the configured policies; a plain ASGI class so unlimited routes cost one dict lookup"""
+    def __init__(self, app, policies: Optional[Dict[Tuple[str, str], Policy]] = None):
+        self.app = app
+        self.policies = configured_policies() if policies is None else policies
+        if not settings.RATE_LIMIT_CLIENT_IP_HEADER and self.policies:
+            print("[Rate limit] Keying clients on the connection address; behind a proxy, set RATE_LIMIT_CLIENT_IP_HEADER")
+
+    async def __call__(self, scope, receive, send):
+        policy = self.policies.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        if policy.key == "user":
+            user_id = token_user_id(Request(scope))
+            key = f"{policy.name}:user:{user_id}" if user_id is not None else f"{policy.name}:ip:{client_ip(scope)}"
+        else:
+            key = f"{policy.name}:ip:{client_ip(scope)}"
+        now = time.time()
+        try:
+            allowed, full_at = await backend.hit(key, policy, now)
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the endpoints down with it
+            backend_errors_total.inc()
+            print(f"[Rate limit] Backend check failed, allowing request: {str(e)}")
+            await self.app(scope, receive, send)
+            return
+        decisions_total.inc(policy=policy.name, result="allowed" if allowed else "limited")
+        headers = rate_limit_headers(policy, allowed, full_at, now)
+
+        if not allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Too many requests, please try again later"},
+                headers=headers
+            )
+            await response(scope, receive, send)
+            return
+
+        raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + raw_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+def rate_limit_stats() -> Dict:
+    """Limiter state for the admin metrics endpoint"""
+    return {
+        "enabled": settings.RATE_LIMIT_ENABLED,
+        "backend": backend.name,
+        "tracked_clients": len(backend) if backend.name == "memory" else None,
+        "policies": {
+            policy.name: f"{policy.limit}/{int(policy.period)}s by {policy.key}"
+            for policy in configured_policies().values()
+        },
+        "decisions": decisions_total.snapshot(),
+        "backend_errors": backend_errors_total.snapshot().get("value", 0)
+    }
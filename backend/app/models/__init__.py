@@ -1 +1 @@
-from .models import Base, User, Question, UserResponse, MealPlan 
\ No newline at end of file
+from .models import Base, User, Question, UserResponse, MealPlan, Meal, MealPlanMeal, PlanArchiveDictionary, SystemPrompt, MealPlanGeneration, StatCounter, QuestionResponseDaily
\ No newline at end of file
@@ -1,9 +1,14 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, JSON, DateTime, Float, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, ForeignKeyConstraint, Integer, BigInteger, SmallInteger, String, JSON, DateTime, Date, Float, Enum, Index, UniqueConstraint, CheckConstraint, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 from ..database import Base
 import enum
 
+# Documents are JSONB on PostgreSQL (indexable, path extraction in the database), plain JSON elsewhere
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 class QuestionType(enum.Enum):
     TEXT = "text"
     NUMBER = "number"
@@ -31,8 +36,19 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
     is_approved = Column(Boolean, default=False)
+    # Carried in access tokens; bumping it revokes the user's outstanding tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Admin approval queue
+        Index(
+            "ix_users_pending_approval", "created_at",
+            postgresql_where=text("is_approved = false AND is_active = true"),
+            sqlite_where=text("is_approved = 0 AND is_active = 1")
+        ),
+    )
+
     # Relationships
     responses = relationship("UserResponse", back_populates="user")
     meal_plans = relationship("MealPlan", back_populates="user")
@@ -50,6 +66,13 @@ class Question(Base):
     is_active = Column(Boolean, default=True)
     parent_id = Column(Integer, ForeignKey('questions.id'), nullable=True)  # For nested questions
     field_key = Column(String, nullable=False)  # Maps to form field key
+    # Values the seed last wrote, per seeded column; a column that no longer matches was edited by an admin
+    seed_values = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        # Seeds are upserted by field_key (see seeds/run_seeds.py)
+        Index("uq_questions_field_key", "field_key", unique=True),
+    )
 
     # Relationships
     responses = relationship("UserResponse", back_populates="question")
@@ -63,28 +86,175 @@ class UserResponse(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
-    response_value = Column(JSON, nullable=False)  # Store any type of response as JSON
+    response_value = Column(JSONDocument, nullable=False)  # Store any type of response as JSON
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # One answer per question; also serves lookups by user_id
+        UniqueConstraint("user_id", "question_id", name="uq_user_responses_user_question"),
+        Index("ix_user_responses_created_at", "created_at"),
+        # Containment lookups on answers (response_value @> ...)
+        Index(
+            "ix_user_responses_response_value", "response_value",
+            postgresql_using="gin", postgresql_ops={"response_value": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="responses")
     question = relationship("Question", back_populates="responses")
 
+class UserProfile(Base):
+    __tablename__ = "user_profiles"
+
+    # The user's answers as one nested document keyed by field_key, kept up to date
+    # when responses are saved (see services/user_profiles.py)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    document = Column(JSONDocument, nullable=False)
+    version = Column(Integer, nullable=False, default=1)  # Incremented whenever the document changes
+    content_hash = Column(String(64), nullable=False)  # sha256 of the canonical JSON
+    path_index_version = Column(String(16), nullable=False)  # field_key mapping the document was built with
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class MealPlan(Base):
     __tablename__ = "meal_plans"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    plan_data = Column(JSON, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Stored document; without weekly_plan when meals_interned (see plan_data below)
+    _plan_data = Column("plan_data", JSONDocument, nullable=True)  # NULL once the plan is archived
+    meals_interned = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+    # Archived plans: zstd-compressed plan_data (see services/plan_archive.py)
+    archived_data = Column(LargeBinary, nullable=True)
+    archive_dictionary_id = Column(Integer, ForeignKey("plan_archive_dictionaries.id"), nullable=True)
+    archived_at = Column(DateTime, nullable=True)
+    # Partition key on PostgreSQL, where the primary key is (id, created_at); see services/plan_partitions.py
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True)  # Only the user's latest plan stays active
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=True)
+
+    # Headline figures copied out of plan_data on every write, so listings can skip the document
+    daily_calories = Column(Integer, nullable=True)
+    macro_protein = Column(Integer, nullable=True)
+    macro_carbs = Column(Integer, nullable=True)
+    macro_fats = Column(Integer, nullable=True)
+    day_count = Column(Integer, nullable=True)
+    meal_count = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("plan_data IS NOT NULL OR archived_data IS NOT NULL", name="ck_meal_plans_has_document"),
+        Index("ix_meal_plans_user_id_created_at", "user_id", "created_at"),
+        Index("ix_meal_plans_created_at", "created_at"),
+        # Containment lookups inside plans (plan_data @> ...), e.g. plans that include a meal
+        Index(
+            "ix_meal_plans_plan_data", "plan_data",
+            postgresql_using="gin", postgresql_ops={"plan_data": "jsonb_path_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="meal_plans")
+    # Written by services/meal_store.py, read here to rebuild weekly_plan
+    meal_slots = relationship(
+        "MealPlanMeal", viewonly=True, lazy="selectin",
+        primaryjoin="MealPlan.id == foreign(MealPlanMeal.meal_plan_id)",
+        order_by="(MealPlanMeal.slot, MealPlanMeal.position)"
+    )
+
+    @hybrid_property
+    def plan_data(self):
+        """The plan document, with weekly_plan rebuilt from the meal store for interned plans"""
+        document = self.__dict__.get("_full_plan_data")
+        if document is not None:
+            return document
+        document = self._plan_data
+        if document is None or not self.meals_interned:
+            return document
+        document = {**document, "weekly_plan": _weekly_plan(self.meal_slots)}
+        self._full_plan_data = document
+        return document
+
+    @plan_data.inplace.setter
+    def _plan_data_setter(self, value) -> None:
+        # Stored as is; meal_store interns the meals when the plan is flushed
+        self._plan_data = value
+        self.meals_interned = False
+        self._full_plan_data = value
+        self._pending_document = value
+
+    @plan_data.inplace.expression
+    @classmethod
+    def _plan_data_expression(cls):
+        return cls._plan_data
+
+    @plan_data.inplace.update_expression
+    @classmethod
+    def _plan_data_update_expression(cls, value):
+        # Bulk UPDATEs store the whole document; the plan is interned again on its next ORM write
+        return [(cls._plan_data, value), (cls.meals_interned, False)]
+
+    @plan_data.inplace.bulk_dml
+    @classmethod
+    def _plan_data_bulk_dml(cls, mapping, value) -> None:
+        # Bulk INSERTs (seed scripts) store the document uninterned; see scripts/intern_meal_plans.py
+        mapping["_plan_data"] = value
+
+def _weekly_plan(slots) -> dict:
+    weekly_plan = {}
+    for slot in slots:
+        meals = weekly_plan.setdefault(slot.week, {}).setdefault(slot.day, {}).setdefault(slot.meal_type, [])
+        if slot.meal is not None:
+            meals.append(slot.meal.data)
+    return weekly_plan
+
+class Meal(Base):
+    __tablename__ = "meals"
+
+    # Content-addressed: one row per distinct meal object across all plans
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 of the canonical JSON
+    data = Column(JSONDocument, nullable=False)  # The meal object as generated
+    name = Column(String, nullable=True, index=True)
+    portions = Column(String, nullable=True)
+    calories = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class MealPlanMeal(Base):
+    __tablename__ = "meal_plan_meals"
+
+    # One row per meal of an interned plan; slot numbers (week, day, meal type) in document order
+    meal_plan_id = Column(Integer, primary_key=True)
+    # Part of the foreign key, since meal_plans is unique on (id, created_at) once partitioned
+    meal_plan_created_at = Column(DateTime, nullable=False)
+    slot = Column(SmallInteger, primary_key=True)
+    position = Column(SmallInteger, primary_key=True)
+    week = Column(String, nullable=False)
+    day = Column(String, nullable=False)
+    meal_type = Column(String, nullable=False)
+    meal_id = Column(Integer, ForeignKey("meals.id"), nullable=True)  # NULL marks an empty meal list
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["meal_plan_id", "meal_plan_created_at"], ["meal_plans.id", "meal_plans.created_at"],
+            name="fk_meal_plan_meals_meal_plan", ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        # Plans containing a meal, meal usage counts
+        Index("ix_meal_plan_meals_meal_id", "meal_id"),
+    )
+
+    meal = relationship("Meal", lazy="joined")
+
+class PlanArchiveDictionary(Base):
+    __tablename__ = "plan_archive_dictionaries"
+
+    # Trained zstd dictionaries for archived plans; immutable, retraining adds a row
+    id = Column(Integer, primary_key=True)
+    dictionary = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class SystemPrompt(Base):
     __tablename__ = "system_prompts"
@@ -95,9 +265,52 @@ class SystemPrompt(Base):
     output_format = Column(String, nullable=True)  # For prompts that require specific output format
     description = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    experiment = Column(String, nullable=True, index=True)  # Active prompts sharing an experiment are A/B variants
+    traffic_weight = Column(Integer, nullable=False, default=100)  # Relative share of users assigned to this variant
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Relationships
-    created_by = relationship("User", backref="created_prompts") 
\ No newline at end of file
+    created_by = relationship("User", backref="created_prompts")
+
+class MealPlanGeneration(Base):
+    __tablename__ = "meal_plan_generations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    system_prompt_id = Column(Integer, ForeignKey("system_prompts.id", ondelete="SET NULL"), nullable=True)
+    experiment = Column(String, nullable=True)
+    variant = Column(String, nullable=False)  # Prompt name at generation time, or "default"
+    status = Column(String, nullable=False)  # success, parse_failed or provider_error
+    latency_ms = Column(Float, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    repair_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Relationships
+    system_prompt = relationship("SystemPrompt")
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    # Admin dashboard counts, maintained on writes (see services/stats.py)
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class QuestionResponseDaily(Base):
+    __tablename__ = "question_response_daily"
+
+    # New responses per question per day (by the response's created_at)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    response_count = Column(Integer, nullable=False, default=0)
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    # Shared rate limiter state (see middleware/rate_limit.py): when the bucket is full again, in epoch seconds
+    key = Column(String, primary_key=True)
+    full_at = Column(Float, nullable=False, index=True)
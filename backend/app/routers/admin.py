@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from ..database import get_db
 from ..models.models import User, Question, UserResponse, MealPlan, SystemPrompt
@@ -11,17 +11,35 @@ from ..schemas.admin import (
     SystemHealth
 )
 from ..schemas.question import QuestionResponse, QuestionCreate, QuestionUpdate
-from ..schemas.system_prompt import SystemPrompt as SystemPromptSchema, SystemPromptCreate, SystemPromptUpdate
-from ..services.auth import get_current_user, get_current_admin_user
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from ..schemas.system_prompt import SystemPrompt as SystemPromptSchema, SystemPromptCreate, SystemPromptUpdate, PromptEvaluationRequest
+from ..services.auth import get_current_user, get_current_admin_user, get_current_reader, get_current_admin_reader
+from ..services.auth_cache import AuthUser, cache_stats
+from ..services.password_hashing import password_pool
+from ..middleware.rate_limit import rate_limit_stats
+from ..services.loop_monitor import loop_monitor
+from ..services.read_replica import get_read_db, routing_stats
+from ..services.prompt_evaluation import build_candidates, load_profile_sample, start_evaluation_run, get_evaluation_run, active_evaluation_run
+from ..services.prompt_experiments import get_experiment_stats
+from ..services.profile_serializer import PROFILE_FORMATS
+from ..services.user_responses import load_user_responses
+from ..services.stats import get_counters, get_question_response_counts, range_start, reconcile
+from ..services.meal_store import popular_meals, store_stats
+from ..core.config import get_settings
+from ..core.metrics import snapshot as metrics_snapshot
+from ..core.pool_metrics import pool_stats
+from ..core.pagination import PageParams, paginate
+from ..schemas.pagination import Page
+from ..middleware.http_cache import conditional_get
+from sqlalchemy import select
+
+settings = get_settings()
 
 router = APIRouter()
 
 @router.get("/stats", response_model=AdminStats)
 async def get_admin_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
     """Get overall system statistics (admin only)"""
     if not current_user.is_admin:
@@ -30,30 +48,26 @@ async def get_admin_stats(
             detail="Only admins can view statistics"
         )
     
+    # Precomputed counters, maintained on writes
+    counters = await get_counters(db)
+
     # User statistics
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    admin_users = db.query(User).filter(User.is_admin == True).count()
     user_stats = UserStats(
-        total_users=total_users,
-        active_users=active_users,
-        admin_users=admin_users
+        total_users=counters["users_total"],
+        active_users=counters["users_active"],
+        admin_users=counters["users_admin"]
     )
     
     # Question statistics
-    total_questions = db.query(Question).count()
-    active_questions = db.query(Question).filter(Question.is_active == True).count()
     question_stats = QuestionStats(
-        total_questions=total_questions,
-        active_questions=active_questions
+        total_questions=counters["questions_total"],
+        active_questions=counters["questions_active"]
     )
     
     # Meal plan statistics
-    total_meal_plans = db.query(MealPlan).count()
-    active_meal_plans = db.query(MealPlan).filter(MealPlan.is_active == True).count()
     meal_plan_stats = MealPlanStats(
-        total_meal_plans=total_meal_plans,
-        active_meal_plans=active_meal_plans
+        total_meal_plans=counters["meal_plans_total"],
+        active_meal_plans=counters["meal_plans_active"]
     )
     
     # System health
@@ -70,11 +84,47 @@ async def get_admin_stats(
         system_health=system_health
     )
 
+@router.post("/stats/reconcile")
+async def reconcile_stats(
+    fix: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
+):
+    """Recompute the statistics rollups from scratch and report drift (repaired unless fix=false)"""
+    return await reconcile(db, fix=fix)
+
+@router.get("/metrics")
+async def get_metrics(
+    current_user: AuthUser = Depends(get_current_admin_user)
+):
+    """Get this worker's metrics, including database connection pool usage"""
+    return {
+        "database_pool": pool_stats("primary"),
+        "replica_pool": pool_stats("replica") if settings.READ_REPLICA_URL else None,
+        "read_routing": routing_stats(),
+        "auth_cache": cache_stats(),
+        "password_hashing": password_pool.stats(),
+        "rate_limits": rate_limit_stats(),
+        "metrics": metrics_snapshot()
+    }
+
+@router.get("/event-loop")
+async def get_event_loop_report(
+    limit: int = 20,
+    reset: bool = False,
+    current_user: AuthUser = Depends(get_current_admin_user)
+):
+    """Code that blocked this worker's event loop, by route, worst first (needs LOOP_MONITOR_ENABLED)"""
+    report = loop_monitor.report(limit)
+    if reset:
+        loop_monitor.reset()
+    return report
+
 @router.get("/users/{user_id}/responses")
 async def get_user_responses(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
     """Get all responses for a specific user (admin only)"""
     if not current_user.is_admin:
@@ -84,7 +134,7 @@ async def get_user_responses(
         )
     
     # Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,16 +142,13 @@ async def get_user_responses(
         )
     
     # Get all responses with question text
-    responses = db.query(UserResponse, Question)\
-        .join(Question, UserResponse.question_id == Question.id)\
-        .filter(UserResponse.user_id == user_id)\
-        .all()
+    responses = await load_user_responses(db, user_id)
     
     formatted_responses = []
-    for response, question in responses:
+    for response in responses:
         formatted_responses.append({
-            "question_id": question.id,
-            "question_text": question.text,
+            "question_id": response.question_id,
+            "question_text": response.question.text,
             "response": response.response_value,
             "created_at": response.created_at
         })
@@ -114,8 +161,8 @@ async def get_user_responses(
 
 @router.get("/meal-plans/stats")
 async def get_meal_plan_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
     """Get detailed meal plan statistics (admin only)"""
     if not current_user.is_admin:
@@ -124,9 +171,10 @@ async def get_meal_plan_stats(
             detail="Only admins can view meal plan statistics"
         )
     
-    total_meal_plans = db.query(MealPlan).count()
-    active_meal_plans = db.query(MealPlan).filter(MealPlan.is_active == True).count()
-    users_with_plans = db.query(MealPlan.user_id).distinct().count()
+    counters = await get_counters(db)
+    total_meal_plans = counters["meal_plans_total"]
+    active_meal_plans = counters["meal_plans_active"]
+    users_with_plans = counters["users_with_plans"]
     
     return {
         "total_meal_plans": total_meal_plans,
@@ -135,11 +183,23 @@ async def get_meal_plan_stats(
         "average_plans_per_user": total_meal_plans / users_with_plans if users_with_plans > 0 else 0
     }
 
+@router.get("/meals/popular")
+async def get_popular_meals(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
+):
+    """Most used meals across all plans, with meal store deduplication figures (admin only)"""
+    return {
+        "store": await store_stats(db),
+        "meals": await popular_meals(db, limit)
+    }
+
 @router.get("/questions/stats")
 async def get_question_stats(
     time_range: str = "7d",
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
     """Get detailed question statistics (admin only)"""
     if not current_user.is_admin:
@@ -149,30 +209,15 @@ async def get_question_stats(
         )
     
     try:
-        # Calculate the date range
-        now = datetime.utcnow()
-        if time_range == "7d":
-            start_date = now - timedelta(days=7)
-        elif time_range == "30d":
-            start_date = now - timedelta(days=30)
-        elif time_range == "90d":
-            start_date = now - timedelta(days=90)
-        else:
-            start_date = now - timedelta(days=7)  # Default to 7 days
-
-        total_questions = db.query(Question).count()
-        active_questions = db.query(Question).filter(Question.is_active == True).count()
+        # Calculate the date range (7d, 30d or 90d; defaults to 7 days)
+        start_date = range_start(time_range)
+
+        counters = await get_counters(db)
+        total_questions = counters["questions_total"]
+        active_questions = counters["questions_active"]
         
-        # Get response counts per question within the time range
-        response_counts = db.query(
-            UserResponse.question_id,
-            Question.text,
-            func.count(UserResponse.id).label('response_count')
-        )\
-            .join(Question)\
-            .filter(UserResponse.created_at >= start_date)\
-            .group_by(UserResponse.question_id, Question.text)\
-            .all()
+        # Sum the daily per-question response buckets within the time range
+        response_counts = await get_question_response_counts(db, start_date)
         
         question_stats = []
         for question_id, question_text, response_count in response_counts:
@@ -199,103 +244,110 @@ async def get_question_stats(
             detail=f"Error fetching question statistics: {str(e)}"
         )
 
-@router.get("/questions", response_model=List[QuestionResponse])
+@router.get("/questions", response_model=Page[QuestionResponse], dependencies=[Depends(conditional_get)])
 async def get_questions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
 ):
-    """Get all questions for admin management"""
-    questions = db.query(Question).order_by(Question.order).all()
-    return questions
+    """Get questions for admin management, in questionnaire order"""
+    return await paginate(db, select(Question), [Question.order, Question.id], page, "admin_questions")
 
 @router.post("/questions", response_model=QuestionResponse)
 async def create_question(
     question: QuestionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Create a new question"""
+    if await db.scalar(select(Question.id).where(Question.field_key == question.field_key)):
+        raise HTTPException(status_code=400, detail="A question with this field_key already exists")
     db_question = Question(**question.dict())
     db.add(db_question)
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
 @router.put("/questions/{question_id}", response_model=QuestionResponse)
 async def update_question(
     question_id: int,
     question: QuestionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Update an existing question"""
-    db_question = db.query(Question).filter(Question.id == question_id).first()
+    db_question = await db.get(Question, question_id)
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
+    if question.field_key is not None and await db.scalar(
+        select(Question.id).where(Question.field_key == question.field_key, Question.id != question_id)
+    ):
+        raise HTTPException(status_code=400, detail="A question with this field_key already exists")
     
     for key, value in question.dict(exclude_unset=True).items():
         setattr(db_question, key, value)
     
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
 @router.delete("/questions/{question_id}")
 async def delete_question(
     question_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Delete a question"""
-    db_question = db.query(Question).filter(Question.id == question_id).first()
+    db_question = await db.get(Question, question_id)
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    db.delete(db_question)
-    db.commit()
+    await db.delete(db_question)
+    await db.commit()
     return {"detail": "Question deleted"}
 
 @router.post("/questions/reorder")
 async def reorder_questions(
     question_orders: List[dict],
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Update question orders"""
     for order_data in question_orders:
-        question = db.query(Question).filter(Question.id == order_data["id"]).first()
+        question = await db.get(Question, order_data["id"])
         if question:
             question.order = order_data["order"]
     
-    db.commit()
+    await db.commit()
     return {"detail": "Questions reordered successfully"}
 
-@router.get("/users/pending")
+@router.get("/users/pending", dependencies=[Depends(conditional_get)])
 async def get_pending_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
 ):
-    """Get all users pending approval"""
-    pending_users = db.query(User).filter(
+    """Get users pending approval, oldest first (served by the partial pending-approval index)"""
+    pending = select(User).where(
         User.is_approved == False,
         User.is_active == True
-    ).all()
+    )
     
-    return [{
+    return await paginate(db, pending, [User.created_at, User.id], page, "pending_users", transform=lambda user: {
         "id": user.id,
         "email": user.email,
         "full_name": "",  # Add this field to User model if needed
         "created_at": user.created_at
-    } for user in pending_users]
+    })
 
 @router.post("/users/{user_id}/approve")
 async def approve_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Approve a user"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -303,17 +355,17 @@ async def approve_user(
         )
     
     user.is_approved = True
-    db.commit()
+    await db.commit()
     return {"message": "User approved successfully"}
 
 @router.post("/users/{user_id}/reject")
 async def reject_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Reject a user by deactivating their account"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -322,45 +374,111 @@ async def reject_user(
     
     user.is_active = False
     user.is_approved = False
-    db.commit()
+    user.token_version = (user.token_version or 0) + 1  # Revoke their tokens
+    await db.commit()
     return {"message": "User rejected successfully"}
 
 # System Prompts endpoints
-@router.get("/system-prompts", response_model=List[SystemPromptSchema])
+@router.get("/system-prompts", response_model=Page[SystemPromptSchema], dependencies=[Depends(conditional_get)])
 async def get_system_prompts(
-    skip: int = 0,
-    limit: int = 100,
     active_only: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
 ):
-    """Get all system prompts"""
-    query = db.query(SystemPrompt)
+    """Get system prompts"""
+    query = select(SystemPrompt)
     if active_only:
-        query = query.filter(SystemPrompt.is_active == True)
-    return query.offset(skip).limit(limit).all()
+        query = query.where(SystemPrompt.is_active == True)
+    return await paginate(db, query, [SystemPrompt.id], page, "system_prompts")
 
 @router.post("/system-prompts", response_model=SystemPromptSchema)
 async def create_system_prompt(
     prompt: SystemPromptCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Create a new system prompt"""
     db_prompt = SystemPrompt(**prompt.model_dump(), created_by_id=current_user.id)
     db.add(db_prompt)
-    db.commit()
-    db.refresh(db_prompt)
+    await db.commit()
+    await db.refresh(db_prompt)
     return db_prompt
 
+@router.post("/system-prompts/evaluate", status_code=status.HTTP_202_ACCEPTED)
+async def evaluate_system_prompts(
+    request: PromptEvaluationRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
+):
+    """
+    Start replaying a sample of stored user profiles against candidate prompts.
+    The evaluation runs in the background; poll GET /system-prompts/evaluate/{run_id} for the report.
+    """
+    if request.sample_size > settings.PROMPT_EVAL_MAX_SAMPLE_SIZE or request.concurrency > settings.PROMPT_EVAL_MAX_CONCURRENCY:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sample_size must be <= {settings.PROMPT_EVAL_MAX_SAMPLE_SIZE} and concurrency <= {settings.PROMPT_EVAL_MAX_CONCURRENCY}"
+        )
+    if request.provider not in (None, "openai", "local"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="provider must be 'openai' or 'local'")
+    if request.profile_format not in (None, *PROFILE_FORMATS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"profile_format must be one of {PROFILE_FORMATS}")
+
+    candidates = await build_candidates(
+        db,
+        request.prompt_ids,
+        [draft.model_dump() for draft in request.candidate_prompts],
+        include_active=request.include_active
+    )
+    if not candidates:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No prompts to evaluate")
+
+    profiles = await load_profile_sample(db, request.sample_size, seed=request.seed)
+    if not profiles:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No stored user profiles to evaluate against")
+
+    running = active_evaluation_run()
+    if running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Evaluation run {running} is still in progress")
+
+    return start_evaluation_run(
+        candidates,
+        profiles,
+        provider=request.provider,
+        concurrency=request.concurrency,
+        profile_format=request.profile_format
+    )
+
+@router.get("/system-prompts/evaluate/{run_id}")
+async def get_system_prompt_evaluation(
+    run_id: str,
+    current_user: AuthUser = Depends(get_current_admin_user)
+):
+    """Status of a prompt evaluation run, with its report once it has completed"""
+    run = get_evaluation_run(run_id)
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evaluation run not found")
+    return run
+
+@router.get("/prompt-experiments/{experiment}")
+async def get_prompt_experiment_stats(
+    experiment: str,
+    days: int = 30,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
+):
+    """Get per-variant generation latency, token, parse failure and regeneration metrics"""
+    return await get_experiment_stats(db, experiment, days=days)
+
 @router.get("/system-prompts/{prompt_id}", response_model=SystemPromptSchema)
 async def get_system_prompt(
     prompt_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_admin_reader)
 ):
     """Get a specific system prompt"""
-    db_prompt = db.query(SystemPrompt).filter(SystemPrompt.id == prompt_id).first()
+    db_prompt = await db.get(SystemPrompt, prompt_id)
     if not db_prompt:
         raise HTTPException(status_code=404, detail="System prompt not found")
     return db_prompt
@@ -369,11 +487,11 @@ async def get_system_prompt(
 async def update_system_prompt(
     prompt_id: int,
     prompt: SystemPromptUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Update a system prompt"""
-    db_prompt = db.query(SystemPrompt).filter(SystemPrompt.id == prompt_id).first()
+    db_prompt = await db.get(SystemPrompt, prompt_id)
     if not db_prompt:
         raise HTTPException(status_code=404, detail="System prompt not found")
     
@@ -381,37 +499,37 @@ async def update_system_prompt(
     for field, value in update_data.items():
         setattr(db_prompt, field, value)
     
-    db.commit()
-    db.refresh(db_prompt)
+    await db.commit()
+    await db.refresh(db_prompt)
     return db_prompt
 
 @router.delete("/system-prompts/{prompt_id}")
 async def delete_system_prompt(
     prompt_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Delete a system prompt"""
-    db_prompt = db.query(SystemPrompt).filter(SystemPrompt.id == prompt_id).first()
+    db_prompt = await db.get(SystemPrompt, prompt_id)
     if not db_prompt:
         raise HTTPException(status_code=404, detail="System prompt not found")
     
-    db.delete(db_prompt)
-    db.commit()
+    await db.delete(db_prompt)
+    await db.commit()
     return {"detail": "System prompt deleted successfully"}
 
 @router.post("/system-prompts/{prompt_id}/toggle-active", response_model=SystemPromptSchema)
 async def toggle_system_prompt_active(
     prompt_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_admin_user)
 ):
     """Toggle the active status of a system prompt"""
-    db_prompt = db.query(SystemPrompt).filter(SystemPrompt.id == prompt_id).first()
+    db_prompt = await db.get(SystemPrompt, prompt_id)
     if not db_prompt:
         raise HTTPException(status_code=404, detail="System prompt not found")
     
     db_prompt.is_active = not db_prompt.is_active
-    db.commit()
-    db.refresh(db_prompt)
+    await db.commit()
+    await db.refresh(db_prompt)
     return db_prompt 
\ No newline at end of file
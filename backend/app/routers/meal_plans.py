@@ -1,21 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, noload
+from typing import List, Optional, Union
 from ..database import get_db
 from ..models.models import MealPlan, User
-from ..schemas.meal_plan import MealPlanCreate, MealPlanResponse
-from ..services.auth import get_current_user
+from ..schemas.meal_plan import MealPlanCreate, MealPlanResponse, MealPlanSummaryResponse, MealPlanDayResponse
+from ..schemas.pagination import Page
+from ..core.pagination import PageParams, paginate
+from ..services.auth import get_current_user, get_current_reader
+from ..services.auth_cache import AuthUser
+from ..services.read_replica import get_read_db
 from ..services.openai_service import generate_meal_plan
+from ..services.meal_plan_summary import summary_columns, summary_response
+from ..services.plan_documents import PLAN_COLUMNS, parse_fields, check_path_segment, path_expression, nest_paths, extract_path
+from ..services.plan_archive import load_plan_document
+from ..services.meal_store import load_day_meals
+from ..services.plan_partitions import find_plan, find_plan_row
+from ..middleware.http_cache import conditional_get
 from datetime import datetime
 import json
 
 router = APIRouter()
 
+class ListingView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
 @router.post("/", response_model=MealPlanResponse)
 async def create_meal_plan(
     meal_plan: MealPlanCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Create a new meal plan for the current user"""
     db_meal_plan = MealPlan(
@@ -25,35 +42,74 @@ async def create_meal_plan(
         end_date=meal_plan.end_date
     )
     db.add(db_meal_plan)
-    db.commit()
-    db.refresh(db_meal_plan)
+    await db.commit()
+    await db.refresh(db_meal_plan)
     return db_meal_plan
 
-@router.get("/", response_model=List[MealPlanResponse])
+@router.get("/", response_model=Union[Page[MealPlanSummaryResponse], Page[MealPlanResponse]], dependencies=[Depends(conditional_get)])
 async def get_meal_plans(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    view: ListingView = Query(ListingView.FULL, description="summary leaves out plan_data and returns the headline figures"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
-    """Get all meal plans for the current user"""
-    meal_plans = db.query(MealPlan)\
-        .filter(MealPlan.user_id == current_user.id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return meal_plans
+    """Get the current user's meal plans, newest first"""
+    query = select(MealPlan).where(MealPlan.user_id == current_user.id)
+    if view == ListingView.SUMMARY:
+        # plan_data is never read, the full document is served by GET /{id}
+        return await paginate(
+            db,
+            query.options(*summary_columns()),
+            [MealPlan.created_at, MealPlan.id],
+            page,
+            "meal_plans",
+            descending=True,
+            transform=lambda meal_plan: MealPlanSummaryResponse(**summary_response(meal_plan))
+        )
+    return await paginate(
+        db,
+        query,
+        [MealPlan.created_at, MealPlan.id],
+        page,
+        "meal_plans",
+        descending=True
+    )
 
-@router.get("/{meal_plan_id}", response_model=MealPlanResponse)
+@router.get("/{meal_plan_id}", response_model=MealPlanResponse, dependencies=[Depends(conditional_get)])
 async def get_meal_plan(
     meal_plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated plan_data paths to return, e.g. macros,weekly_plan.week1.monday"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
-    """Get a specific meal plan by ID"""
-    meal_plan = db.query(MealPlan)\
-        .filter(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)\
-        .first()
+    """Get a specific meal plan by ID, optionally with only some parts of plan_data"""
+    if fields:
+        paths = parse_fields(fields)
+        row = await find_plan_row(
+            db, meal_plan_id,
+            select(MealPlan, *(path_expression(path) for path in paths))
+            .options(defer(MealPlan._plan_data), noload(MealPlan.meal_slots))
+            .where(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)
+        )
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Meal plan not found"
+            )
+        meal_plan, *values = row
+        if meal_plan.archived_at or (meal_plan.meals_interned and any(path[0] == "weekly_plan" for path in paths)):
+            # Archived documents are compressed and interned meals live in the meal store,
+            # so extract those paths from the rebuilt document
+            document = await load_plan_document(db, meal_plan.id)
+            values = [extract_path(document, path) for path in paths]
+        return {
+            **{column: getattr(meal_plan, column) for column in PLAN_COLUMNS},
+            "plan_data": nest_paths(paths, values)
+        }
+
+    meal_plan = await find_plan(
+        db, meal_plan_id, select(MealPlan).where(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)
+    )
     if not meal_plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -61,17 +117,49 @@ async def get_meal_plan(
         )
     return meal_plan
 
+@router.get("/{meal_plan_id}/weeks/{week}/days/{day}", response_model=MealPlanDayResponse)
+async def get_meal_plan_day(
+    meal_plan_id: int,
+    week: str,
+    day: str,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
+):
+    """Get the meals of one day of a meal plan, without loading the rest of the plan"""
+    path = ("weekly_plan", check_path_segment(week), check_path_segment(day))
+    row = await find_plan_row(
+        db, meal_plan_id,
+        select(path_expression(path), MealPlan.meals_interned, MealPlan.archived_at)
+        .where(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)
+    )
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meal plan not found"
+        )
+    meals, meals_interned, archived_at = row
+    if meals_interned:
+        meals = await load_day_meals(db, meal_plan_id, week, day)
+    elif archived_at:
+        meals = extract_path(await load_plan_document(db, meal_plan_id), path)
+    if not isinstance(meals, dict):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Day not found in meal plan"
+        )
+    return {"meal_plan_id": meal_plan_id, "week": week, "day": day, "meals": meals}
+
 @router.put("/{meal_plan_id}", response_model=MealPlanResponse)
 async def update_meal_plan(
     meal_plan_id: int,
     meal_plan_update: MealPlanCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Update a meal plan"""
-    db_meal_plan = db.query(MealPlan)\
-        .filter(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)\
-        .first()
+    db_meal_plan = await find_plan(
+        db, meal_plan_id, select(MealPlan).where(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)
+    )
     if not db_meal_plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,35 +169,35 @@ async def update_meal_plan(
     for key, value in meal_plan_update.dict().items():
         setattr(db_meal_plan, key, value)
     
-    db.commit()
-    db.refresh(db_meal_plan)
+    await db.commit()
+    await db.refresh(db_meal_plan)
     return db_meal_plan
 
 @router.delete("/{meal_plan_id}")
 async def delete_meal_plan(
     meal_plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Delete a meal plan"""
-    db_meal_plan = db.query(MealPlan)\
-        .filter(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)\
-        .first()
+    db_meal_plan = await find_plan(
+        db, meal_plan_id, select(MealPlan).where(MealPlan.id == meal_plan_id, MealPlan.user_id == current_user.id)
+    )
     if not db_meal_plan:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meal plan not found"
         )
     
-    db.delete(db_meal_plan)
-    db.commit()
+    await db.delete(db_meal_plan)
+    await db.commit()
     return {"message": "Meal plan deleted successfully"}
 
 @router.post("/generate")
 async def generate_ai_meal_plan(
     request_data: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Generate a meal plan using AI based on user responses"""
     try:
@@ -123,148 +211,16 @@ async def generate_ai_meal_plan(
                 detail="Request data is empty"
             )
             
-        # Extract user responses and user info from request data
-        try:
-            user_responses = request_data.get('responses', [])
-            user_info_data = request_data.get('user_info', {})
-            print("[Step 2] Successfully extracted user data")
-            print("[Step 2] User responses count:", len(user_responses))
-            print("[Step 2] User info data keys:", list(user_info_data.keys()))
-        except Exception as e:
-            print("[Error] Failed to extract user data:", str(e))
-            print("[Error] Request data structure:", type(request_data))
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to extract user data: {str(e)}"
-            )
-            
-        print("[Step 3] Structuring user info...")
-        try:
-            # Structure the user info according to what generate_meal_plan expects
-            user_info = {
-                'personalInfo': {
-                    'name': user_info_data.get('name', 'User'),
-                    'age': user_info_data.get('age', 30),
-                    'height': user_info_data.get('height', 170),
-                    'weight': user_info_data.get('weight', 70),
-                    'sex': user_info_data.get('sex', 'Not specified'),
-                    'email': user_info_data.get('email', ''),
-                    'phone': user_info_data.get('phone', ''),
-                    'bodyFatPercentage': user_info_data.get('bodyFatPercentage'),
-                    'leanMassPercentage': user_info_data.get('leanMassPercentage'),
-                    'waistToHipRatio': user_info_data.get('waistToHipRatio')
-                },
-                'goalsInfo': {
-                    'primaryGoals': user_info_data.get('goals', ['Better Health']),
-                    'preferredDiet': user_info_data.get('preferredDiet', 'Balanced'),
-                    'feelGoals': user_info_data.get('feelGoals'),
-                    'challengeGoals': user_info_data.get('challengeGoals'),
-                    'prioritizedGoals': user_info_data.get('prioritizedGoals', [])
-                },
-                'foodIntake': {
-                    'dailyMeals': {
-                        'breakfast': {
-                            'description': user_info_data.get('breakfast'),
-                            'isHomeCooked': user_info_data.get('breakfastHomeCooked')
-                        },
-                        'morningSnack': {
-                            'description': user_info_data.get('morningSnack'),
-                            'isHomeCooked': user_info_data.get('morningSnackHomeCooked')
-                        },
-                        'lunch': {
-                            'description': user_info_data.get('lunch'),
-                            'isHomeCooked': user_info_data.get('lunchHomeCooked')
-                        },
-                        'afternoonSnack': {
-                            'description': user_info_data.get('afternoonSnack'),
-                            'isHomeCooked': user_info_data.get('afternoonSnackHomeCooked')
-                        },
-                        'dinner': {
-                            'description': user_info_data.get('dinner'),
-                            'isHomeCooked': user_info_data.get('dinnerHomeCooked')
-                        }
-                    },
-                    'coffee': {
-                        'isOrganic': user_info_data.get('organicCoffee', False),
-                        'additives': user_info_data.get('coffeeAdditives', [])
-                    },
-                    'tea': {
-                        'type': user_info_data.get('teaType'),
-                        'additives': user_info_data.get('teaAdditives', [])
-                    },
-                    'water': {
-                        'dailyQuantity': user_info_data.get('waterQuantity', 0),
-                        'isFiltered': user_info_data.get('filteredWater', False)
-                    },
-                    'alcohol': {
-                        'type': user_info_data.get('alcoholType'),
-                        'drinksPerWeek': user_info_data.get('alcoholDrinksPerWeek', 0)
-                    },
-                    'likedFoods': user_info_data.get('likedFoods', []),
-                    'dislikedFoods': user_info_data.get('dislikedFoods', [])
-                },
-                'workoutRoutine': {
-                    'weightLifting': {
-                        'frequency': user_info_data.get('weightTrainingFrequency'),
-                        'type': user_info_data.get('weightTrainingType')
-                    },
-                    'cardio': {
-                        'frequency': user_info_data.get('cardioFrequency'),
-                        'type': user_info_data.get('cardioType')
-                    },
-                    'yogaPilates': {
-                        'frequency': user_info_data.get('yogaPilatesFrequency'),
-                        'type': user_info_data.get('yogaPilatesType')
-                    },
-                    'sleep': {
-                        'hoursPerNight': user_info_data.get('sleepHours'),
-                        'quality': user_info_data.get('sleepQuality')
-                    }
-                },
-                'stressLevels': {
-                    'currentLevel': user_info_data.get('stressLevel'),
-                    'managementTechniques': user_info_data.get('stressManagement'),
-                    'recalibrationMethods': user_info_data.get('recalibrationMethods', [])
-                },
-                'toxicityLifestyle': {
-                    'processedFoodsPercentage': user_info_data.get('processedFoodsPercentage', 0),
-                    'organicFoodsUse': user_info_data.get('organicFoodsUse'),
-                    'cravings': user_info_data.get('cravings', [])
-                }
-            }
-            print("[Step 3] Successfully structured user info")
-            print("[Step 3] Structured data sections:", list(user_info.keys()))
-        except Exception as e:
-            print("[Error] Failed to structure user info:", str(e))
-            print("[Error] User info data:", json.dumps(user_info_data, indent=2))
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to structure user info: {str(e)}"
-            )
-        
-        print("[Step 4] Preparing data for OpenAI service...")
-        try:
-            # Combine the data into a single dictionary
-            data = {
-                'user_info': user_info,
-                'responses': user_responses,
-                'user_id': current_user.id  # Add the user ID to the data
-            }
-            print("[Step 4] Data prepared successfully")
-            print("[Step 4] Data sections:", list(data.keys()))
-        except Exception as e:
-            print("[Error] Failed to prepare data:", str(e))
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to prepare data: {str(e)}"
-            )
-        
-        print("[Step 5] Calling OpenAI service...")
+        print("[Step 2] Preparing data for OpenAI service...")
+        # The answers come from the user's stored profile; the questionnaire data in the body is not used
+        data = {'user_id': current_user.id}
+
+        print("[Step 3] Calling OpenAI service...")
         try:
             # Generate the meal plan using OpenAI
-            meal_plan_data = generate_meal_plan(data, db)
-            print("[Step 5] Successfully generated meal plan")
-            print("[Step 5] Meal plan sections:", list(meal_plan_data.keys()))
+            meal_plan_data = await generate_meal_plan(data, db)
+            print("[Step 3] Successfully generated meal plan")
+            print("[Step 3] Meal plan sections:", list(meal_plan_data.keys()))
         except Exception as e:
             print("[Error] Failed to generate meal plan:", str(e))
             raise HTTPException(
@@ -272,7 +228,7 @@ async def generate_ai_meal_plan(
                 detail=f"Failed to generate meal plan: {str(e)}"
             )
         
-        print("[Step 6] Saving meal plan to database...")
+        print("[Step 4] Saving meal plan to database...")
         try:
             # Create a new meal plan record
             db_meal_plan = MealPlan(
@@ -282,15 +238,15 @@ async def generate_ai_meal_plan(
                 is_active=True
             )
             db.add(db_meal_plan)
-            db.commit()
-            db.refresh(db_meal_plan)
-            print("[Step 6] Successfully saved meal plan")
+            await db.commit()
+            await db.refresh(db_meal_plan)
+            print("[Step 4] Successfully saved meal plan")
             
             return meal_plan_data
             
         except Exception as e:
             print("[Error] Failed to save meal plan:", str(e))
-            db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to save meal plan: {str(e)}"
@@ -1,18 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from ..database import get_db
-from ..models.models import Question, User, UserResponse
+from ..models.models import Question, User
 from ..schemas.question import QuestionCreate, QuestionResponse, SaveResponseRequest, UserResponseSchema
-from ..services.auth import get_current_user
+from ..services.auth import get_current_user, get_current_reader
+from ..services.auth_cache import AuthUser
+from ..services.read_replica import get_read_db
+from ..services.user_responses import load_user_responses, save_user_responses
+from ..middleware.http_cache import conditional_get
 
 router = APIRouter()
 
 @router.post("/", response_model=QuestionResponse)
 async def create_question(
     question: QuestionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Create a new question (admin only)"""
     if not current_user.is_admin:
@@ -21,21 +26,29 @@ async def create_question(
             detail="Only admins can create questions"
         )
     
+    if await db.scalar(select(Question.id).where(Question.field_key == question.field_key)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A question with this field_key already exists"
+        )
+    
     db_question = Question(**question.dict())
     db.add(db_question)
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
-@router.get("/", response_model=List[QuestionResponse])
+@router.get("/", response_model=List[QuestionResponse], dependencies=[Depends(conditional_get)])
 async def get_questions(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all questions"""
     try:
-        questions = db.query(Question).filter(Question.is_active == True).offset(skip).limit(limit).all()
+        questions = (await db.scalars(
+            select(Question).where(Question.is_active == True).offset(skip).limit(limit)
+        )).all()
         print(f"Found {len(questions)} questions")
         return questions
     except Exception as e:
@@ -45,13 +58,32 @@ async def get_questions(
             detail=f"Error fetching questions: {str(e)}"
         )
 
+@router.get("/user-responses", response_model=List[UserResponseSchema])
+async def get_user_responses(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
+):
+    """Get all responses for the current user"""
+    try:
+        db_responses = await load_user_responses(db, current_user.id)
+        return [
+            UserResponseSchema(question_id=response.question_id, answer=response.response_value)
+            for response in db_responses
+        ]
+    except Exception as e:
+        print(f"Error fetching user responses: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching user responses: {str(e)}"
+        )
+
 @router.get("/{question_id}", response_model=QuestionResponse)
 async def get_question(
     question_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific question by ID"""
-    question = db.query(Question).filter(Question.id == question_id, Question.is_active == True).first()
+    question = await db.scalar(select(Question).where(Question.id == question_id, Question.is_active == True))
     if not question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -63,8 +95,8 @@ async def get_question(
 async def update_question(
     question_id: int,
     question_update: QuestionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Update a question (admin only)"""
     if not current_user.is_admin:
@@ -73,25 +105,30 @@ async def update_question(
             detail="Only admins can update questions"
         )
     
-    db_question = db.query(Question).filter(Question.id == question_id).first()
+    db_question = await db.get(Question, question_id)
     if not db_question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found"
         )
+    if await db.scalar(select(Question.id).where(Question.field_key == question_update.field_key, Question.id != question_id)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A question with this field_key already exists"
+        )
     
     for key, value in question_update.dict().items():
         setattr(db_question, key, value)
     
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
 @router.delete("/{question_id}")
 async def delete_question(
     question_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Soft delete a question (admin only)"""
     if not current_user.is_admin:
@@ -100,7 +137,7 @@ async def delete_question(
             detail="Only admins can delete questions"
         )
     
-    db_question = db.query(Question).filter(Question.id == question_id).first()
+    db_question = await db.get(Question, question_id)
     if not db_question:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -108,82 +145,27 @@ async def delete_question(
         )
     
     db_question.is_active = False
-    db.commit()
+    await db.commit()
     return {"message": "Question deleted successfully"}
 
 @router.post("/responses")
 async def save_responses(
     request: SaveResponseRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Save user responses for questions"""
     try:
-        # Delete existing responses for these questions
-        question_ids = [response.question_id for response in request.responses]
-        db.query(UserResponse).filter(
-            UserResponse.user_id == current_user.id,
-            UserResponse.question_id.in_(question_ids)
-        ).delete(synchronize_session=False)
-        
-        # Create new responses
-        for response in request.responses:
-            db_response = UserResponse(
-                user_id=current_user.id,
-                question_id=response.question_id,
-                response_value=response.answer
-            )
-            db.add(db_response)
+        # Upsert all answers in one statement; the last answer wins for repeated questions
+        answers = {response.question_id: response.answer for response in request.responses}
+        await save_user_responses(db, current_user.id, answers)
         
-        db.commit()
+        await db.commit()
         return {"message": "Responses saved successfully"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving responses: {str(e)}"
-        ) 
-
-@router.get("/user-responses", response_model=List[UserResponseSchema])
-async def get_user_responses(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all responses for the current user"""
-    try:
-        # Get user responses and convert to schema format
-        db_responses = db.query(UserResponse).filter(
-            UserResponse.user_id == current_user.id
-        ).all()
-        
-        # Map database model to response schema
-        responses = []
-        for response in db_responses:
-            try:
-                print(f"Converting response {response.id}:")
-                print(f"  - question_id: {response.question_id}")
-                print(f"  - response_value (raw): {response.response_value}")
-                print(f"  - response_value type: {type(response.response_value)}")
-                
-                # Get the question text for this response
-                question = db.query(Question).filter(Question.id == response.question_id).first()
-                if question:
-                    print(f"  - question_text: {question.text}")
-                    print(f"  - is_fullname: {question.text == 'What is your full name?'}")
-                
-                responses.append(UserResponseSchema(
-                    question_id=response.question_id,
-                    answer=response.response_value
-                ))
-            except Exception as e:
-                print(f"Error converting response {response.id}: {str(e)}")
-                continue
-        
-        return responses
-    except Exception as e:
-        print(f"Error fetching user responses: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching user responses: {str(e)}"
-        ) 
\ No newline at end of file
+        )
@@ -1,24 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from ..database import get_db
 from ..models.models import User
-from ..schemas.user import UserCreate, UserResponse, UserLogin
+from ..schemas.user import UserCreate, UserResponse, UserLogin, TokenRefresh
+from ..schemas.pagination import Page
+from ..core.pagination import PageParams, paginate
 from ..services.auth import (
-    get_password_hash, 
-    create_access_token, 
+    get_password_hash_async, 
+    issue_tokens,
+    refresh_tokens,
     authenticate_user,
-    get_current_user
+    get_current_user,
+    get_current_reader
 )
+from ..services.auth_cache import AuthUser
+from ..services.read_replica import get_read_db
+from ..middleware.http_cache import conditional_get
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a regular user"""
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -26,7 +34,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new regular user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -34,8 +42,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         is_approved=False  # Needs admin approval
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return {
         "id": db_user.id,
@@ -49,8 +57,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/register/admin", response_model=UserResponse)
 async def register_admin(
     user: UserCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Register an admin user (only existing admins can create new admins)"""
     # Check if current user is admin
@@ -61,7 +69,7 @@ async def register_admin(
         )
 
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,7 +77,7 @@ async def register_admin(
         )
     
     # Create new admin user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -77,8 +85,8 @@ async def register_admin(
         is_approved=True  # Admin users are automatically approved
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return UserResponse.model_validate({
         "id": db_user.id,
@@ -89,17 +97,17 @@ async def register_admin(
     })
 
 @router.post("/register/first-admin", response_model=UserResponse)
-async def register_first_admin(user: UserCreate, db: Session = Depends(get_db)):
+async def register_first_admin(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register the first admin user (only works if no users exist in the system)"""
     # Check if any users exist
-    if db.query(User).first():
+    if await db.scalar(select(User.id).limit(1)) is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot create first admin - users already exist"
         )
     
     # Create first admin user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -107,8 +115,8 @@ async def register_first_admin(user: UserCreate, db: Session = Depends(get_db)):
         is_approved=True  # Admin users are automatically approved
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return UserResponse.model_validate({
         "id": db_user.id,
@@ -121,10 +129,10 @@ async def register_first_admin(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await authenticate_user(db, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,14 +140,8 @@ async def login(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Create access token using user ID instead of email
-        access_token = create_access_token(
-            data={"sub": str(user.id)}  # Convert ID to string for JWT
-        )
-        
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **issue_tokens(user),
             "user": {
                 "id": user.id,
                 "email": user.email,
@@ -155,21 +157,30 @@ async def login(
             )
         raise e
 
+@router.post("/refresh")
+async def refresh_access_token(body: TokenRefresh, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for new tokens carrying the user's current role and approval"""
+    return await refresh_tokens(db, body.refresh_token)
+
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    user = await db.get(User, current_user.id)
     return UserResponse.model_validate({
-        "id": current_user.id,
-        "email": current_user.email,
-        "is_admin": current_user.is_admin,
-        "is_active": current_user.is_active,
-        "created_at": current_user.created_at
+        "id": user.id,
+        "email": user.email,
+        "is_admin": user.is_admin,
+        "is_active": user.is_active,
+        "created_at": user.created_at
     })
 
 @router.put("/toggle-admin/{user_id}", response_model=UserResponse)
 async def toggle_admin_status(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Toggle admin status of a user (only admins can do this)"""
     # Check if current user is admin
@@ -187,7 +198,7 @@ async def toggle_admin_status(
         )
     
     # Get the target user
-    target_user = db.query(User).filter(User.id == user_id).first()
+    target_user = await db.get(User, user_id)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -198,8 +209,10 @@ async def toggle_admin_status(
     target_user.is_admin = not target_user.is_admin
     if target_user.is_admin:
         target_user.is_approved = True  # Automatically approve admin users
-    db.commit()
-    db.refresh(target_user)
+    else:
+        target_user.token_version = (target_user.token_version or 0) + 1  # Their tokens still claim admin
+    await db.commit()
+    await db.refresh(target_user)
     
     return UserResponse.model_validate({
         "id": target_user.id,
@@ -209,10 +222,11 @@ async def toggle_admin_status(
         "created_at": target_user.created_at
     })
 
-@router.get("/all", response_model=List[UserResponse])
+@router.get("/all", response_model=Page[UserResponse], dependencies=[Depends(conditional_get)])
 async def get_all_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_reader)
 ):
     """Get all users (admin only)"""
     if not current_user.is_admin:
@@ -221,20 +235,19 @@ async def get_all_users(
             detail="Only admins can view all users"
         )
     
-    users = db.query(User).all()
-    return [UserResponse.model_validate({
+    return await paginate(db, select(User), [User.id], page, "users", transform=lambda user: UserResponse.model_validate({
         "id": user.id,
         "email": user.email,
         "is_admin": user.is_admin,
         "is_active": user.is_active,
         "created_at": user.created_at
-    }) for user in users]
+    }))
 
 @router.put("/toggle-active/{user_id}", response_model=UserResponse)
 async def toggle_active_status(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Toggle active status of a user (only admins can do this)"""
     # Check if current user is admin
@@ -245,7 +258,7 @@ async def toggle_active_status(
         )
     
     # Get the target user
-    target_user = db.query(User).filter(User.id == user_id).first()
+    target_user = await db.get(User, user_id)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -256,8 +269,9 @@ async def toggle_active_status(
     target_user.is_active = not target_user.is_active
     if not target_user.is_active:
         target_user.is_approved = False  # Automatically unapprove inactive users
-    db.commit()
-    db.refresh(target_user)
+        target_user.token_version = (target_user.token_version or 0) + 1  # Revoke their tokens
+    await db.commit()
+    await db.refresh(target_user)
     
     return UserResponse.model_validate({
         "id": target_user.id,
@@ -33,4 +33,27 @@ class MealPlanResponse(BaseModel):
     end_date: Optional[datetime]
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+class MacroSummary(BaseModel):
+    protein: Optional[int] = None
+    carbs: Optional[int] = None
+    fats: Optional[int] = None
+
+class MealPlanSummaryResponse(BaseModel):
+    id: int
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    is_active: bool
+    start_date: datetime
+    end_date: Optional[datetime]
+    daily_calories: Optional[int]
+    macros: MacroSummary
+    day_count: Optional[int]
+    meal_count: Optional[int]
+
+class MealPlanDayResponse(BaseModel):
+    meal_plan_id: int
+    week: str
+    day: str
+    meals: Dict[str, Any]
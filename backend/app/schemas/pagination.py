@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """Envelope for cursor-paginated listings"""
+    items: List[T]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; null on the last page
+    limit: int
+    total_estimate: Optional[int] = None  # Planner estimate, only when include_total=true
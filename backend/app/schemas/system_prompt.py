@@ -1,11 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
 
 class SystemPromptBase(BaseModel):
     name: str
     prompt_text: str
     description: Optional[str] = None
+    experiment: Optional[str] = None
+    traffic_weight: int = Field(100, ge=0)
 
 class SystemPromptCreate(SystemPromptBase):
     pass
@@ -15,6 +17,8 @@ class SystemPromptUpdate(BaseModel):
     prompt_text: Optional[str] = None
     description: Optional[str] = None
     is_active: Optional[bool] = None
+    experiment: Optional[str] = None
+    traffic_weight: Optional[int] = Field(None, ge=0)
 
 class SystemPrompt(SystemPromptBase):
     id: int
@@ -24,4 +28,17 @@ class SystemPrompt(SystemPromptBase):
     created_by_id: int
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+class PromptCandidate(BaseModel):
+    label: str
+    prompt_text: str
+
+class PromptEvaluationRequest(BaseModel):
+    prompt_ids: List[int] = []
+    candidate_prompts: List[PromptCandidate] = []
+    include_active: bool = True
+    sample_size: int = Field(20, ge=1)
+    concurrency: int = Field(5, ge=1)
+    provider: Optional[str] = None
+    profile_format: Optional[str] = None
+    seed: Optional[int] = None
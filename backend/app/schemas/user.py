@@ -11,6 +11,9 @@ class UserLogin(UserBase):
 class UserCreate(UserLogin):
     pass
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
 class UserResponse(UserBase):
     id: int
     is_admin: bool
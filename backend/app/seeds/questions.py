@@ -1,6 +1,4 @@
-from ..models.models import Question, QuestionCategory, QuestionType
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
+from ..models.models import QuestionCategory, QuestionType
 
 QUESTIONS_SEED = [
     # Personal Information Section
@@ -367,7 +365,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.dailyMeals.morningSnack.description",
         "validation": {"required": False},
-        "order": 33.5,
+        "order": 34,
         "is_active": True
     },
     {
@@ -376,7 +374,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "foodIntake.dailyMeals.morningSnack.isHomeCooked",
         "validation": {"required": False},
-        "order": 33.6,
+        "order": 35,
         "is_active": True
     },
     {
@@ -385,7 +383,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.dailyMeals.lunch.description",
         "validation": {"required": True},
-        "order": 34,
+        "order": 36,
         "is_active": True
     },
     {
@@ -394,7 +392,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "foodIntake.dailyMeals.lunch.isHomeCooked",
         "validation": {"required": False},
-        "order": 35,
+        "order": 37,
         "is_active": True
     },
     {
@@ -403,7 +401,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.dailyMeals.afternoonSnack.description",
         "validation": {"required": False},
-        "order": 35.5,
+        "order": 38,
         "is_active": True
     },
     {
@@ -412,7 +410,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "foodIntake.dailyMeals.afternoonSnack.isHomeCooked",
         "validation": {"required": False},
-        "order": 35.6,
+        "order": 39,
         "is_active": True
     },
     {
@@ -421,7 +419,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.dailyMeals.dinner.description",
         "validation": {"required": True},
-        "order": 36,
+        "order": 40,
         "is_active": True
     },
     {
@@ -430,7 +428,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "foodIntake.dailyMeals.dinner.isHomeCooked",
         "validation": {"required": False},
-        "order": 37,
+        "order": 41,
         "is_active": True
     },
     {
@@ -439,7 +437,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.dislikedFoods",
         "validation": {"required": True},
-        "order": 38,
+        "order": 42,
         "is_active": True
     },
     {
@@ -448,7 +446,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "foodIntake.likedFoods",
         "validation": {"required": True},
-        "order": 39,
+        "order": 43,
         "is_active": True
     },
     
@@ -460,7 +458,7 @@ QUESTIONS_SEED = [
         "field_key": "workoutRoutine.weightLifting.frequency",
         "options": ["never", "1-2_times", "3-4_times", "5+_times"],
         "validation": {"required": True},
-        "order": 40,
+        "order": 44,
         "is_active": True
     },
     {
@@ -469,7 +467,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "workoutRoutine.weightLifting.type",
         "validation": {"required": True},
-        "order": 41,
+        "order": 45,
         "is_active": True
     },
     {
@@ -479,7 +477,7 @@ QUESTIONS_SEED = [
         "field_key": "workoutRoutine.cardio.frequency",
         "options": ["never", "1-2_times", "3-4_times", "5+_times"],
         "validation": {"required": True},
-        "order": 42,
+        "order": 46,
         "is_active": True
     },
     {
@@ -488,7 +486,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "workoutRoutine.cardio.type",
         "validation": {"required": True},
-        "order": 43,
+        "order": 47,
         "is_active": True
     },
     {
@@ -498,7 +496,7 @@ QUESTIONS_SEED = [
         "field_key": "workoutRoutine.yogaPilates.frequency",
         "options": ["never", "1-2_times", "3-4_times", "5+_times"],
         "validation": {"required": False},
-        "order": 44,
+        "order": 48,
         "is_active": True
     },
     {
@@ -507,7 +505,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "workoutRoutine.yogaPilates.type",
         "validation": {"required": False},
-        "order": 45,
+        "order": 49,
         "is_active": True
     },
     {
@@ -520,7 +518,7 @@ QUESTIONS_SEED = [
             "min": 0,
             "max": 24
         },
-        "order": 46,
+        "order": 50,
         "is_active": True
     },
     {
@@ -530,7 +528,7 @@ QUESTIONS_SEED = [
         "field_key": "workoutRoutine.sleep.quality",
         "options": ["poor", "fair", "good", "excellent"],
         "validation": {"required": True},
-        "order": 47,
+        "order": 51,
         "is_active": True
     },
     {
@@ -540,7 +538,7 @@ QUESTIONS_SEED = [
         "field_key": "workoutRoutine.sleep.dreaming",
         "options": ["never", "rarely", "sometimes", "often"],
         "validation": {"required": True},
-        "order": 48,
+        "order": 52,
         "is_active": True
     },
     
@@ -555,7 +553,7 @@ QUESTIONS_SEED = [
             "min": 1,
             "max": 10
         },
-        "order": 49,
+        "order": 53,
         "is_active": True
     },
     {
@@ -564,7 +562,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "stressLevels.endInSight",
         "validation": {"required": True},
-        "order": 50,
+        "order": 54,
         "is_active": True
     },
     {
@@ -573,7 +571,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.TEXT,
         "field_key": "stressLevels.managementTechniques",
         "validation": {"required": True},
-        "order": 51,
+        "order": 55,
         "is_active": True
     },
     {
@@ -583,7 +581,7 @@ QUESTIONS_SEED = [
         "field_key": "stressLevels.recalibrationMethods",
         "options": ["Yoga", "Deep Breathing", "Meditation", "Exercise", "Other"],
         "validation": {"required": False},
-        "order": 52,
+        "order": 56,
         "is_active": True
     },
     
@@ -594,7 +592,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "toxicityLifestyle.tobaccoUse",
         "validation": {"required": True},
-        "order": 53,
+        "order": 57,
         "is_active": True
     },
     {
@@ -604,7 +602,7 @@ QUESTIONS_SEED = [
         "field_key": "toxicityLifestyle.cravings",
         "options": ["Sugar", "Salt", "Caffeine", "Carbs", "Other"],
         "validation": {"required": False},
-        "order": 54,
+        "order": 58,
         "is_active": True
     },
     {
@@ -613,7 +611,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "toxicityLifestyle.plasticWaterBottles",
         "validation": {"required": True},
-        "order": 55,
+        "order": 59,
         "is_active": True
     },
     {
@@ -626,7 +624,7 @@ QUESTIONS_SEED = [
             "min": 0,
             "max": 100
         },
-        "order": 56,
+        "order": 60,
         "is_active": True
     },
     {
@@ -636,7 +634,7 @@ QUESTIONS_SEED = [
         "field_key": "toxicityLifestyle.organicFoodsUse",
         "options": ["never", "sometimes", "mostly", "always"],
         "validation": {"required": True},
-        "order": 57,
+        "order": 61,
         "is_active": True
     },
     {
@@ -646,7 +644,7 @@ QUESTIONS_SEED = [
         "field_key": "toxicityLifestyle.householdProducts",
         "options": ["Microwaves", "Air Fresheners", "Chemical Cleaners", "Plastic Containers", "Other"],
         "validation": {"required": False},
-        "order": 58,
+        "order": 62,
         "is_active": True
     },
     
@@ -657,43 +655,7 @@ QUESTIONS_SEED = [
         "question_type": QuestionType.BOOLEAN,
         "field_key": "waiver.agreement",
         "validation": {"required": True},
-        "order": 59,
+        "order": 63,
         "is_active": True
     }
-] 
-
-def seed_questions(db: Session):
-    """Seed the questions table with initial data"""
-    from ..models.models import Question
-    
-    # First, check if questions already exist
-    existing_questions = db.query(Question).count()
-    print(f"Found {existing_questions} existing questions")
-    
-    if existing_questions == 0:
-        try:
-            # Create Question objects from the seed data
-            for question_data in QUESTIONS_SEED:
-                print(f"Seeding question: {question_data['text']}")
-                question = Question(
-                    text=question_data["text"],
-                    category=question_data["category"],
-                    question_type=question_data["question_type"],
-                    options=question_data.get("options"),
-                    validation=question_data["validation"],
-                    order=question_data["order"],
-                    is_active=question_data["is_active"],
-                    field_key=question_data["field_key"]
-                )
-                db.add(question)
-            
-            # Commit the changes
-            db.commit()
-            print(f"Successfully seeded {len(QUESTIONS_SEED)} questions")
-            
-        except Exception as e:
-            print(f"Error seeding questions: {e}")
-            db.rollback()
-            raise e
-    else:
-        print("Questions already exist in database. Skipping seeding.") 
\ No newline at end of file
+]
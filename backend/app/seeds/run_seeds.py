@@ -1,54 +1,115 @@
+import asyncio
+import enum
+from typing import Any, Dict, List, Optional
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
-from ..models.models import Question, UserResponse
-from .questions import QUESTIONS_SEED
-from sqlalchemy import text
+from ..models.models import Question
+from ..services.stats import apply_counter_deltas
+from ..services.user_profiles import invalidate_path_index
 
-def get_db():
+# Question seeding.
+#
+# The seed is upserted by field_key in one statement, so running it again is
+# cheap. Each question records the values the seed last wrote (seed_values),
+# and a change to the seed is rolled out to a column only while the column
+# still holds that value: text an admin edited or an order an admin changed
+# is kept. A run with nothing to roll out writes nothing. is_active is only
+# set when a question is first inserted: a question an admin deactivated
+# stays deactivated, and questions that are not in the seed are left alone.
+# Run it as a deploy step (python seed.py) or let the API run it once in the
+# background after startup (DEBUG or SEED_ON_STARTUP).
+
+# Columns the seed keeps in sync on existing questions
+SEEDED_COLUMNS = ("text", "category", "question_type", "options", "validation", "order")
+
+def seeded_value(value: Any) -> Any:
+    """A column value as seed_values holds it: JSON, enums by name as the column stores them"""
+    return value.name if isinstance(value, enum.Enum) else value
+
+def rolled_out(seed: Dict[str, Any], current: Dict[str, Any], recorded: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The seeded columns and seed_values an existing question should have, or
+    None when neither changes. Questions seeded before seed_values existed take
+    their current values as what the seed last wrote.
+    """
+    baseline = dict(current) if recorded is None else {name: recorded.get(name) for name in SEEDED_COLUMNS}
+    target, record = dict(current), dict(baseline)
+    for name in SEEDED_COLUMNS:
+        if current[name] == baseline[name] and seed[name] != current[name]:
+            target[name] = record[name] = seed[name]
+    if target == current and record == recorded:
+        return None
+    return {**target, "seed_values": record}
+
+def upsert_questions(db: Session, seed: Optional[List[Dict]] = None) -> Dict[str, int]:
+    """Insert missing seed questions and roll out seed changes; returns the counts, the caller commits"""
+    if seed is None:
+        # Imported on use, so importing the app does not load the seed data
+        from .questions import QUESTIONS_SEED
+        seed = QUESTIONS_SEED
+    columns = [Question.__table__.c[name] for name in SEEDED_COLUMNS]
+    existing = {row.field_key: row._mapping for row in db.execute(select(Question.field_key, Question.seed_values, *columns))}
+
+    rows = []
+    for question in seed:
+        values = {name: seeded_value(question.get(name)) for name in SEEDED_COLUMNS}
+        row = existing.get(question["field_key"])
+        if row is not None:
+            values = rolled_out(values, {name: seeded_value(row[name]) for name in SEEDED_COLUMNS}, row["seed_values"])
+            if values is None:
+                continue
+        else:
+            values["seed_values"] = dict(values)
+        rows.append({**values, "field_key": question["field_key"], "is_active": question.get("is_active", True)})
+
+    inserted = inserted_active = 0
+    if rows:
+        dialect = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(Question).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Question.field_key],
+            set_={name: stmt.excluded[name] for name in (*SEEDED_COLUMNS, "seed_values")}
+        )
+        if dialect == "postgresql":
+            # xmax is 0 for freshly inserted rows, so workers seeding at the same time each count only their own inserts
+            returned = db.execute(stmt.returning(Question.is_active, literal_column("(xmax = 0)").label("inserted"))).all()
+            inserted = sum(1 for row in returned if row.inserted)
+            inserted_active = sum(1 for row in returned if row.inserted and row.is_active)
+        else:
+            # SQLite has no xmax; the snapshot read above tells the new questions apart
+            db.execute(stmt)
+            new_rows = [row for row in rows if row["field_key"] not in existing]
+            inserted = len(new_rows)
+            inserted_active = sum(1 for row in new_rows if row["is_active"])
+        # Core inserts bypass the stats listener
+        apply_counter_deltas(db.connection(), {"questions_total": inserted, "questions_active": inserted_active})
+        invalidate_path_index()
+    return {"inserted": inserted, "updated": len(rows) - inserted, "unchanged": len(seed) - len(rows)}
+
+def run_all_seeds() -> Dict[str, int]:
     db = SessionLocal()
     try:
-        yield db
+        result = upsert_questions(db)
+        db.commit()
+        print(f"Questions seeded: {result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged")
+        return result
+    except Exception as e:
+        print(f"Error during seeding: {str(e)}")
+        db.rollback()
+        raise
     finally:
         db.close()
 
-def run_all_seeds():
-    db = next(get_db())
+async def run_seeds_in_background() -> None:
+    """One-time startup task; seeding failures leave the existing questions in place"""
     try:
-        # Check if questions already exist
-        initial_count = db.query(Question).count()
-        print(f"Current question count: {initial_count}")
-        
-        if initial_count == 0:
-            print("No questions found. Starting fresh seeding...")
-            print(f"About to seed {len(QUESTIONS_SEED)} questions")
-            
-            # Create new questions
-            print("Creating new questions...")
-            for question_data in QUESTIONS_SEED:
-                question = Question(**question_data)
-                db.add(question)
-            
-            db.commit()
-            
-            # Verify seeding
-            final_count = db.query(Question).count()
-            print(f"Final question count: {final_count}")
-            
-            if final_count != len(QUESTIONS_SEED):
-                print("WARNING: Number of questions in database doesn't match seed data!")
-                print(f"Expected {len(QUESTIONS_SEED)} questions but found {final_count}")
-                return
-            
-            print("Database seeding completed successfully!")
-        else:
-            print(f"Questions already exist in database. Skipping seeding.")
-        
+        await asyncio.to_thread(run_all_seeds)
     except Exception as e:
-        print(f"Error during operation: {str(e)}")
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+        print(f"Warning: Database seeding failed: {str(e)}")
+        print("Application will continue with existing database state")
 
 if __name__ == "__main__":
-    run_all_seeds() 
\ No newline at end of file
+    run_all_seeds()
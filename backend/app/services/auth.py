@@ -1,31 +1,65 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import AsyncSessionLocal, get_db
+from ..core import metrics
 from ..core.config import get_settings
 from ..models.models import User
+from .auth_cache import AuthUser, auth_user_query, revocations, to_auth_user, user_cache
+from .password_hashing import password_pool
+from .read_replica import get_read_db, is_replica_session
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# With min rounds at BCRYPT_ROUNDS passlib flags cheaper hashes for rehashing. There is no max (and
+# bcrypt__rounds would set one): lowering BCRYPT_ROUNDS, e.g. after calibrating on a slower machine,
+# must not weaken existing hashes.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/login")
 
+password_rehashed_total = metrics.counter("password_rehashed_total", "Stored password hashes upgraded to the current cost at login")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = db.query(User).filter(User.email == email).first()
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the bcrypt pool; also returns a new hash when the stored one uses an outdated cost or scheme"""
+    return await password_pool.run("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt pool, for async routes"""
+    return await password_pool.run("hash", get_password_hash, password)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    # Admins skip the approval check below, so deactivation has to be checked on its own
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account has been deactivated"
+        )
+    if new_hash is not None:
+        # Transparent rehash with the current cost, only possible while we hold the plain password
+        user.hashed_password = new_hash
+        await db.commit()
+        password_rehashed_total.inc()
     if not user.is_admin and not user.is_approved:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -41,11 +75,73 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user from JWT token"""
+def token_claims(user: User) -> dict:
+    """Claims that let requests authenticate without loading the user"""
+    return {
+        "sub": str(user.id),  # Convert ID to string for JWT
+        "ver": user.token_version or 0,
+        "adm": bool(user.is_admin),
+        "apr": bool(user.is_approved),
+        "act": bool(user.is_active)
+    }
+
+def create_refresh_token(user: User) -> str:
+    """Long-lived token that can only be exchanged for new tokens, checked against the database"""
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {"sub": str(user.id), "ver": user.token_version or 0, "typ": "refresh", "exp": expire}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def issue_tokens(user: User) -> dict:
+    return {
+        "access_token": create_access_token(data=token_claims(user)),
+        "refresh_token": create_refresh_token(user),
+        "token_type": "bearer"
+    }
+
+async def refresh_tokens(db: AsyncSession, refresh_token: str) -> dict:
+    """New access and refresh tokens for a valid refresh token, with the user's current claims"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if payload.get("typ") != "refresh":
+            raise credentials_exception
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise credentials_exception
+
+    user = await db.get(User, user_id)
+    if user is None or payload.get("ver", 0) != (user.token_version or 0) or not user.is_active:
+        raise credentials_exception
+    if not user.is_admin and not user.is_approved:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Your account is pending approval"
+        )
+    return issue_tokens(user)
+
+async def _load_auth_user(user_id: int, db: AsyncSession) -> Optional[AuthUser]:
+    """The user's auth fields from the cache, or from the primary database on a miss"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    generation = user_cache.generation
+    if is_replica_session(db):
+        # Only cache what the primary says; the replica may not have an approval or revocation yet
+        async with AsyncSessionLocal() as primary_db:
+            row = (await primary_db.execute(auth_user_query(user_id))).first()
+    else:
+        row = (await db.execute(auth_user_query(user_id))).first()
+    if row is None:
+        return None
+    user = to_auth_user(row)
+    user_cache.put(user, generation)
+    return user
+
+async def _user_from_token(token: str, db: AsyncSession) -> AuthUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,9 +156,27 @@ async def get_current_user(
         user_id = int(user_id)
     except (JWTError, ValueError):
         raise credentials_exception
-        
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    if payload.get("typ", "access") != "access":
+        raise credentials_exception
+
+    version = payload.get("ver", 0)
+    if "adm" in payload and revocations.loaded:
+        # Signed claims: no database read, only the revocation map
+        if revocations.is_revoked(user_id, version):
+            raise credentials_exception
+        user = AuthUser(
+            id=user_id, is_admin=payload["adm"], is_active=payload.get("act", False),
+            is_approved=payload.get("apr", False), token_version=version
+        )
+    else:
+        user = await _load_auth_user(user_id, db)
+        if user is None:
+            raise credentials_exception
+        # Tokens issued before the user's token version was bumped (e.g. on deactivation) are revoked
+        if version != user.token_version:
+            raise credentials_exception
+    # Deactivated users, admins included: deactivation also bumps the version, this covers the rest
+    if not user.is_active:
         raise credentials_exception
 
     # Check if user is approved (unless they're an admin)
@@ -74,10 +188,35 @@ async def get_current_user(
         
     return user
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> AuthUser:
+    """Get current user from JWT token"""
+    return await _user_from_token(token, db)
+
+async def get_current_reader(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db)
+) -> AuthUser:
+    """get_current_user for read-only endpoints"""
+    return await _user_from_token(token, db)
+
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: AuthUser = Depends(get_current_user)
+) -> AuthUser:
     """Check if current user is admin"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can access this resource"
+        )
+    return current_user
+
+async def get_current_admin_reader(
+    current_user: AuthUser = Depends(get_current_reader)
+) -> AuthUser:
+    """get_current_admin_user for read-only endpoints"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
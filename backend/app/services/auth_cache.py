@@ -0,0 +1,237 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+from ..core import metrics
+from ..core.config import get_settings
+from ..database import AsyncSessionLocal, async_engine
+from ..models.models import User
+
+settings = get_settings()
+
+# Per-process state behind authentication.
+#
+# Access tokens carry signed claims (admin, approved, active) and the user's
+# token_version, so a request is authenticated without reading the user: the
+# only check left is the revocation map below, which holds the current
+# token_version of every user whose tokens were ever revoked (deactivated,
+# rejected, admin revoked) and marks recently deleted users. It is a few bytes
+# per revoked user, so a plain dict is smaller and exact where a bloom filter
+# would need false-positive handling. Commits update this worker's map
+# directly; on PostgreSQL a NOTIFY in the same transaction updates the other
+# workers, and the whole map is reloaded every AUTH_REVOCATION_REFRESH_SECONDS
+# in case a notification was missed.
+#
+# Tokens without claims (issued before this release, or by scripts) still
+# resolve through the user cache: the small projection below per user id for
+# AUTH_CACHE_TTL_SECONDS, evicting the least recently used entries beyond
+# AUTH_CACHE_SIZE, invalidated the same way.
+
+CHANNEL = "auth_user_changed"
+AUTH_FIELDS = ("is_admin", "is_active", "is_approved", "token_version")
+LISTEN_RETRY_SECONDS = 5
+# NOTIFY payload version for a deleted user
+DELETED = -1
+
+lookups_total = metrics.counter("auth_user_cache_lookups_total", "Authenticated user lookups", ("result",))  # hit, miss, expired
+invalidations_total = metrics.counter("auth_user_cache_invalidations_total", "Cached users dropped", ("source",))  # local, notify, reconnect
+revoked_total = metrics.counter("auth_revoked_tokens_rejected_total", "Requests refused because their token was revoked")
+listener_connected = metrics.gauge("auth_user_cache_listener_connected", "Whether this worker receives invalidations from other workers")
+
+@dataclass(frozen=True)
+class AuthUser:
+    """What authentication knows about the current user; routes needing more load the User row"""
+    id: int
+    is_admin: bool
+    is_active: bool
+    is_approved: bool
+    token_version: int
+
+class UserCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[AuthUser, float]]" = OrderedDict()
+        # Bumped by every invalidation, so a lookup racing one does not store what it read before it
+        self.generation = 0
+
+    def get(self, user_id: int) -> Optional[AuthUser]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            lookups_total.inc(result="miss")
+            return None
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            lookups_total.inc(result="expired")
+            return None
+        self._entries.move_to_end(user_id)
+        lookups_total.inc(result="hit")
+        return user
+
+    def put(self, user: AuthUser, generation: int) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0 or generation != self.generation:
+            return
+        self._entries[user.id] = (user, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, source: str = "local") -> None:
+        self.generation += 1
+        self._entries.pop(user_id, None)
+        invalidations_total.inc(source=source)
+
+    def clear(self, source: str = "reconnect") -> None:
+        self.generation += 1
+        invalidations_total.inc(len(self._entries), source=source)
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+user_cache = UserCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+metrics.gauge("auth_user_cache_entries", "Users in this worker's auth cache").set_function(lambda: len(user_cache))
+
+class RevocationMap:
+    """Current token_version of users with revoked tokens, and recently deleted users"""
+    def __init__(self, deleted_retention_seconds: float):
+        self._versions: Dict[int, int] = {}
+        self._deleted: Dict[int, float] = {}
+        # Deleted users stay marked until tokens issued before the deletion have expired
+        self.deleted_retention_seconds = deleted_retention_seconds
+        self.loaded = False
+        self.loaded_at: Optional[float] = None
+
+    def is_revoked(self, user_id: int, version: int) -> bool:
+        revoked = user_id in self._deleted or version < self._versions.get(user_id, 0)
+        if revoked:
+            revoked_total.inc()
+        return revoked
+
+    def update(self, user_id: int, version: int) -> None:
+        if version == DELETED:
+            self._deleted[user_id] = time.monotonic()
+        elif version > 0:
+            self._versions[user_id] = max(version, self._versions.get(user_id, 0))
+
+    def replace(self, versions: Iterable[Tuple[int, int]]) -> None:
+        now = time.monotonic()
+        self._versions = {user_id: version for user_id, version in versions}
+        self._deleted = {
+            user_id: deleted_at for user_id, deleted_at in self._deleted.items()
+            if now - deleted_at < self.deleted_retention_seconds
+        }
+        self.loaded = True
+        self.loaded_at = now
+
+    def __len__(self) -> int:
+        return len(self._versions) + len(self._deleted)
+
+revocations = RevocationMap(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+metrics.gauge("auth_revocation_entries", "Users in this worker's token revocation map").set_function(lambda: len(revocations))
+
+def auth_user_query(user_id: int):
+    return select(User.id, User.is_admin, User.is_active, User.is_approved, User.token_version).where(User.id == user_id)
+
+def to_auth_user(row) -> AuthUser:
+    return AuthUser(
+        id=row.id, is_admin=bool(row.is_admin), is_active=bool(row.is_active),
+        is_approved=bool(row.is_approved), token_version=row.token_version or 0
+    )
+
+def cache_stats() -> Dict:
+    counts = lookups_total.snapshot()
+    lookups = sum(counts.values())
+    return {
+        "entries": len(user_cache),
+        "max_size": user_cache.max_size,
+        "ttl_seconds": user_cache.ttl_seconds,
+        "lookups": counts,
+        "hit_rate": round(counts.get("hit", 0) / lookups, 4) if lookups else None,
+        "invalidations": invalidations_total.snapshot(),
+        "revocations": {
+            "entries": len(revocations),
+            "loaded_seconds_ago": round(time.monotonic() - revocations.loaded_at, 1) if revocations.loaded else None,
+            "rejected": revoked_total.snapshot().get("value", 0)
+        },
+        "listening": bool(listener_connected.snapshot().get("value"))
+    }
+
+async def reload_revocations() -> None:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(User.id, User.token_version).where(User.token_version > 0))
+        revocations.replace(rows.tuples())
+
+async def refresh_revocations_periodically() -> None:
+    """Background task started by the API: load the revocation map, then keep reloading it"""
+    while True:
+        try:
+            await reload_revocations()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Auth cache] Revocation reload failed: {str(e)}")
+        await asyncio.sleep(settings.AUTH_REVOCATION_REFRESH_SECONDS)
+
+@event.listens_for(Session, "after_flush")
+def collect_auth_changes(session: Session, flush_context) -> None:
+    """Note users whose auth fields changed or who were deleted, and tell the other workers on commit"""
+    changed = {
+        obj.id: obj.token_version or 0 for obj in session.dirty
+        if isinstance(obj, User) and any(inspect(obj).attrs[name].history.has_changes() for name in AUTH_FIELDS)
+    }
+    changed.update((obj.id, DELETED) for obj in session.deleted if isinstance(obj, User))
+    if not changed:
+        return
+    session.info.setdefault("auth_changed_users", {}).update(changed)
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        # Delivered only if the transaction commits
+        for user_id, version in changed.items():
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": f"{user_id}:{version}"})
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session: Session) -> None:
+    for user_id, version in session.info.pop("auth_changed_users", {}).items():
+        user_cache.invalidate(user_id)
+        revocations.update(user_id, version)
+
+@event.listens_for(Session, "after_rollback")
+def forget_rolled_back(session: Session) -> None:
+    session.info.pop("auth_changed_users", None)
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    try:
+        user_id, version = (int(part) for part in payload.split(":"))
+    except ValueError:
+        return
+    user_cache.invalidate(user_id, source="notify")
+    revocations.update(user_id, version)
+
+async def listen_for_invalidations() -> None:
+    """Background task started by the API on PostgreSQL: apply other workers' invalidations"""
+    while True:
+        try:
+            async with async_engine.connect() as connection:
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.add_listener(CHANNEL, _on_notification)
+                # Notifications missed while disconnected cannot be replayed
+                user_cache.clear()
+                await reload_revocations()
+                listener_connected.set(1)
+                try:
+                    while not raw.driver_connection.is_closed():
+                        await asyncio.sleep(LISTEN_RETRY_SECONDS)
+                finally:
+                    listener_connected.set(0)
+                    if not raw.driver_connection.is_closed():
+                        await raw.driver_connection.remove_listener(CHANNEL, _on_notification)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Auth cache] Invalidation listener failed: {str(e)}")
+        await asyncio.sleep(LISTEN_RETRY_SECONDS)
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import json
+import random
+from typing import Dict, List
+from ..core.config import get_settings
+from .token_estimator import estimate_tokens
+
+settings = get_settings()
+
+# Local stand-in for the OpenAI provider. It produces deterministic, plausible
+# meal plans so prompt changes can be exercised without API cost or network access.
+
+MEAL_LIBRARY = {
+    'breakfast': [
+        ("Greek yogurt with berries", "1 cup yogurt, 1/2 cup berries", 250),
+        ("Oatmeal with banana", "1 cup oats, 1 banana", 350),
+        ("Spinach omelette", "3 eggs, 1 cup spinach", 320),
+        ("Avocado toast", "2 slices, 1/2 avocado", 380),
+        ("Protein smoothie", "1 scoop protein, 1 cup almond milk", 300),
+    ],
+    'morning_snack': [
+        ("Apple with almond butter", "1 apple, 1 tbsp almond butter", 180),
+        ("Handful of almonds", "1 oz", 160),
+        ("Cottage cheese", "1/2 cup", 110),
+        ("Carrot sticks with hummus", "1 cup carrots, 2 tbsp hummus", 140),
+    ],
+    'lunch': [
+        ("Grilled chicken salad", "150g chicken, 2 cups greens", 450),
+        ("Quinoa bowl with chickpeas", "1 cup quinoa, 1/2 cup chickpeas", 520),
+        ("Turkey wrap", "1 whole wheat wrap, 100g turkey", 480),
+        ("Salmon poke bowl", "120g salmon, 1 cup rice", 560),
+        ("Lentil soup", "2 cups", 410),
+    ],
+    'afternoon_snack': [
+        ("Protein bar", "1 bar", 220),
+        ("Trail mix", "1/4 cup", 200),
+        ("Hard-boiled eggs", "2 eggs", 150),
+        ("Rice cakes with peanut butter", "2 cakes, 1 tbsp peanut butter", 190),
+    ],
+    'dinner': [
+        ("Baked salmon with asparagus", "150g salmon, 1 cup asparagus", 520),
+        ("Beef stir fry", "120g beef, 2 cups vegetables", 600),
+        ("Chicken curry with rice", "150g chicken, 1 cup rice", 650),
+        ("Vegetable lasagna", "1 slice", 550),
+        ("Shrimp tacos", "3 tacos", 580),
+    ],
+}
+
+RECOMMENDATIONS = [
+    "Drink at least 2 liters of water per day",
+    "Include a source of protein with every meal",
+    "Prepare lunches in advance on weekends",
+    "Limit processed foods and added sugars",
+    "Eat a variety of colorful vegetables",
+    "Keep a consistent sleep schedule to support recovery",
+    "Have your largest meal around your training sessions",
+]
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+def build_meal_plan(seed: str) -> Dict:
+    """Build a deterministic meal plan for the given seed"""
+    rng = random.Random(seed)
+    weekly_plan = {}
+    for week in ['week1', 'week2']:
+        weekly_plan[week] = {}
+        for day in DAYS:
+            day_plan = {}
+            for meal_type, options in MEAL_LIBRARY.items():
+                name, portions, calories = rng.choice(options)
+                day_plan[meal_type] = [{"name": name, "portions": portions, "calories": calories}]
+            weekly_plan[week][day] = day_plan
+
+    protein = rng.randint(20, 35)
+    fats = rng.randint(20, 35)
+    return {
+        "daily_calories": rng.randrange(1600, 2800, 50),
+        "macros": {"protein": protein, "carbs": 100 - protein - fats, "fats": fats},
+        "weekly_plan": weekly_plan,
+        "recommendations": rng.sample(RECOMMENDATIONS, 5),
+    }
+
+async def create_completion(messages: List[Dict]) -> Dict:
+    """Return a completion shaped like the OpenAI provider result"""
+    prompt_text = "".join(message["content"] for message in messages)
+    seed = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    content = json.dumps(build_meal_plan(seed))
+    completion_tokens = estimate_tokens(content)
+
+    # Simulate generation time proportional to the output size
+    latency = settings.LOCAL_PROVIDER_LATENCY_MS + completion_tokens * settings.LOCAL_PROVIDER_MS_PER_TOKEN
+    await asyncio.sleep(latency / 1000)
+
+    return {
+        'content': content,
+        'prompt_tokens': estimate_tokens(prompt_text),
+        'completion_tokens': completion_tokens
+    }
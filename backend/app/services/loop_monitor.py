@@ -0,0 +1,191 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from ..core import metrics
+from ..core.config import get_settings
+
+settings = get_settings()
+
+# Event loop blocking detector (opt-in: LOOP_MONITOR_ENABLED).
+#
+# A heartbeat task wakes every few milliseconds and measures how late it was:
+# that lag is how long the loop could not run anything else. A watchdog
+# thread checks the heartbeat; once it is LOOP_MONITOR_THRESHOLD_MS overdue,
+# the loop is stuck in synchronous code, so the watchdog captures the loop
+# thread's stack (sys._current_frames) while it is still blocked. The route
+# comes from the LoopMonitorMiddleware frame on that stack and the location
+# from the innermost frame in our own code. When the heartbeat resumes, the
+# full duration is added to that (route, location) pair. GET /api/admin/event-loop
+# lists the pairs by total blocked time.
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_DEPTH = 30
+MAX_OFFENDERS = 200
+
+lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+blocks_total = metrics.counter("event_loop_blocks_total", "Times the event loop was blocked past the threshold", ("route",))
+blocked_seconds_total = metrics.counter("event_loop_blocked_seconds_total", "Time the event loop spent blocked past the threshold", ("route",))
+
+@dataclass
+class Offender:
+    route: str
+    location: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    stack: List[str] = field(default_factory=list)
+    last_seen: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "route": self.route,
+            "location": self.location,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "mean_ms": round(self.total_seconds / self.count * 1000, 1),
+            "last_seen": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.last_seen)),
+            "stack": self.stack
+        }
+
+class LoopMonitorMiddleware:
+    """Marks each request on the stack, so a captured stack tells which route was running"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+MIDDLEWARE_CODE = LoopMonitorMiddleware.__call__.__code__
+
+def route_template(scope) -> str:
+    """"/api/meal-plans/{meal_plan_id}" for "/api/meal-plans/17", so requests aggregate per route"""
+    path = scope.get("path", "?")
+    matched = scope.get("route")
+    if matched is None or not hasattr(matched, "path_format"):
+        return path
+    # Routes of included routers only know their path below the prefix
+    try:
+        rendered = matched.path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path
+    return path[:len(path) - len(rendered)] + matched.path if path.endswith(rendered) else path
+
+def describe(frame) -> Tuple[str, str, List[str]]:
+    """Route, innermost application location and stack of a frame on the blocked loop thread"""
+    route = "(no request)"
+    location = None
+    current = frame
+    while current is not None:
+        code = current.f_code
+        if location is None and code.co_filename.startswith(APP_DIR):
+            location = f"{os.path.relpath(code.co_filename, os.path.dirname(APP_DIR))}:{current.f_lineno} in {code.co_name}"
+        if code is MIDDLEWARE_CODE:
+            scope = current.f_locals.get("scope") or {}
+            route = f"{scope.get('method', '')} {route_template(scope)}".strip()
+            break
+        current = current.f_back
+    if location is None:
+        location = f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+    return route, location, traceback.format_stack(frame, limit=STACK_DEPTH)
+
+class LoopMonitor:
+    def __init__(self, threshold_seconds: float):
+        self.threshold = threshold_seconds
+        # Sample often enough to catch a block early in it, without waking the loop needlessly
+        self.interval = min(max(threshold_seconds / 4, 0.005), 0.05)
+        self.running = False
+        self.last_beat = time.monotonic()
+        self.max_lag = 0.0
+        self.offenders: Dict[Tuple[str, str], Offender] = {}
+        # (heartbeat, route, location, stack) captured by the watchdog for the current block
+        self._captured: Optional[Tuple[float, str, str, List[str]]] = None
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+
+    async def run(self) -> None:
+        """Background task started by the API when LOOP_MONITOR_ENABLED"""
+        self._loop_thread_id = threading.get_ident()
+        stopped = threading.Event()
+        threading.Thread(target=self._watch, args=(stopped,), name="loop-monitor", daemon=True).start()
+        self.running = True
+        print(f"[Loop monitor] Reporting event loop blocks over {self.threshold * 1000:.0f} ms")
+        try:
+            while True:
+                beat = time.monotonic()
+                self.last_beat = beat
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, time.monotonic() - beat - self.interval)
+                lag_seconds.observe(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= self.threshold:
+                    self._record(beat, lag)
+        finally:
+            self.running = False
+            stopped.set()
+
+    def _watch(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.interval):
+            beat = self.last_beat
+            if time.monotonic() - beat < self.threshold:
+                continue
+            with self._lock:
+                if self._captured is not None and self._captured[0] == beat:
+                    continue  # Already captured this block
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            route, location, stack = describe(frame)
+            with self._lock:
+                self._captured = (beat, route, location, stack)
+
+    def _record(self, beat: float, lag: float) -> None:
+        with self._lock:
+            captured, self._captured = self._captured, None
+        if captured is not None and captured[0] == beat:
+            _, route, location, stack = captured
+        else:
+            # Blocked just past the threshold, between two watchdog checks
+            route, location, stack = "(not captured)", "(not captured)", []
+        blocks_total.inc(route=route)
+        blocked_seconds_total.inc(lag, route=route)
+        offender = self.offenders.get((route, location))
+        if offender is None:
+            if len(self.offenders) >= MAX_OFFENDERS:
+                del self.offenders[min(self.offenders, key=lambda key: self.offenders[key].total_seconds)]
+            offender = self.offenders[(route, location)] = Offender(route, location)
+        offender.count += 1
+        offender.total_seconds += lag
+        offender.max_seconds = max(offender.max_seconds, lag)
+        offender.stack = stack or offender.stack
+        offender.last_seen = time.time()
+        print(f"[Loop monitor] Event loop blocked {lag * 1000:.0f} ms by {route} at {location}")
+
+    def report(self, limit: int = 20) -> Dict:
+        offenders = sorted(self.offenders.values(), key=lambda offender: offender.total_seconds, reverse=True)
+        by_route: Dict[str, float] = {}
+        for offender in offenders:
+            by_route[offender.route] = by_route.get(offender.route, 0.0) + offender.total_seconds
+        return {
+            "enabled": settings.LOOP_MONITOR_ENABLED,
+            "running": self.running,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "lag": lag_seconds.snapshot(),
+            "blocked_ms_by_route": {route: round(seconds * 1000, 1) for route, seconds in by_route.items()},
+            "offenders": [offender.as_dict() for offender in offenders[:limit]]
+        }
+
+    def reset(self) -> None:
+        self.offenders.clear()
+        self.max_lag = 0.0
+
+loop_monitor = LoopMonitor(settings.LOOP_MONITOR_THRESHOLD_MS / 1000)
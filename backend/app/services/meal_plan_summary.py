@@ -0,0 +1,86 @@
+from numbers import Number
+from typing import Any, Dict, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import load_only, noload
+from ..models.models import MealPlan
+
+# Headline columns of a meal plan.
+#
+# The history page only shows dates, calories, macros and how much the plan
+# covers, so those figures are stored next to plan_data whenever a plan is
+# written. Summary listings then load these columns and never read the document.
+
+HEADLINE_COLUMNS = ("daily_calories", "macro_protein", "macro_carbs", "macro_fats", "day_count", "meal_count")
+
+def _whole_number(value: Any) -> Optional[int]:
+    if isinstance(value, bool) or not isinstance(value, Number):
+        return None
+    return int(round(value))
+
+def _mapping(value: Any) -> Dict:
+    return value if isinstance(value, dict) else {}
+
+def plan_headline(plan_data: Any) -> Dict[str, Optional[int]]:
+    """Headline column values for a plan document; malformed parts give None or 0"""
+    plan_data = _mapping(plan_data)
+    macros = _mapping(plan_data.get("macros"))
+    day_count = 0
+    meal_count = 0
+    for week in _mapping(plan_data.get("weekly_plan")).values():
+        for day in _mapping(week).values():
+            day_count += 1
+            for meals in _mapping(day).values():
+                meal_count += len(meals) if isinstance(meals, list) else 1
+    return {
+        "daily_calories": _whole_number(plan_data.get("daily_calories")),
+        "macro_protein": _whole_number(macros.get("protein")),
+        "macro_carbs": _whole_number(macros.get("carbs")),
+        "macro_fats": _whole_number(macros.get("fats")),
+        "day_count": day_count,
+        "meal_count": meal_count
+    }
+
+def _set_headline(meal_plan: MealPlan) -> None:
+    for column, value in plan_headline(meal_plan.plan_data).items():
+        setattr(meal_plan, column, value)
+
+@event.listens_for(MealPlan, "before_insert")
+def headline_on_insert(mapper, connection, meal_plan: MealPlan) -> None:
+    _set_headline(meal_plan)
+
+@event.listens_for(MealPlan, "before_update")
+def headline_on_update(mapper, connection, meal_plan: MealPlan) -> None:
+    """Recompute only when plan_data itself was assigned (it may not even be loaded otherwise)"""
+    if inspect(meal_plan).attrs._plan_data.history.has_changes():
+        _set_headline(meal_plan)
+
+def summary_columns():
+    """Loader options for summary listings: every column except the document, no meal slots"""
+    return (
+        load_only(
+            MealPlan.id, MealPlan.user_id, MealPlan.created_at, MealPlan.updated_at,
+            MealPlan.is_active, MealPlan.start_date, MealPlan.end_date,
+            *(getattr(MealPlan, column) for column in HEADLINE_COLUMNS)
+        ),
+        noload(MealPlan.meal_slots)
+    )
+
+def summary_response(meal_plan: MealPlan) -> Dict:
+    """Summary listing entry for a plan loaded with summary_columns()"""
+    return {
+        "id": meal_plan.id,
+        "user_id": meal_plan.user_id,
+        "created_at": meal_plan.created_at,
+        "updated_at": meal_plan.updated_at,
+        "is_active": meal_plan.is_active,
+        "start_date": meal_plan.start_date,
+        "end_date": meal_plan.end_date,
+        "daily_calories": meal_plan.daily_calories,
+        "macros": {
+            "protein": meal_plan.macro_protein,
+            "carbs": meal_plan.macro_carbs,
+            "fats": meal_plan.macro_fats
+        },
+        "day_count": meal_plan.day_count,
+        "meal_count": meal_plan.meal_count
+    }
@@ -0,0 +1,173 @@
+import hashlib
+import json
+from numbers import Number
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import attributes
+from ..models.models import Meal, MealPlan, MealPlanMeal
+
+# Content-addressed meal store.
+#
+# The meal objects in a plan's weekly_plan are interned in the meals table by
+# the sha256 of their canonical JSON, so a meal used in thousands of plans is
+# stored once. meal_plan_meals records which meal sits in which slot of which
+# plan, and the plan row keeps the rest of the document. MealPlan.plan_data
+# rebuilds the full document from the slots (loaded with the plan in one
+# batched query), and the meal_plan_documents view does the same in SQL.
+#
+# Interning happens when a plan document is assigned and flushed. Plans whose
+# weekly_plan does not have the expected week/day/meal list shape are stored
+# unchanged.
+
+def meal_hash(meal: Dict) -> str:
+    canonical = json.dumps(meal, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def plan_slots(plan_data: Any) -> Optional[List[Tuple[str, str, str, List[Dict]]]]:
+    """(week, day, meal type, meals) in document order, or None if weekly_plan cannot be interned"""
+    if not isinstance(plan_data, dict) or not isinstance(plan_data.get("weekly_plan"), dict):
+        return None
+    slots = []
+    for week, days in plan_data["weekly_plan"].items():
+        if not isinstance(days, dict) or not days:
+            return None
+        for day, meals_by_type in days.items():
+            if not isinstance(meals_by_type, dict) or not meals_by_type:
+                return None
+            for meal_type, meals in meals_by_type.items():
+                if not isinstance(meals, list) or not all(isinstance(meal, dict) for meal in meals):
+                    return None
+                slots.append((week, day, meal_type, meals))
+    return slots
+
+def _meal_row(meal: Dict, content_hash: str) -> Dict:
+    calories = meal.get("calories")
+    return {
+        "content_hash": content_hash,
+        "data": meal,
+        "name": meal.get("name") if isinstance(meal.get("name"), str) else None,
+        "portions": meal.get("portions") if isinstance(meal.get("portions"), str) else None,
+        "calories": float(calories) if isinstance(calories, Number) and not isinstance(calories, bool) else None
+    }
+
+def intern_meals(connection, meals: List[Dict]) -> Dict[str, int]:
+    """Insert meals not stored yet; returns content hash -> meal id for all of them"""
+    rows = {}
+    for meal in meals:
+        content_hash = meal_hash(meal)
+        rows.setdefault(content_hash, _meal_row(meal, content_hash))
+    if not rows:
+        return {}
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    connection.execute(
+        insert(Meal).values(list(rows.values())).on_conflict_do_nothing(index_elements=[Meal.content_hash])
+    )
+    return dict(connection.execute(
+        select(Meal.content_hash, Meal.id).where(Meal.content_hash.in_(list(rows)))
+    ).all())
+
+@event.listens_for(MealPlan, "before_insert")
+@event.listens_for(MealPlan, "before_update")
+def intern_plan_meals(mapper, connection, meal_plan: MealPlan) -> None:
+    """Store the meals of a newly assigned document in the meal store and keep the rest on the plan"""
+    document = meal_plan.__dict__.get("_pending_document")
+    if document is None:
+        return
+    slots = plan_slots(document)
+    if slots is None:
+        meal_plan._pending_slots = []
+        return
+    meal_ids = intern_meals(connection, [meal for *_, meals in slots for meal in meals])
+    meal_plan._pending_slots = [
+        {"slot": slot, "position": position, "week": week, "day": day, "meal_type": meal_type,
+         "meal_id": meal_ids[meal_hash(meal)] if meal is not None else None}
+        for slot, (week, day, meal_type, meals) in enumerate(slots)
+        for position, meal in enumerate(meals or [None])
+    ]
+    meal_plan._plan_data = {key: value for key, value in document.items() if key != "weekly_plan"}
+    meal_plan.meals_interned = True
+
+@event.listens_for(MealPlan, "after_insert")
+@event.listens_for(MealPlan, "after_update")
+def write_plan_slots(mapper, connection, meal_plan: MealPlan) -> None:
+    slots = meal_plan.__dict__.pop("_pending_slots", None)
+    if slots is None:
+        return
+    meal_plan.__dict__.pop("_pending_document", None)
+    connection.execute(delete(MealPlanMeal).where(MealPlanMeal.meal_plan_id == meal_plan.id))
+    if slots:
+        connection.execute(MealPlanMeal.__table__.insert(), [
+            {"meal_plan_id": meal_plan.id, "meal_plan_created_at": meal_plan.created_at, **slot} for slot in slots
+        ])
+
+@event.listens_for(MealPlan, "refresh")
+@event.listens_for(MealPlan, "expire")
+def forget_rebuilt_document(meal_plan: MealPlan, *args) -> None:
+    meal_plan.__dict__.pop("_full_plan_data", None)
+
+async def popular_meals(db: AsyncSession, limit: int = 20) -> List[Dict]:
+    """Most used meals across all interned plans, from the meal_id index"""
+    usage = (
+        select(MealPlanMeal.meal_id, func.count().label("uses"), func.count(func.distinct(MealPlanMeal.meal_plan_id)).label("plans"))
+        .where(MealPlanMeal.meal_id.is_not(None))
+        .group_by(MealPlanMeal.meal_id)
+        .order_by(func.count().desc())
+        .limit(limit)
+        .subquery()
+    )
+    rows = (await db.execute(
+        select(Meal.id, Meal.name, Meal.portions, Meal.calories, usage.c.uses, usage.c.plans)
+        .join(usage, usage.c.meal_id == Meal.id)
+        .order_by(usage.c.uses.desc())
+    )).all()
+    return [dict(row._mapping) for row in rows]
+
+async def store_stats(db: AsyncSession) -> Dict:
+    """How much the meal store deduplicates: distinct meals vs meal references"""
+    return {
+        "distinct_meals": await db.scalar(select(func.count()).select_from(Meal)),
+        "meal_references": await db.scalar(select(func.count()).select_from(MealPlanMeal).where(MealPlanMeal.meal_id.is_not(None))),
+        "interned_plans": await db.scalar(select(func.count()).select_from(MealPlan).where(MealPlan.meals_interned == True)),
+        "plans": await db.scalar(select(func.count()).select_from(MealPlan))
+    }
+
+async def load_day_meals(db: AsyncSession, meal_plan_id: int, week: str, day: str) -> Optional[Dict]:
+    """One day of an interned plan straight from the meal store; None if the plan has no such day"""
+    rows = (await db.execute(
+        select(MealPlanMeal.meal_type, Meal.data)
+        .outerjoin(Meal, Meal.id == MealPlanMeal.meal_id)
+        .where(MealPlanMeal.meal_plan_id == meal_plan_id, MealPlanMeal.week == week, MealPlanMeal.day == day)
+        .order_by(MealPlanMeal.slot, MealPlanMeal.position)
+    )).all()
+    if not rows:
+        return None
+    meals = {}
+    for meal_type, data in rows:
+        meals.setdefault(meal_type, [])
+        if data is not None:
+            meals[meal_type].append(data)
+    return meals
+
+async def intern_existing_plans(db: AsyncSession, batch_size: int = 200, limit: Optional[int] = None) -> int:
+    """Move the meals of plans stored before the meal store into it; returns the number of plans processed"""
+    processed = 0
+    last_id = 0
+    while limit is None or processed < limit:
+        meal_plans = (await db.scalars(
+            select(MealPlan)
+            .where(MealPlan.meals_interned == False, MealPlan._plan_data.is_not(None), MealPlan.id > last_id)
+            .order_by(MealPlan.id)
+            .limit(batch_size if limit is None else min(batch_size, limit - processed))
+        )).all()
+        if not meal_plans:
+            break
+        for meal_plan in meal_plans:
+            meal_plan.plan_data = dict(meal_plan.plan_data)
+            # Keep updated_at, this is a storage change and not an edit
+            attributes.flag_modified(meal_plan, "updated_at")
+        await db.commit()
+        last_id = meal_plans[-1].id
+        processed += len(meal_plans)
+    return processed
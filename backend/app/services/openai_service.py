@@ -1,17 +1,45 @@
-from openai import OpenAI
-from typing import List, Dict
+from openai import AsyncOpenAI
+from typing import List, Dict, Optional, Tuple
 import json
+import re
+import time
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.config import get_settings
-from ..models.models import SystemPrompt, UserResponse, Question
+from ..models.models import SystemPrompt
+from . import local_provider
+from .profile_serializer import serialize_profile
+from .token_estimator import estimate_tokens
+from .prompt_experiments import select_prompt_variant, record_generation
+from .user_profiles import load_profile, get_path_index
 
 settings = get_settings()
 
-# Initialize OpenAI client with API key from settings
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# OpenAI client is created on first use so the local provider works without an API key
+_client: Optional[AsyncOpenAI] = None
+
+def get_openai_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    return _client
+
+DEFAULT_MEAL_PLAN_PROMPT = """You are a professional nutritionist and meal planner. Create a personalized weekly meal plan based on the user's information, preferences, and goals."""
+
+JSON_ONLY_INSTRUCTION = "You must respond with ONLY valid JSON. Do not include any explanatory text before or after the JSON. The JSON must be properly formatted with double quotes around property names and string values."
+
+WEEKS = ['week1', 'week2']
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# Default meals used to fill slots the model left empty
+DEFAULT_MEALS = {
+    'breakfast': [{'name': 'Balanced breakfast', 'portions': '1 serving', 'calories': 300}],
+    'morning_snack': [{'name': 'Healthy snack', 'portions': '1 serving', 'calories': 150}],
+    'lunch': [{'name': 'Nutritious lunch', 'portions': '1 serving', 'calories': 500}],
+    'afternoon_snack': [{'name': 'Energy snack', 'portions': '1 serving', 'calories': 200}],
+    'dinner': [{'name': 'Balanced dinner', 'portions': '1 serving', 'calories': 600}]
+}
 
-# Define the required output format separately
 MEAL_PLAN_OUTPUT_FORMAT = """
 IMPORTANT: Your response must be valid JSON matching exactly this structure:
 {
@@ -63,237 +91,288 @@ Requirements:
 def clean_json_response(response_text: str) -> str:
     """Clean the response text to ensure valid JSON"""
     # Remove any JavaScript-style comments
-    import re
     response_text = re.sub(r'//.*?\n', '\n', response_text)
     response_text = re.sub(r'/\*.*?\*/', '', response_text, flags=re.DOTALL)
-    
+
     # Remove any trailing commas
     response_text = re.sub(r',(\s*[}\]])', r'\1', response_text)
-    
+
     return response_text
 
-def get_meal_plan_system_prompt(db: Session) -> str:
+def compose_system_prompt(prompt_text: Optional[str]) -> str:
+    """Combine a user-defined prompt with the required output format"""
+    return f"{prompt_text or DEFAULT_MEAL_PLAN_PROMPT}\n\n{MEAL_PLAN_OUTPUT_FORMAT}"
+
+async def get_meal_plan_system_prompt(db: AsyncSession, user_id: Optional[int] = None) -> Tuple[str, Optional[SystemPrompt]]:
     """
     Get the system prompt for meal plan generation from the database.
-    Combines the user-defined prompt with the required output format.
+    When several prompt variants are active the user is assigned one of them.
+    Returns the prompt combined with the required output format, and the variant used.
     """
     try:
         # Add more detailed logging
         print("[OpenAI Service] Fetching system prompt from database...")
-        
-        # Query the system prompt
-        prompt = db.query(SystemPrompt).filter(
-            SystemPrompt.name == "meal_plan",
-            SystemPrompt.is_active == True
-        ).first()
-        
+
+        # Select the prompt variant for this user
+        prompt = await select_prompt_variant(db, user_id)
+
         # Log the query results
         if prompt:
             print(f"[OpenAI Service] Found system prompt: id={prompt.id}, name={prompt.name}")
             if prompt.prompt_text:
                 print("[OpenAI Service] Using system prompt from database")
-                return f"{prompt.prompt_text}\n\n{MEAL_PLAN_OUTPUT_FORMAT}"
+                return compose_system_prompt(prompt.prompt_text), prompt
             else:
                 print("[OpenAI Service] System prompt found but prompt_text is empty")
         else:
-            print("[OpenAI Service] No active system prompt found with name 'meal_plan'")
-            
+            print("[OpenAI Service] No active system prompt found for 'meal_plan'")
+
     except Exception as e:
         print(f"[OpenAI Service] Error fetching system prompt: {str(e)}")
         import traceback
         print("[OpenAI Service] Traceback:", traceback.format_exc())
-    
+
     # If no prompt exists in database or there was an error, use a default prompt
     print("[OpenAI Service] Using default prompt as fallback")
-    default_prompt = """You are a professional nutritionist and meal planner. Create a personalized weekly meal plan based on the user's information, preferences, and goals."""
-    return f"{default_prompt}\n\n{MEAL_PLAN_OUTPUT_FORMAT}"
+    return compose_system_prompt(None), None
+
+def build_meal_plan_messages(
+    system_prompt: str,
+    structured_data: Dict,
+    template: Optional[Tuple] = None,
+    profile_format: Optional[str] = None
+) -> List[Dict]:
+    """Prepare the chat messages sent to the model"""
+    profile = serialize_profile(structured_data, profile_format or settings.PROFILE_FORMAT, template)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": JSON_ONLY_INSTRUCTION},
+        {"role": "user", "content": profile}
+    ]
+
+async def request_meal_plan_completion(messages: List[Dict], provider: Optional[str] = None) -> Dict:
+    """
+    Send the messages to the configured provider.
+    Returns the raw content together with token usage and latency.
+    """
+    provider = provider or settings.MEAL_PLAN_PROVIDER
+    started = time.perf_counter()
+
+    if provider == "local":
+        result = await local_provider.create_completion(messages)
+    elif provider == "openai":
+        response = await get_openai_client().chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=4000,  # Increased from 2000 to handle larger responses
+            presence_penalty=0.1,
+            frequency_penalty=0.1
+        )
+        usage = response.usage
+        result = {
+            'content': response.choices[0].message.content.strip(),
+            'prompt_tokens': usage.prompt_tokens if usage else None,
+            'completion_tokens': usage.completion_tokens if usage else None
+        }
+    else:
+        raise ValueError(f"Unknown meal plan provider: {provider}")
+
+    result['latency_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+def normalize_meal_plan(meal_plan: Dict) -> Tuple[Dict, List[str]]:
+    """
+    Fill in missing fields, meals and macro ratios the model got wrong.
+    Returns the normalized plan and the list of repairs that were applied.
+    """
+    repairs = []
+
+    # Validate the response structure
+    required_fields = ['daily_calories', 'macros', 'weekly_plan', 'recommendations']
+    missing_fields = [field for field in required_fields if field not in meal_plan]
+
+    if missing_fields:
+        print(f"[OpenAI Service] Missing fields in response: {missing_fields}")
+        repairs.append('missing_fields')
+        # Create a default structure for missing fields
+        default_meal_plan = {
+            'daily_calories': 2000,
+            'macros': {
+                'protein': 30,
+                'carbs': 45,
+                'fats': 25
+            },
+            'weekly_plan': meal_plan.get('weekly_plan', {
+                'week1': {},
+                'week2': {}
+            }),
+            'recommendations': [
+                "Maintain regular meal times",
+                "Stay hydrated throughout the day",
+                "Focus on whole, unprocessed foods",
+                "Include protein with every meal",
+                "Eat a variety of colorful vegetables"
+            ]
+        }
+
+        # Merge the default with the actual response
+        meal_plan = {**default_meal_plan, **meal_plan}
+
+    # Ensure weekly_plan has both week1 and week2 with all days populated
+    if not isinstance(meal_plan['weekly_plan'], dict):
+        repairs.append('weekly_plan_reset')
+        meal_plan['weekly_plan'] = {'week1': {}, 'week2': {}}
+
+    for week in WEEKS:
+        if week not in meal_plan['weekly_plan']:
+            meal_plan['weekly_plan'][week] = {}
+
+        # Ensure each day exists and has all meal types
+        for day in DAYS:
+            if day not in meal_plan['weekly_plan'][week]:
+                meal_plan['weekly_plan'][week][day] = {}
+
+            day_meals = meal_plan['weekly_plan'][week][day]
+
+            # Ensure each meal type exists and has content
+            for meal_type, default_content in DEFAULT_MEALS.items():
+                if meal_type not in day_meals or not day_meals[meal_type]:
+                    repairs.append('meal_filled')
+                    day_meals[meal_type] = [dict(meal) for meal in default_content]
+                elif not isinstance(day_meals[meal_type], list):
+                    repairs.append('meal_wrapped')
+                    day_meals[meal_type] = [day_meals[meal_type]]
+
+                # Ensure each meal has required fields
+                meals = []
+                for meal in day_meals[meal_type]:
+                    if not isinstance(meal, dict):
+                        repairs.append('meal_field_defaulted')
+                        meal = {'name': str(meal), 'portions': '1 serving', 'calories': 300}
+                    for field, default in (('name', 'Balanced meal'), ('portions', '1 serving'), ('calories', 300)):
+                        if field not in meal:
+                            repairs.append('meal_field_defaulted')
+                            meal[field] = default
+                    meals.append(meal)
+                day_meals[meal_type] = meals
 
-def generate_meal_plan(data: Dict, db: Session) -> Dict:
+    # Validate and adjust macros to sum to 100%
+    macros = meal_plan.get('macros', {})
+    if macros:
+        total = sum([
+            macros.get('protein', 0),
+            macros.get('carbs', 0),
+            macros.get('fats', 0)
+        ])
+
+        if total != 100:
+            print(f"[OpenAI Service] Adjusting macros. Original sum: {total}%")
+            repairs.append('macros_adjusted')
+            if total > 0:  # Avoid division by zero
+                adjustment_factor = 100 / total
+                macros['protein'] = round(macros.get('protein', 0) * adjustment_factor)
+                macros['carbs'] = round(macros.get('carbs', 0) * adjustment_factor)
+                macros['fats'] = round(macros.get('fats', 0) * adjustment_factor)
+
+                # Ensure exactly 100% by adjusting the largest value if needed
+                new_total = macros['protein'] + macros['carbs'] + macros['fats']
+                if new_total != 100:
+                    diff = 100 - new_total
+                    max_macro = max(macros.items(), key=lambda x: x[1])[0]
+                    macros[max_macro] += diff
+            else:
+                # If all macros are 0, set default balanced ratios
+                macros['protein'] = 30
+                macros['carbs'] = 45
+                macros['fats'] = 25
+
+            meal_plan['macros'] = macros
+            print(f"[OpenAI Service] Adjusted macros: {macros}")
+
+    # Format recommendations as plain strings
+    formatted = []
+    for rec in meal_plan.get('recommendations') or []:
+        if isinstance(rec, str):
+            formatted.append(rec)
+        else:
+            repairs.append('recommendation_formatted')
+            # If recommendation is an object, extract the tip or text
+            if isinstance(rec, dict):
+                formatted.append(rec.get('tip') or rec.get('text') or str(rec))
+            else:
+                formatted.append(str(rec))
+    meal_plan['recommendations'] = formatted
+
+    return meal_plan, repairs
+
+async def generate_meal_plan(data: Dict, db: AsyncSession) -> Dict:
     """
     Generate a meal plan using OpenAI's API based on user responses and information
     """
     try:
         print("[OpenAI Service] Starting meal plan generation...")
         current_user_id = data.get('user_id')  # Get the current user's ID
-        
+
         if not current_user_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User ID is required"
             )
-        
-        # Retrieve saved responses from the database
-        saved_responses = db.query(UserResponse).join(Question).filter(
-            UserResponse.user_id == current_user_id
-        ).all()
-        
-        if not saved_responses:
+
+        # The user's answers, kept structured by field_key when they are saved
+        profile = await load_profile(db, current_user_id)
+
+        if profile is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No responses found for user"
             )
-        
-        # Convert saved responses to a structured format based on field_keys
-        structured_data = {}
-        for response in saved_responses:
-            field_key = response.question.field_key
-            value = response.response_value
-            
-            # Split the field key into parts (e.g., "personalInfo.name" -> ["personalInfo", "name"])
-            parts = field_key.split('.')
-            
-            # Build the nested structure
-            current = structured_data
-            for i, part in enumerate(parts[:-1]):
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-            
-            # Set the value at the final level
-            current[parts[-1]] = value
-        
-        print("[OpenAI Service] Structured data:", json.dumps(structured_data, indent=2))
-        
-        # Get the system prompt from the database
-        system_prompt = get_meal_plan_system_prompt(db)
-        
+
+        structured_data = profile.document
+        print(f"[OpenAI Service] Profile version {profile.version} ({profile.content_hash[:12]}):", json.dumps(structured_data, indent=2))
+
+        # Get the system prompt variant for this user from the database
+        system_prompt, prompt_variant = await get_meal_plan_system_prompt(db, current_user_id)
+
         # Prepare messages for OpenAI
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "system", "content": "You must respond with ONLY valid JSON. Do not include any explanatory text before or after the JSON. The JSON must be properly formatted with double quotes around property names and string values."},
-            {"role": "user", "content": json.dumps(structured_data, indent=2)}
-        ]
-        
+        template = (await get_path_index(db)).template
+        messages = build_meal_plan_messages(system_prompt, structured_data, template)
+        print(f"[OpenAI Service] Profile message ({settings.PROFILE_FORMAT}): ~{estimate_tokens(messages[-1]['content'])} tokens")
+
         try:
-            # Make the API call to OpenAI
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=4000,  # Increased from 2000 to handle larger responses
-                presence_penalty=0.1,
-                frequency_penalty=0.1
-            )
-            
+            # Make the API call to the configured provider
+            try:
+                completion = await request_meal_plan_completion(messages)
+            except Exception:
+                record_generation(db, current_user_id, prompt_variant, 'provider_error')
+                await db.commit()
+                raise
+
             # Extract the response content
-            response_content = response.choices[0].message.content.strip()
+            response_content = completion['content']
             print("[OpenAI Service] Raw response:", response_content)
-            
+            print(f"[OpenAI Service] Completion took {completion['latency_ms']:.0f}ms, "
+                  f"tokens: prompt={completion['prompt_tokens']}, completion={completion['completion_tokens']}")
+
             try:
                 # Parse and clean the JSON response
-                meal_plan = parse_meal_plan_response(response_content)
-                
-                # Validate the response structure
-                required_fields = ['daily_calories', 'macros', 'weekly_plan', 'recommendations']
-                missing_fields = [field for field in required_fields if field not in meal_plan]
-                
-                if missing_fields:
-                    print(f"[OpenAI Service] Missing fields in response: {missing_fields}")
-                    # Create a default structure for missing fields
-                    default_meal_plan = {
-                        'daily_calories': 2000,
-                        'macros': {
-                            'protein': 30,
-                            'carbs': 45,
-                            'fats': 25
-                        },
-                        'weekly_plan': meal_plan.get('weekly_plan', {
-                            'week1': {},
-                            'week2': {}
-                        }),
-                        'recommendations': [
-                            "Maintain regular meal times",
-                            "Stay hydrated throughout the day",
-                            "Focus on whole, unprocessed foods",
-                            "Include protein with every meal",
-                            "Eat a variety of colorful vegetables"
-                        ]
-                    }
-                    
-                    # Merge the default with the actual response
-                    meal_plan = {**default_meal_plan, **meal_plan}
-                
-                # Ensure weekly_plan has both week1 and week2 with all days populated
-                if 'weekly_plan' in meal_plan:
-                    if not isinstance(meal_plan['weekly_plan'], dict):
-                        meal_plan['weekly_plan'] = {'week1': {}, 'week2': {}}
-                    
-                    days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-                    meal_types = {
-                        'breakfast': [],
-                        'morning_snack': [],
-                        'lunch': [],
-                        'afternoon_snack': [],
-                        'dinner': []
-                    }
-                    
-                    # Create default meal structure
-                    default_meals = {
-                        'breakfast': [{'name': 'Balanced breakfast', 'portions': '1 serving', 'calories': 300}],
-                        'morning_snack': [{'name': 'Healthy snack', 'portions': '1 serving', 'calories': 150}],
-                        'lunch': [{'name': 'Nutritious lunch', 'portions': '1 serving', 'calories': 500}],
-                        'afternoon_snack': [{'name': 'Energy snack', 'portions': '1 serving', 'calories': 200}],
-                        'dinner': [{'name': 'Balanced dinner', 'portions': '1 serving', 'calories': 600}]
-                    }
-                    
-                    for week in ['week1', 'week2']:
-                        if week not in meal_plan['weekly_plan']:
-                            meal_plan['weekly_plan'][week] = {}
-                            
-                        # Ensure each day exists and has all meal types
-                        for day in days:
-                            if day not in meal_plan['weekly_plan'][week]:
-                                meal_plan['weekly_plan'][week][day] = {}
-                                
-                            day_meals = meal_plan['weekly_plan'][week][day]
-                            
-                            # Ensure each meal type exists and has content
-                            for meal_type, default_content in default_meals.items():
-                                if meal_type not in day_meals or not day_meals[meal_type]:
-                                    day_meals[meal_type] = default_content.copy()
-                                elif not isinstance(day_meals[meal_type], list):
-                                    day_meals[meal_type] = [day_meals[meal_type]] if day_meals[meal_type] else default_content.copy()
-                                
-                                # Ensure each meal has required fields
-                                for meal in day_meals[meal_type]:
-                                    if not isinstance(meal, dict):
-                                        meal = {'name': str(meal), 'portions': '1 serving', 'calories': 300}
-                                    meal.setdefault('name', 'Balanced meal')
-                                    meal.setdefault('portions', '1 serving')
-                                    meal.setdefault('calories', 300)
-                
-                # Validate and adjust macros to sum to 100%
-                macros = meal_plan.get('macros', {})
-                if macros:
-                    total = sum([
-                        macros.get('protein', 0),
-                        macros.get('carbs', 0),
-                        macros.get('fats', 0)
-                    ])
-                    
-                    if total != 100:
-                        print(f"[OpenAI Service] Adjusting macros. Original sum: {total}%")
-                        if total > 0:  # Avoid division by zero
-                            adjustment_factor = 100 / total
-                            macros['protein'] = round(macros.get('protein', 0) * adjustment_factor)
-                            macros['carbs'] = round(macros.get('carbs', 0) * adjustment_factor)
-                            macros['fats'] = round(macros.get('fats', 0) * adjustment_factor)
-                            
-                            # Ensure exactly 100% by adjusting the largest value if needed
-                            new_total = macros['protein'] + macros['carbs'] + macros['fats']
-                            if new_total != 100:
-                                diff = 100 - new_total
-                                max_macro = max(macros.items(), key=lambda x: x[1])[0]
-                                macros[max_macro] += diff
-                        else:
-                            # If all macros are 0, set default balanced ratios
-                            macros['protein'] = 30
-                            macros['carbs'] = 45
-                            macros['fats'] = 25
-                        
-                        meal_plan['macros'] = macros
-                        print(f"[OpenAI Service] Adjusted macros: {macros}")
-                
+                try:
+                    meal_plan, parse_repairs = parse_meal_plan_content(response_content)
+                except HTTPException:
+                    record_generation(db, current_user_id, prompt_variant, 'parse_failed', completion)
+                    await db.commit()
+                    raise
+                meal_plan, repairs = normalize_meal_plan(meal_plan)
+                if repairs:
+                    print(f"[OpenAI Service] Applied {len(repairs)} normalization repairs: {sorted(set(repairs))}")
+
+                # Recorded with the meal plan when the caller commits
+                record_generation(
+                    db, current_user_id, prompt_variant, 'success', completion,
+                    repair_count=len(parse_repairs) + len(repairs)
+                )
+
                 # Add user info from structured data
                 personal_info = structured_data.get('personalInfo', {})
                 meal_plan['user_info'] = {
@@ -303,31 +382,12 @@ def generate_meal_plan(data: Dict, db: Session) -> Dict:
                     'email': personal_info.get('email', ''),
                     'age': personal_info.get('age', 0)
                 }
-                
-                # Add a function to format recommendations
-                def format_recommendations(recommendations):
-                    if not recommendations:
-                        return []
-                    
-                    formatted = []
-                    for rec in recommendations:
-                        if isinstance(rec, str):
-                            formatted.append(rec)
-                        elif isinstance(rec, dict):
-                            # If recommendation is an object, extract the tip or text
-                            formatted.append(rec.get('tip') or rec.get('text') or str(rec))
-                        else:
-                            formatted.append(str(rec))
-                    return formatted
-                
-                if 'recommendations' in meal_plan:
-                    meal_plan['recommendations'] = format_recommendations(meal_plan['recommendations'])
-                
+
                 # Return the validated and structured meal plan
                 return {
                     'plan_data': meal_plan
                 }
-                
+
             except json.JSONDecodeError as e:
                 print(f"[OpenAI Service] JSON decode error: {str(e)}")
                 print("[OpenAI Service] Failed response content:", response_content)
@@ -335,14 +395,14 @@ def generate_meal_plan(data: Dict, db: Session) -> Dict:
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"Failed to parse meal plan response: {str(e)}"
                 )
-                
+
         except Exception as e:
             print(f"[OpenAI Service] Error calling OpenAI API: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to generate meal plan: {str(e)}"
             )
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -426,31 +486,42 @@ def construct_meal_plan_prompt(user_info: Dict) -> str:
     Adjust portions and timing based on their workout routine and sleep patterns.
     """
 
-def parse_meal_plan_response(response_text: str) -> Dict:
-    """Parse and validate the meal plan response"""
+def parse_meal_plan_content(response_text: str) -> Tuple[Dict, List[str]]:
+    """
+    Parse the meal plan response.
+    Returns the parsed plan and the list of parse repairs that were needed.
+    """
+    repairs = []
     try:
         # Clean the response text
         cleaned_response = clean_json_response(response_text)
-        
+        if cleaned_response != response_text:
+            repairs.append('json_cleaned')
+
         # Try to parse the cleaned JSON
-        return json.loads(cleaned_response)
+        return json.loads(cleaned_response), repairs
     except json.JSONDecodeError as e:
         print(f"[OpenAI Service] JSON parsing error: {str(e)}")
         print("[OpenAI Service] Failed response content:", response_text)
-        
+
         # Try to extract the valid parts of the response
         try:
             # Find the first valid JSON object in the response
-            import re
             json_pattern = r'{[\s\S]*}'
             match = re.search(json_pattern, response_text)
             if match:
                 cleaned_json = clean_json_response(match.group(0))
-                return json.loads(cleaned_json)
+                repairs.append('json_extracted')
+                return json.loads(cleaned_json), repairs
         except Exception as inner_e:
             print(f"[OpenAI Service] Failed to extract valid JSON: {str(inner_e)}")
-        
+
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to parse meal plan response"
-        ) 
\ No newline at end of file
+        )
+
+def parse_meal_plan_response(response_text: str) -> Dict:
+    """Parse and validate the meal plan response"""
+    meal_plan, _ = parse_meal_plan_content(response_text)
+    return meal_plan
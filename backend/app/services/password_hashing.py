@@ -0,0 +1,92 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+from fastapi import HTTPException, status
+from ..core import metrics
+from ..core.config import get_settings
+
+settings = get_settings()
+
+# Bounded pool for bcrypt.
+#
+# Hashing or verifying a password costs 100-300 ms of CPU. Called inline from
+# an async route that time is spent on the event loop, so a burst of logins
+# stalled every other request of the worker. The work now runs on
+# PASSWORD_HASH_WORKERS threads (bcrypt releases the GIL while it hashes, so
+# threads use the cores without the pickling and startup cost of processes).
+# At most PASSWORD_HASH_MAX_QUEUE calls wait for a free thread; beyond that the
+# request is refused with 503 and a Retry-After estimated from the backlog,
+# instead of queueing logins that would time out on the client anyway.
+
+T = TypeVar("T")
+
+in_flight = metrics.gauge("password_hash_in_flight", "bcrypt calls running or waiting for a pool thread")
+rejected_total = metrics.counter("password_hash_rejected_total", "bcrypt calls refused because the pool queue was full", ("operation",))
+duration_seconds = metrics.histogram(
+    "password_hash_seconds", "Time spent in bcrypt, excluding the wait for a pool thread", ("operation",),
+    buckets=(0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)
+)
+wait_seconds = metrics.histogram(
+    "password_hash_wait_seconds", "Time a bcrypt call waited for a pool thread", ("operation",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+class PasswordHashPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        # Calls admitted and not yet finished; only touched from the event loop thread
+        self.pending = 0
+        # Moving average of one bcrypt call, for Retry-After; seeded with a typical cost
+        self._average_seconds = 0.25
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        backlog = self.pending / self.workers * self._average_seconds
+        return max(1, math.ceil(backlog))
+
+    def _timed(self, operation: str, queued_at: float, fn: Callable[..., T], *args) -> T:
+        started = time.perf_counter()
+        wait_seconds.observe(started - queued_at, operation=operation)
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            duration_seconds.observe(elapsed, operation=operation)
+            with self._lock:
+                self._average_seconds += 0.2 * (elapsed - self._average_seconds)
+
+    async def run(self, operation: str, fn: Callable[..., T], *args) -> T:
+        if self.pending >= self.workers + self.max_queue:
+            rejected_total.inc(operation=operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests right now, please try again shortly",
+                headers={"Retry-After": str(self.retry_after())}
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, operation, time.perf_counter(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "average_ms": round(self._average_seconds * 1000, 1),
+            "rejected": rejected_total.snapshot()
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+password_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+in_flight.set_function(lambda: password_pool.pending)
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import zstandard
+from sqlalchemy import bindparam, event, exists, null, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, attributes
+from ..core import metrics
+from ..core.config import get_settings
+from ..models.models import MealPlan, PlanArchiveDictionary
+from .plan_partitions import find_plan
+
+settings = get_settings()
+
+# Archival storage for historical meal plans.
+#
+# Plans older than PLAN_ARCHIVE_AFTER_DAYS that the user has since replaced with
+# a newer plan are compacted: plan_data is serialized, compressed with zstd
+# using a dictionary trained on plan documents (keys, weekday names and
+# recurring meal names shrink to a few bits each), stored in archived_data, and
+# plan_data is cleared. When such a row's document is loaded through the ORM it
+# is decompressed back into meal_plan.plan_data, so callers do not change.
+# Queries that leave plan_data out (summary listings) never decompress anything.
+
+DICTIONARY_SIZE = 32 * 1024
+TRAINING_SAMPLE_SIZE = 2000
+# zstd needs a reasonable sample set; with fewer plans, compress without a dictionary
+MIN_TRAINING_SAMPLES = 50
+COMPRESSION_LEVEL = 12
+# pg_try_advisory_xact_lock key, so only one worker compacts at a time
+COMPACTION_LOCK_ID = 7_311_038
+
+archived_plans_total = metrics.counter("plan_archive_archived_total", "Meal plans compacted into archival storage")
+archived_bytes_total = metrics.counter("plan_archive_bytes_total", "Document bytes before and after compaction", ("stage",))
+decompress_seconds = metrics.histogram(
+    "plan_archive_decompress_seconds", "Time to restore an archived plan document",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+
+# Dictionaries are immutable, so they are cached per process by id
+_dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+_decompressors: Dict[Optional[int], zstandard.ZstdDecompressor] = {}
+
+def serialize_plan(plan_data: Any) -> bytes:
+    return json.dumps(plan_data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _decompressor(session: Session, dictionary_id: Optional[int]) -> zstandard.ZstdDecompressor:
+    decompressor = _decompressors.get(dictionary_id)
+    if decompressor is None:
+        if dictionary_id is None:
+            decompressor = zstandard.ZstdDecompressor()
+        else:
+            if dictionary_id not in _dictionaries:
+                data = session.connection().scalar(
+                    select(PlanArchiveDictionary.dictionary).where(PlanArchiveDictionary.id == dictionary_id)
+                )
+                _dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+            decompressor = zstandard.ZstdDecompressor(dict_data=_dictionaries[dictionary_id])
+        _decompressors[dictionary_id] = decompressor
+    return decompressor
+
+def _restore_document(meal_plan: MealPlan, session: Session) -> None:
+    loaded = meal_plan.__dict__
+    # Only when plan_data was part of this load and the row is archived
+    if "_plan_data" not in loaded or loaded["_plan_data"] is not None or loaded.get("archived_data") is None:
+        return
+    started = time.perf_counter()
+    decompressor = _decompressor(session, loaded.get("archive_dictionary_id"))
+    document = json.loads(decompressor.decompress(loaded["archived_data"]))
+    attributes.set_committed_value(meal_plan, "_plan_data", document)
+    decompress_seconds.observe(time.perf_counter() - started)
+
+@event.listens_for(MealPlan, "load")
+def restore_on_load(meal_plan: MealPlan, context) -> None:
+    _restore_document(meal_plan, context.session)
+
+@event.listens_for(MealPlan, "refresh")
+def restore_on_refresh(meal_plan: MealPlan, context, attrs) -> None:
+    _restore_document(meal_plan, context.session)
+
+@event.listens_for(MealPlan, "before_update")
+def unarchive_on_write(mapper, connection, meal_plan: MealPlan) -> None:
+    """A plan whose document is written again is stored uncompressed"""
+    if attributes.instance_state(meal_plan).attrs._plan_data.history.has_changes():
+        meal_plan.archived_data = None
+        meal_plan.archive_dictionary_id = None
+        meal_plan.archived_at = None
+
+async def train_dictionary(db: AsyncSession) -> Optional[Tuple[int, zstandard.ZstdCompressionDict]]:
+    """Train a dictionary on recent plans and store it; None if there are too few plans"""
+    samples = [
+        serialize_plan(plan_data)
+        for plan_data in (await db.scalars(
+            select(MealPlan.plan_data)
+            .where(MealPlan.plan_data.is_not(None))
+            .order_by(MealPlan.created_at.desc())
+            .limit(TRAINING_SAMPLE_SIZE)
+        )).all()
+    ]
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        return None
+    dictionary = await asyncio.to_thread(zstandard.train_dictionary, DICTIONARY_SIZE, samples)
+    row = PlanArchiveDictionary(dictionary=dictionary.as_bytes(), sample_count=len(samples))
+    db.add(row)
+    await db.commit()
+    _dictionaries[row.id] = dictionary
+    return row.id, dictionary
+
+async def current_dictionary(db: AsyncSession) -> Optional[Tuple[int, zstandard.ZstdCompressionDict]]:
+    """The newest stored dictionary"""
+    row = (await db.execute(
+        select(PlanArchiveDictionary.id, PlanArchiveDictionary.dictionary)
+        .order_by(PlanArchiveDictionary.id.desc())
+        .limit(1)
+    )).first()
+    if not row:
+        return None
+    if row.id not in _dictionaries:
+        _dictionaries[row.id] = zstandard.ZstdCompressionDict(row.dictionary)
+    return row.id, _dictionaries[row.id]
+
+def _compress_batch(documents: List[bytes], dictionary: Optional[zstandard.ZstdCompressionDict]) -> List[bytes]:
+    if dictionary is None:
+        compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    else:
+        compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary)
+    return [compressor.compress(document) for document in documents]
+
+def archive_candidates(cutoff: datetime):
+    """Unarchived plans created before cutoff that have a newer plan of the same user"""
+    newer = aliased(MealPlan)
+    return select(MealPlan.id, MealPlan.plan_data, MealPlan.updated_at).where(
+        MealPlan.archived_at.is_(None),
+        MealPlan.plan_data.is_not(None),
+        MealPlan.created_at < cutoff,
+        exists().where(newer.user_id == MealPlan.user_id, newer.created_at > MealPlan.created_at)
+    )
+
+async def compact_meal_plans(
+    db: AsyncSession,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    retrain: bool = False,
+    limit: Optional[int] = None
+) -> Dict:
+    """
+    Move historical plans into archival storage, one committed batch at a time.
+    Returns the number of plans archived and the document bytes before/after.
+    """
+    older_than_days = settings.PLAN_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.PLAN_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    is_postgresql = db.bind.dialect.name == "postgresql"
+
+    dictionary = None if retrain else await current_dictionary(db)
+    if dictionary is None:
+        dictionary = await train_dictionary(db)
+    dictionary_id, zstd_dictionary = dictionary or (None, None)
+
+    table = MealPlan.__table__
+    archive = (
+        table.update()
+        .where(
+            table.c.id == bindparam("plan_id"),
+            table.c.archived_at.is_(None),
+            # Skip plans edited since they were read
+            table.c.updated_at == bindparam("read_updated_at")
+        )
+        .values(
+            plan_data=null(),
+            archived_data=bindparam("archived_data"),
+            archive_dictionary_id=dictionary_id,
+            archived_at=bindparam("archived_at"),
+            updated_at=bindparam("read_updated_at")
+        )
+    )
+
+    report = {"archived": 0, "bytes_before": 0, "bytes_after": 0, "dictionary_id": dictionary_id, "skipped_locked": False}
+    last_id = 0
+    while limit is None or report["archived"] < limit:
+        if is_postgresql and not await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": COMPACTION_LOCK_ID}):
+            report["skipped_locked"] = True
+            break
+        size = batch_size if limit is None else min(batch_size, limit - report["archived"])
+        rows = (await db.execute(
+            archive_candidates(cutoff).where(MealPlan.id > last_id).order_by(MealPlan.id).limit(size)
+        )).all()
+        if not rows:
+            await db.commit()
+            break
+        last_id = rows[-1].id
+
+        documents = [serialize_plan(row.plan_data) for row in rows]
+        compressed = await asyncio.to_thread(_compress_batch, documents, zstd_dictionary)
+        now = datetime.utcnow()
+        await db.execute(archive, [
+            {"plan_id": row.id, "read_updated_at": row.updated_at, "archived_data": data, "archived_at": now}
+            for row, data in zip(rows, compressed)
+        ])
+        await db.commit()
+
+        before = sum(len(document) for document in documents)
+        after = sum(len(data) for data in compressed)
+        report["archived"] += len(rows)
+        report["bytes_before"] += before
+        report["bytes_after"] += after
+        archived_plans_total.inc(len(rows))
+        archived_bytes_total.inc(before, stage="before")
+        archived_bytes_total.inc(after, stage="after")
+    return report
+
+async def run_compaction_periodically(session_factory, interval_minutes: int) -> None:
+    """Background task started by the API when PLAN_ARCHIVE_INTERVAL_MINUTES is set"""
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            async with session_factory() as db:
+                report = await compact_meal_plans(db)
+            if report["archived"]:
+                print(f"[Plan archive] Archived {report['archived']} plans, {report['bytes_before']} -> {report['bytes_after']} bytes")
+        except Exception as e:
+            print(f"[Plan archive] Compaction failed: {str(e)}")
+
+async def load_plan_document(db: AsyncSession, meal_plan_id: int) -> Any:
+    """Full (decompressed) document of a plan, for reads that cannot be answered inside the database"""
+    meal_plan = await find_plan(
+        db, meal_plan_id, select(MealPlan).where(MealPlan.id == meal_plan_id).execution_options(populate_existing=True)
+    )
+    return meal_plan.plan_data if meal_plan else None
+
+async def restore_meal_plans(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """Move every archived plan back to uncompressed plan_data; returns the number restored"""
+    batch_size = batch_size or settings.PLAN_ARCHIVE_BATCH_SIZE
+    restored = 0
+    while True:
+        meal_plans = (await db.scalars(
+            select(MealPlan).where(MealPlan.archived_at.is_not(None)).order_by(MealPlan.id).limit(batch_size)
+        )).all()
+        if not meal_plans:
+            return restored
+        for meal_plan in meal_plans:
+            # Decompressed on load; marking it modified writes it back and clears the archive columns
+            attributes.flag_modified(meal_plan, "_plan_data")
+        await db.commit()
+        restored += len(meal_plans)
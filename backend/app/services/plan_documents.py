@@ -0,0 +1,66 @@
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+from fastapi import HTTPException, status
+from ..models.models import MealPlan
+
+# Parts of a plan document extracted inside the database.
+#
+# Paths are dot-separated keys into plan_data ("macros", "weekly_plan.week1.monday").
+# Each one becomes a plan_data #> '{...}' expression, so PostgreSQL sends only the
+# requested sub-documents instead of the whole two-week plan.
+
+PATH_SEGMENT = re.compile(r"^[A-Za-z0-9_]+$")
+MAX_FIELDS = 20
+
+# Plan columns returned alongside a partial plan_data
+PLAN_COLUMNS = ("id", "user_id", "created_at", "updated_at", "is_active", "start_date", "end_date")
+
+def parse_fields(fields: str) -> List[Tuple[str, ...]]:
+    """
+    Parse ?fields=a,b.c into key paths, dropping paths already covered by a
+    shorter one. Raises 400 for empty or malformed paths.
+    """
+    paths = []
+    for field in fields.split(","):
+        path = tuple(field.strip().split("."))
+        if not all(PATH_SEGMENT.match(segment) for segment in path):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid field path: '{field.strip()}'")
+        paths.append(path)
+    if len(paths) > MAX_FIELDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_FIELDS} fields can be requested")
+
+    paths.sort(key=len)
+    kept = []
+    for path in paths:
+        if not any(path[:len(prefix)] == prefix for prefix in kept):
+            kept.append(path)
+    return kept
+
+def check_path_segment(segment: str) -> str:
+    if not PATH_SEGMENT.match(segment):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid path segment: '{segment}'")
+    return segment
+
+def path_expression(path: Sequence[str]):
+    """plan_data sub-document at the given key path"""
+    return MealPlan.plan_data[tuple(path)] if len(path) > 1 else MealPlan.plan_data[path[0]]
+
+def nest_paths(paths: Sequence[Tuple[str, ...]], values: Sequence[Any]) -> Dict:
+    """Rebuild a partial document from extracted values; missing paths are left out"""
+    document = {}
+    for path, value in zip(paths, values):
+        if value is None:
+            continue
+        node = document
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return document
+
+def extract_path(document: Any, path: Sequence[str]) -> Any:
+    """Python equivalent of path_expression, for documents held in archival storage"""
+    for key in path:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    return document
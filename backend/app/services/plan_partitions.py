@@ -0,0 +1,156 @@
+import bisect
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core import metrics
+from ..models.models import MealPlan
+
+# Monthly range partitions of meal_plans (PostgreSQL only).
+#
+# meal_plans is partitioned by created_at: meal_plans_legacy holds everything
+# created before the partitioning migration, then there is one partition per
+# month (meal_plans_p2026_11, ...). Partitions are created ahead of time by
+# ensure_partitions, and services/plan_retention.py empties and drops old ones.
+# Old partitions stop receiving writes, so autovacuum and index maintenance
+# only work on the recent months however much history accumulates.
+#
+# Listings filter and order by created_at and are pruned by PostgreSQL itself.
+# Lookups by id carry no partition key, so partition_floor maps an id to a
+# created_at lower bound (ids and creation times grow together) and
+# find_plan_row retries without the bound on a miss, e.g. for back-dated rows.
+
+PARTITION_BOUND = re.compile(r"FROM \((.+)\) TO \((.+)\)")
+# Creation times of neighbouring ids can be slightly out of order around a month boundary
+FLOOR_MARGIN = timedelta(hours=1)
+FLOOR_TTL_SECONDS = 600
+
+lookup_fallbacks_total = metrics.counter(
+    "meal_plan_partition_lookup_fallbacks_total", "Lookups by id whose partition hint missed and were retried unpruned"
+)
+
+_partitioned: Optional[bool] = None
+# (lowest id, partition lower bound) for each monthly partition, ordered by id
+_floors: List[Tuple[int, datetime]] = []
+_floors_loaded_at = float("-inf")
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(moment: datetime, months: int) -> datetime:
+    month = moment.month - 1 + months
+    return moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+
+def partition_name(start: datetime) -> str:
+    return f"meal_plans_p{start.year:04d}_{start.month:02d}"
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    """Whether meal_plans is a partitioned table (cached; only a migration changes it)"""
+    global _partitioned
+    if db.bind.dialect.name != "postgresql":
+        return False
+    if _partitioned is None:
+        _partitioned = bool(await db.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'meal_plans'::regclass)"
+        )))
+    return _partitioned
+
+async def list_partitions(db: AsyncSession) -> List[Dict]:
+    """Partitions with their bounds (None for MINVALUE), estimated rows and total size, oldest first"""
+    if not await is_partitioned(db):
+        return []
+    rows = (await db.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'meal_plans'::regclass
+    """))).all()
+    partitions = []
+    for name, bound, rows_estimate, size in rows:
+        match = PARTITION_BOUND.search(bound)
+        if not match:
+            continue
+        partitions.append({
+            "name": name,
+            "from": _parse_bound(match.group(1)),
+            "to": _parse_bound(match.group(2)),
+            "rows_estimate": max(rows_estimate, 0),
+            "bytes": size
+        })
+    return sorted(partitions, key=lambda partition: partition["from"] or datetime.min)
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int) -> List[str]:
+    """Create the monthly partitions up to months_ahead after the current month; returns the new ones"""
+    if not await is_partitioned(db):
+        return []
+    partitions = await list_partitions(db)
+    covered_until = max((partition["to"] for partition in partitions if partition["to"]), default=None)
+    start = month_start(datetime.utcnow())
+    if covered_until is not None and covered_until > start:
+        start = covered_until
+    last = add_months(month_start(datetime.utcnow()), months_ahead + 1)
+
+    created = []
+    # Creating a partition locks meal_plans briefly; give up rather than queue behind long queries
+    await db.execute(text("SET LOCAL lock_timeout = '5s'"))
+    while start < last:
+        end = add_months(month_start(start), 1)
+        name = partition_name(start)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF meal_plans FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+        ))
+        created.append(name)
+        start = end
+    await db.commit()
+    return created
+
+async def drop_partition(db: AsyncSession, name: str) -> None:
+    await db.execute(text("SET LOCAL lock_timeout = '5s'"))
+    await db.execute(text(f"ALTER TABLE meal_plans DETACH PARTITION {name}"))
+    await db.execute(text(f"DROP TABLE {name}"))
+    await db.commit()
+
+async def refresh_floors(db: AsyncSession) -> None:
+    global _floors, _floors_loaded_at
+    floors = []
+    for partition in await list_partitions(db):
+        if partition["from"] is None:
+            continue
+        lowest_id = await db.scalar(text(f"SELECT min(id) FROM {partition['name']}"))
+        if lowest_id is not None:
+            floors.append((lowest_id, partition["from"]))
+    _floors = sorted(floors)
+    _floors_loaded_at = time.monotonic()
+
+async def partition_floor(db: AsyncSession, meal_plan_id: int) -> Optional[datetime]:
+    """created_at lower bound for a plan id, or None when no partition can be ruled out"""
+    if not await is_partitioned(db):
+        return None
+    if time.monotonic() - _floors_loaded_at > FLOOR_TTL_SECONDS:
+        await refresh_floors(db)
+    index = bisect.bisect_right(_floors, (meal_plan_id, datetime.max)) - 1
+    if index < 0:
+        return None
+    return _floors[index][1] - FLOOR_MARGIN
+
+async def find_plan_row(db: AsyncSession, meal_plan_id: int, query):
+    """First row of a query selecting meal plan meal_plan_id, pruned to the partitions that can hold it"""
+    floor = await partition_floor(db, meal_plan_id)
+    if floor is not None:
+        row = (await db.execute(query.where(MealPlan.created_at >= floor))).first()
+        if row is not None:
+            return row
+        lookup_fallbacks_total.inc()
+    return (await db.execute(query)).first()
+
+async def find_plan(db: AsyncSession, meal_plan_id: int, query) -> Optional[MealPlan]:
+    """find_plan_row for a select(MealPlan) query"""
+    row = await find_plan_row(db, meal_plan_id, query)
+    return row[0] if row else None
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import zstandard
+from sqlalchemy import delete, event, exists, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from ..core import metrics
+from ..core.config import get_settings
+from ..models.models import MealPlan, MealPlanMeal
+from .plan_partitions import drop_partition, ensure_partitions, is_partitioned, list_partitions
+from .stats import apply_counter_deltas
+
+settings = get_settings()
+
+# Retirement and retention of meal plans.
+#
+# A user's newest plan is their active one: saving a plan marks the user's
+# earlier plans inactive. With PLAN_RETENTION_DAYS set, inactive plans older
+# than that which have a newer plan are written to a zstd-compressed JSON Lines
+# file under PLAN_EXPORT_DIR (one file per run, full documents) and deleted.
+# Each batch is on disk before its rows are deleted, so an interrupted run can
+# repeat plans in the next export but never loses one. Partitions lying wholly
+# before the cutoff are dropped once empty; the latest plan of a dormant user
+# keeps its partition.
+
+EXPORT_COMPRESSION_LEVEL = 10
+RETENTION_BATCH_SIZE = 500
+# pg_try_advisory_xact_lock key, so only one worker runs retention at a time
+RETENTION_LOCK_ID = 7_311_041
+EXPORT_COLUMNS = ("id", "user_id", "created_at", "updated_at", "start_date", "end_date", "is_active")
+
+exported_plans_total = metrics.counter("plan_retention_exported_total", "Meal plans exported and deleted by the retention policy")
+dropped_partitions_total = metrics.counter("plan_retention_dropped_partitions_total", "Emptied meal_plans partitions dropped")
+
+@event.listens_for(MealPlan, "after_insert")
+def retire_previous_plans(mapper, connection, meal_plan: MealPlan) -> None:
+    """A new plan supersedes the user's earlier ones"""
+    if meal_plan.is_active is False:
+        return
+    table = MealPlan.__table__
+    retired = connection.execute(
+        update(table)
+        .where(table.c.user_id == meal_plan.user_id, table.c.id != meal_plan.id, table.c.is_active.is_not(False))
+        # Not an edit of those plans, so updated_at stays
+        .values(is_active=False, updated_at=table.c.updated_at)
+    ).rowcount
+    if retired:
+        apply_counter_deltas(connection, {"meal_plans_active": -retired})
+
+def retention_criteria(cutoff: datetime) -> List:
+    """Inactive plans created before cutoff that have a newer plan of the same user"""
+    newer = aliased(MealPlan)
+    return [
+        MealPlan.created_at < cutoff,
+        MealPlan.is_active == False,
+        exists().where(newer.user_id == MealPlan.user_id, newer.created_at > MealPlan.created_at)
+    ]
+
+def export_line(meal_plan: MealPlan) -> bytes:
+    row = {column: getattr(meal_plan, column) for column in EXPORT_COLUMNS}
+    row["plan_data"] = meal_plan.plan_data
+    return json.dumps(row, default=str, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+def _write_batch(writer, raw, lines: List[bytes]) -> None:
+    for line in lines:
+        writer.write(line)
+    # End the zstd frame and make the batch durable before its rows are deleted
+    writer.flush(zstandard.FLUSH_FRAME)
+    raw.flush()
+    os.fsync(raw.fileno())
+
+async def drop_empty_partitions(db: AsyncSession, cutoff: datetime) -> List[str]:
+    """Drop partitions that end before cutoff and hold no plans"""
+    dropped = []
+    for partition in await list_partitions(db):
+        if partition["to"] is None or partition["to"] > cutoff:
+            continue
+        if await db.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {partition['name']})")):
+            continue
+        await drop_partition(db, partition["name"])
+        dropped_partitions_total.inc()
+        dropped.append(partition["name"])
+    await db.commit()
+    return dropped
+
+async def apply_retention(
+    db: AsyncSession,
+    retention_days: Optional[int] = None,
+    export_dir: Optional[str] = None,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    limit: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict:
+    """Export and delete plans past the retention period, then drop emptied partitions"""
+    retention_days = settings.PLAN_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days <= 0:
+        return {"enabled": False}
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    criteria = retention_criteria(cutoff)
+    report = {"enabled": True, "cutoff": cutoff, "exported": 0, "export_file": None, "export_bytes": 0,
+              "dropped_partitions": [], "skipped_locked": False}
+    if dry_run:
+        report["candidates"] = await db.scalar(select(func.count()).select_from(MealPlan).where(*criteria))
+        return report
+
+    is_postgresql = db.bind.dialect.name == "postgresql"
+    path = Path(export_dir or settings.PLAN_EXPORT_DIR) / f"meal_plans_{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.zst"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = MealPlan.__table__
+    last_id = 0
+    with open(path, "ab") as raw:
+        writer = zstandard.ZstdCompressor(level=EXPORT_COMPRESSION_LEVEL).stream_writer(raw, closefd=False)
+        while limit is None or report["exported"] < limit:
+            if is_postgresql and not await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RETENTION_LOCK_ID}):
+                report["skipped_locked"] = True
+                break
+            size = batch_size if limit is None else min(batch_size, limit - report["exported"])
+            meal_plans = (await db.scalars(
+                select(MealPlan).where(*criteria, MealPlan.id > last_id).order_by(MealPlan.id).limit(size)
+            )).all()
+            if not meal_plans:
+                await db.commit()
+                break
+            last_id = meal_plans[-1].id
+            await asyncio.to_thread(_write_batch, writer, raw, [export_line(meal_plan) for meal_plan in meal_plans])
+
+            ids = [meal_plan.id for meal_plan in meal_plans]
+            await db.execute(delete(MealPlanMeal).where(MealPlanMeal.meal_plan_id.in_(ids)))
+            await db.execute(delete(table).where(table.c.id.in_(ids), table.c.created_at < cutoff))
+            # Only inactive plans of users with a newer plan: the other counters are unchanged
+            await db.run_sync(lambda session: apply_counter_deltas(session.connection(), {"meal_plans_total": -len(ids)}))
+            await db.commit()
+            db.expunge_all()
+            report["exported"] += len(ids)
+            exported_plans_total.inc(len(ids))
+
+    if report["exported"]:
+        report["export_file"] = str(path)
+        report["export_bytes"] = path.stat().st_size
+    else:
+        path.unlink(missing_ok=True)
+    if not report["skipped_locked"] and await is_partitioned(db):
+        report["dropped_partitions"] = await drop_empty_partitions(db, cutoff)
+    return report
+
+async def maintain_meal_plans(db: AsyncSession) -> Dict:
+    """Create upcoming partitions and apply the retention policy"""
+    return {
+        "created_partitions": await ensure_partitions(db, settings.PLAN_PARTITION_PREMAKE_MONTHS),
+        "retention": await apply_retention(db)
+    }
+
+async def run_maintenance_periodically(session_factory, interval_minutes: int) -> None:
+    """Background task started by the API when PLAN_MAINTENANCE_INTERVAL_MINUTES is set; runs once at startup"""
+    while True:
+        try:
+            async with session_factory() as db:
+                report = await maintain_meal_plans(db)
+            retention = report["retention"]
+            if retention.get("exported") or retention.get("dropped_partitions"):
+                print(f"[Plan retention] Exported {retention['exported']} plans to {retention['export_file']}, "
+                      f"dropped partitions: {retention['dropped_partitions']}")
+        except Exception as e:
+            print(f"[Plan retention] Maintenance failed: {str(e)}")
+        await asyncio.sleep(interval_minutes * 60)
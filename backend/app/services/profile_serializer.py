@@ -0,0 +1,128 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from ..models.models import Question, QuestionCategory
+
+# Serializes a user's questionnaire profile into the user message sent to the model.
+#
+# Formats:
+#   json          - the original pretty-printed structured data
+#   compact_json  - empty values and contact details dropped, no whitespace
+#   text          - "label: value" lines grouped by question category, using a
+#                   template compiled once from the question metadata
+
+PROFILE_FORMATS = ("json", "compact_json", "text")
+
+# Contact details and the waiver don't influence the plan, so they are not sent
+EXCLUDED_FIELDS = {
+    "personalInfo.fullName",
+    "personalInfo.phoneNumber",
+    "personalInfo.email",
+    "waiver.agreement",
+}
+
+CATEGORY_ORDER = {category: index for index, category in enumerate(QuestionCategory)}
+
+_UNIT_PATTERN = re.compile(r"\(([^()]{1,6})\)")
+
+def is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+def prune_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings, empty lists and empty dicts"""
+    if isinstance(value, dict):
+        pruned = {key: prune_empty(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if not is_empty(item)}
+    if isinstance(value, list):
+        pruned = [prune_empty(item) for item in value]
+        return [item for item in pruned if not is_empty(item)]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def flatten_profile(structured_data: Dict, prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested structured data back into {field_key: value}"""
+    flat = {}
+    for key, value in structured_data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and value:
+            flat.update(flatten_profile(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+def humanize(identifier: str) -> str:
+    """Turn a camelCase field_key segment into lowercase words"""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", " ", identifier).lower()
+
+def field_label(field_key: str, question_text: Optional[str] = None) -> str:
+    """Short label for a field: its path below the section, plus a unit from the question text"""
+    parts = field_key.split(".")
+    label = " ".join(humanize(part) for part in (parts[1:] or parts))
+    if question_text:
+        unit = _UNIT_PATTERN.search(question_text)
+        if unit:
+            label = f"{label} ({unit.group(1)})"
+    return label
+
+@lru_cache(maxsize=32)
+def _compile_template(signature: Tuple[Tuple[str, str, int, str], ...]) -> Tuple[Tuple[str, Tuple[Tuple[str, str], ...]], ...]:
+    sections = {}
+    for field_key, category, order, text in sorted(signature, key=lambda q: (CATEGORY_ORDER[QuestionCategory(q[1])], q[2])):
+        if field_key in EXCLUDED_FIELDS:
+            continue
+        sections.setdefault(category, []).append((field_key, field_label(field_key, text)))
+    return tuple(
+        (category.replace("_", " ").capitalize(), tuple(fields))
+        for category, fields in sections.items()
+    )
+
+def compile_profile_template(questions: List[Question]) -> Tuple:
+    """
+    Compile the text template for a set of questions. Templates are cached by the
+    questions' metadata, so a template is only built once per questionnaire version.
+    """
+    signature = tuple(sorted(
+        (question.field_key, question.category.value, question.order, question.text or "")
+        for question in questions
+    ))
+    return _compile_template(signature)
+
+def format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        return ", ".join(format_value(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
+
+def render_profile_text(template: Tuple, structured_data: Dict) -> str:
+    """Render the profile as compact natural-language lines, one per section"""
+    values = flatten_profile(prune_empty(structured_data))
+    lines = []
+    for section, fields in template:
+        entries = [f"{label}: {format_value(values[field_key])}" for field_key, label in fields if field_key in values]
+        if entries:
+            lines.append(f"{section}: " + "; ".join(entries))
+    return "\n".join(lines)
+
+def serialize_profile(structured_data: Dict, profile_format: str = "compact_json", template: Optional[Tuple] = None) -> str:
+    """Serialize the structured profile for the model's user message"""
+    if profile_format == "json":
+        return json.dumps(structured_data, indent=2)
+
+    if profile_format == "text" and template is not None:
+        return render_profile_text(template, structured_data)
+
+    # compact_json, or text without question metadata to build a template from
+    flat = {key: value for key, value in flatten_profile(structured_data).items() if key not in EXCLUDED_FIELDS}
+    compact = {}
+    for field_key, value in flat.items():
+        current = compact
+        parts = field_key.split(".")
+        for part in parts[:-1]:
+            current = current.setdefault(part, {})
+        current[parts[-1]] = value
+    return json.dumps(prune_empty(compact), separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,320 @@
+import asyncio
+import math
+import random
+import uuid
+from datetime import datetime
+from collections import Counter
+from typing import List, Dict, Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import get_settings
+from ..models.models import UserResponse, SystemPrompt
+from .prompt_experiments import get_prompt_variants
+from .user_profiles import get_path_index, load_profiles
+from .token_estimator import estimate_tokens
+from .openai_service import (
+    build_meal_plan_messages,
+    compose_system_prompt,
+    normalize_meal_plan,
+    parse_meal_plan_content,
+    request_meal_plan_completion,
+    DAYS,
+    WEEKS,
+)
+
+settings = get_settings()
+
+# Offline prompt evaluation: replay stored user profiles against candidate
+# system prompts and compare latency, token usage, repair rates and plan quality.
+
+async def load_profile_sample(db: AsyncSession, sample_size: int, seed: Optional[int] = None) -> List[Dict]:
+    """Load the structured questionnaire data of a random sample of users"""
+    user_ids = (await db.scalars(select(UserResponse.user_id).distinct())).all()
+    rng = random.Random(seed)
+    sampled_ids = rng.sample(user_ids, min(sample_size, len(user_ids)))
+    if not sampled_ids:
+        return []
+
+    profiles = await load_profiles(db, sampled_ids)
+    template = (await get_path_index(db)).template
+
+    return [
+        {
+            'user_id': user_id,
+            'structured_data': profiles[user_id].document,
+            'template': template
+        }
+        for user_id in sampled_ids
+        if user_id in profiles
+    ]
+
+async def build_candidates(
+    db: AsyncSession,
+    prompt_ids: List[int],
+    drafts: List[Dict],
+    include_active: bool = True
+) -> List[Dict]:
+    """
+    Collect the prompts to evaluate: the active meal plan prompt variants,
+    stored prompt versions by id and unsaved drafts.
+    """
+    candidates = []
+    if include_active:
+        variants = [variant for variant in await get_prompt_variants(db) if variant.prompt_text]
+        for variant in variants:
+            candidates.append({'label': variant.name, 'prompt_id': variant.id, 'prompt_text': variant.prompt_text})
+        if not variants:
+            candidates.append({'label': 'default', 'prompt_id': None, 'prompt_text': None})
+
+    if prompt_ids:
+        existing = {candidate['prompt_id'] for candidate in candidates}
+        prompts = (await db.scalars(select(SystemPrompt).where(SystemPrompt.id.in_(prompt_ids)))).all()
+        missing = set(prompt_ids) - {prompt.id for prompt in prompts}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"System prompts not found: {sorted(missing)}")
+        for prompt in prompts:
+            if prompt.id in existing:
+                continue
+            candidates.append({'label': prompt.name, 'prompt_id': prompt.id, 'prompt_text': prompt.prompt_text})
+
+    for draft in drafts:
+        candidates.append({'label': draft['label'], 'prompt_id': None, 'prompt_text': draft['prompt_text']})
+
+    return candidates
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of the given values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+def compute_plan_stats(meal_plan: Dict) -> Dict:
+    """
+    Plan-level quality stats computed on the parsed (pre-normalization) plan:
+    calorie accuracy against the stated daily target and meal variety.
+    """
+    weekly_plan = meal_plan.get('weekly_plan') if isinstance(meal_plan, dict) else None
+    daily_calories = meal_plan.get('daily_calories') if isinstance(meal_plan, dict) else None
+    if not isinstance(weekly_plan, dict):
+        return {'calorie_error_pct': None, 'meal_variety': None, 'week_repeat_rate': None}
+
+    calorie_errors = []
+    names_by_week = {}
+    all_names = []
+    for week in WEEKS:
+        week_plan = weekly_plan.get(week)
+        if not isinstance(week_plan, dict):
+            continue
+        names_by_week[week] = set()
+        for day in DAYS:
+            day_plan = week_plan.get(day)
+            if not isinstance(day_plan, dict):
+                continue
+            day_total = 0
+            for meals in day_plan.values():
+                for meal in meals if isinstance(meals, list) else [meals]:
+                    if not isinstance(meal, dict):
+                        continue
+                    calories = meal.get('calories')
+                    if isinstance(calories, (int, float)):
+                        day_total += calories
+                    name = str(meal.get('name', '')).strip().lower()
+                    if name:
+                        all_names.append(name)
+                        names_by_week[week].add(name)
+            if isinstance(daily_calories, (int, float)) and daily_calories > 0 and day_total:
+                calorie_errors.append(abs(day_total - daily_calories) / daily_calories * 100)
+
+    week_repeat_rate = None
+    if len(names_by_week) == 2 and names_by_week['week1'] and names_by_week['week2']:
+        week_repeat_rate = len(names_by_week['week1'] & names_by_week['week2']) / len(names_by_week['week2'])
+
+    return {
+        'calorie_error_pct': mean(calorie_errors),
+        'meal_variety': len(set(all_names)) / len(all_names) if all_names else None,
+        'week_repeat_rate': week_repeat_rate
+    }
+
+async def evaluate_profile(candidate: Dict, profile: Dict, provider: Optional[str], profile_format: Optional[str]) -> Dict:
+    """Run one profile against one candidate prompt and collect its measurements"""
+    messages = build_meal_plan_messages(
+        compose_system_prompt(candidate['prompt_text']),
+        profile['structured_data'],
+        profile.get('template'),
+        profile_format
+    )
+    result = {'user_id': profile['user_id'], 'error': None, 'parse_failed': False,
+              'parse_repairs': [], 'normalization_repairs': [],
+              'profile_tokens': estimate_tokens(messages[-1]['content'])}
+
+    try:
+        completion = await request_meal_plan_completion(messages, provider)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    result.update({
+        'latency_ms': completion['latency_ms'],
+        'prompt_tokens': completion['prompt_tokens'],
+        'completion_tokens': completion['completion_tokens']
+    })
+
+    try:
+        meal_plan, result['parse_repairs'] = parse_meal_plan_content(completion['content'])
+    except HTTPException:
+        result['parse_failed'] = True
+        return result
+
+    result.update(compute_plan_stats(meal_plan))
+    _, result['normalization_repairs'] = normalize_meal_plan(meal_plan)
+    return result
+
+def summarize_results(candidate: Dict, results: List[Dict]) -> Dict:
+    """Aggregate per-profile results into the report for one candidate prompt"""
+    completed = [r for r in results if r['error'] is None]
+    parsed = [r for r in completed if not r['parse_failed']]
+    latencies = [r['latency_ms'] for r in completed]
+    completion_tokens = [r['completion_tokens'] for r in completed if r['completion_tokens'] is not None]
+    prompt_tokens = [r['prompt_tokens'] for r in completed if r['prompt_tokens'] is not None]
+    profile_tokens = [r['profile_tokens'] for r in results]
+
+    repair_counts = Counter()
+    for r in parsed:
+        repair_counts.update(r['parse_repairs'])
+        repair_counts.update(r['normalization_repairs'])
+
+    def rate(items, predicate):
+        return sum(1 for item in items if predicate(item)) / len(items) if items else None
+
+    return {
+        'label': candidate['label'],
+        'prompt_id': candidate.get('prompt_id'),
+        'samples': len(results),
+        'errors': len(results) - len(completed),
+        'latency_ms': {
+            'mean': mean(latencies),
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99)
+        },
+        'completion_tokens': {
+            'mean': mean(completion_tokens),
+            'p50': percentile(completion_tokens, 50),
+            'p90': percentile(completion_tokens, 90),
+            'total': sum(completion_tokens)
+        },
+        'prompt_tokens_mean': mean(prompt_tokens),
+        'profile_tokens_mean': mean(profile_tokens),
+        'parse_failure_rate': rate(completed, lambda r: r['parse_failed']),
+        'parse_repair_rate': rate(parsed, lambda r: r['parse_repairs']),
+        'normalization_repair_rate': rate(parsed, lambda r: r['normalization_repairs']),
+        'repairs': dict(repair_counts),
+        'calorie_error_pct': mean([r['calorie_error_pct'] for r in parsed if r.get('calorie_error_pct') is not None]),
+        'meal_variety': mean([r['meal_variety'] for r in parsed if r.get('meal_variety') is not None]),
+        'week_repeat_rate': mean([r['week_repeat_rate'] for r in parsed if r.get('week_repeat_rate') is not None])
+    }
+
+async def evaluate_prompts(
+    candidates: List[Dict],
+    profiles: List[Dict],
+    provider: Optional[str] = None,
+    concurrency: int = 5,
+    profile_format: Optional[str] = None
+) -> Dict:
+    """
+    Replay every profile against every candidate prompt with bounded concurrency.
+    Each candidate is a dict with a 'label', 'prompt_text' and optional 'prompt_id'.
+    """
+    provider = provider or settings.MEAL_PLAN_PROVIDER
+    profile_format = profile_format or settings.PROFILE_FORMAT
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(candidate, profile):
+        async with semaphore:
+            return await evaluate_profile(candidate, profile, provider, profile_format)
+
+    print(f"[Prompt Evaluation] Evaluating {len(candidates)} prompts against {len(profiles)} profiles "
+          f"(concurrency={concurrency})")
+    reports = []
+    for candidate in candidates:
+        results = await asyncio.gather(*(run(candidate, profile) for profile in profiles))
+        reports.append(summarize_results(candidate, results))
+        print(f"[Prompt Evaluation] Finished '{candidate['label']}'")
+
+    return {
+        'provider': provider,
+        'profile_format': profile_format,
+        'profiles': len(profiles),
+        'concurrency': concurrency,
+        'prompts': reports
+    }
+
+# Evaluation runs started from the admin API. They run in the background of the worker
+# that accepted them, so a run id is only known to that worker; finished runs are kept
+# until MAX_FINISHED_RUNS newer ones have completed.
+MAX_FINISHED_RUNS = 20
+_runs: Dict[str, Dict] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+def get_evaluation_run(run_id: str) -> Optional[Dict]:
+    """Status of an evaluation run, with its report once it has finished"""
+    return _runs.get(run_id)
+
+def active_evaluation_run() -> Optional[str]:
+    """Id of the evaluation run still in progress on this worker, if any"""
+    return next(iter(_tasks), None)
+
+def start_evaluation_run(
+    candidates: List[Dict],
+    profiles: List[Dict],
+    provider: Optional[str] = None,
+    concurrency: int = 5,
+    profile_format: Optional[str] = None
+) -> Dict:
+    """Start evaluate_prompts in the background and return the run's status record"""
+    run_id = uuid.uuid4().hex
+    run = {
+        'run_id': run_id,
+        'status': 'running',
+        'prompts': len(candidates),
+        'profiles': len(profiles),
+        'started_at': datetime.utcnow().isoformat(),
+        'finished_at': None,
+        'report': None,
+        'error': None
+    }
+    _runs[run_id] = run
+
+    async def execute():
+        try:
+            run['report'] = await evaluate_prompts(
+                candidates,
+                profiles,
+                provider=provider,
+                concurrency=concurrency,
+                profile_format=profile_format
+            )
+            run['status'] = 'completed'
+        except Exception as e:
+            print(f"[Prompt Evaluation] Run {run_id} failed: {e}")
+            run['status'] = 'failed'
+            run['error'] = str(e)
+        finally:
+            run['finished_at'] = datetime.utcnow().isoformat()
+            _tasks.pop(run_id, None)
+            _prune_finished_runs()
+
+    _tasks[run_id] = asyncio.create_task(execute())
+    print(f"[Prompt Evaluation] Started run {run_id}")
+    return run
+
+def _prune_finished_runs():
+    finished = [run_id for run_id, run in _runs.items() if run['status'] != 'running']
+    for run_id in finished[:-MAX_FINISHED_RUNS]:
+        del _runs[run_id]
@@ -0,0 +1,193 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+from sqlalchemy import func, case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import get_settings
+from ..models.models import SystemPrompt, MealPlanGeneration
+
+settings = get_settings()
+
+MEAL_PLAN_EXPERIMENT = "meal_plan"
+
+async def get_prompt_variants(db: AsyncSession, experiment: str = MEAL_PLAN_EXPERIMENT) -> List[SystemPrompt]:
+    """
+    Get the active prompt variants of an experiment, ordered by id so that
+    bucket boundaries stay stable while the variant set is unchanged.
+    Falls back to the single active prompt named after the experiment.
+    """
+    variants = (await db.scalars(
+        select(SystemPrompt).where(
+            SystemPrompt.experiment == experiment,
+            SystemPrompt.is_active == True,
+            SystemPrompt.traffic_weight > 0
+        ).order_by(SystemPrompt.id)
+    )).all()
+    if variants:
+        return variants
+
+    prompt = await db.scalar(
+        select(SystemPrompt).where(
+            SystemPrompt.name == experiment,
+            SystemPrompt.is_active == True
+        ).limit(1)
+    )
+    return [prompt] if prompt else []
+
+def assign_variant(variants: List[SystemPrompt], experiment: str, user_id: int) -> Optional[SystemPrompt]:
+    """
+    Pick a variant for the user proportionally to the traffic weights.
+    The user is hashed into a fixed bucket, so assignment is sticky.
+    """
+    if not variants:
+        return None
+    if len(variants) == 1:
+        return variants[0]
+
+    total_weight = sum(max(variant.traffic_weight or 0, 0) for variant in variants)
+    if total_weight <= 0:
+        return variants[0]
+
+    digest = hashlib.sha256(f"{experiment}:{user_id}".encode("utf-8")).hexdigest()
+    bucket = int(digest[:8], 16) % total_weight
+    cumulative = 0
+    for variant in variants:
+        cumulative += max(variant.traffic_weight or 0, 0)
+        if bucket < cumulative:
+            return variant
+    return variants[-1]
+
+async def select_prompt_variant(db: AsyncSession, user_id: Optional[int], experiment: str = MEAL_PLAN_EXPERIMENT) -> Optional[SystemPrompt]:
+    """Select the prompt variant to use for this user"""
+    variants = await get_prompt_variants(db, experiment)
+    if user_id is None:
+        return variants[0] if variants else None
+    return assign_variant(variants, experiment, user_id)
+
+def record_generation(
+    db: AsyncSession,
+    user_id: int,
+    prompt: Optional[SystemPrompt],
+    status: str,
+    completion: Optional[Dict] = None,
+    repair_count: int = 0,
+    experiment: str = MEAL_PLAN_EXPERIMENT
+) -> MealPlanGeneration:
+    """Add a generation record to the session; the caller commits it"""
+    completion = completion or {}
+    generation = MealPlanGeneration(
+        user_id=user_id,
+        system_prompt_id=prompt.id if prompt else None,
+        experiment=experiment,
+        variant=prompt.name if prompt else "default",
+        status=status,
+        latency_ms=completion.get('latency_ms'),
+        prompt_tokens=completion.get('prompt_tokens'),
+        completion_tokens=completion.get('completion_tokens'),
+        repair_count=repair_count
+    )
+    db.add(generation)
+    return generation
+
+async def get_experiment_stats(db: AsyncSession, experiment: str, days: int = 30) -> Dict:
+    """
+    Aggregate generation metrics per variant. A generation counts as regenerated
+    when the same user generates again within REGENERATION_WINDOW_HOURS.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    window = timedelta(hours=settings.REGENERATION_WINDOW_HOURS)
+
+    generations = select(
+        MealPlanGeneration.system_prompt_id,
+        MealPlanGeneration.variant,
+        MealPlanGeneration.user_id,
+        MealPlanGeneration.status,
+        MealPlanGeneration.latency_ms,
+        MealPlanGeneration.prompt_tokens,
+        MealPlanGeneration.completion_tokens,
+        MealPlanGeneration.repair_count,
+        MealPlanGeneration.created_at,
+        func.lead(MealPlanGeneration.created_at).over(
+            partition_by=MealPlanGeneration.user_id,
+            order_by=MealPlanGeneration.created_at
+        ).label('next_generation_at')
+    ).where(
+        MealPlanGeneration.experiment == experiment,
+        MealPlanGeneration.created_at >= since
+    ).subquery()
+
+    succeeded = generations.c.status == 'success'
+    rows = (await db.execute(
+        select(
+            generations.c.system_prompt_id,
+            generations.c.variant,
+            func.count().label('generations'),
+            func.count(func.distinct(generations.c.user_id)).label('users'),
+            func.avg(generations.c.latency_ms).label('latency_mean'),
+            func.percentile_cont(0.5).within_group(generations.c.latency_ms).label('latency_p50'),
+            func.percentile_cont(0.95).within_group(generations.c.latency_ms).label('latency_p95'),
+            func.avg(generations.c.prompt_tokens).label('prompt_tokens_mean'),
+            func.avg(generations.c.completion_tokens).label('completion_tokens_mean'),
+            func.sum(case((generations.c.status == 'parse_failed', 1), else_=0)).label('parse_failures'),
+            func.sum(case((generations.c.status == 'provider_error', 1), else_=0)).label('provider_errors'),
+            func.sum(case((generations.c.repair_count > 0, 1), else_=0)).label('repaired'),
+            func.sum(case((succeeded, 1), else_=0)).label('successes'),
+            func.sum(case(
+                (succeeded & (generations.c.next_generation_at <= generations.c.created_at + window), 1),
+                else_=0
+            )).label('regenerations')
+        ).group_by(generations.c.system_prompt_id, generations.c.variant)
+    )).all()
+
+    prompts = {prompt.id: prompt for prompt in (await db.scalars(
+        select(SystemPrompt).where(
+            (SystemPrompt.experiment == experiment) | (SystemPrompt.name == experiment)
+        )
+    )).all()}
+
+    def ratio(count, total):
+        return count / total if total else None
+
+    variants = []
+    seen = set()
+    for row in rows:
+        prompt = prompts.get(row.system_prompt_id)
+        seen.add(row.system_prompt_id)
+        variants.append({
+            'system_prompt_id': row.system_prompt_id,
+            'variant': row.variant,
+            'is_active': prompt.is_active if prompt else None,
+            'traffic_weight': prompt.traffic_weight if prompt else None,
+            'generations': row.generations,
+            'users': row.users,
+            'latency_ms': {
+                'mean': row.latency_mean,
+                'p50': row.latency_p50,
+                'p95': row.latency_p95
+            },
+            'prompt_tokens_mean': float(row.prompt_tokens_mean) if row.prompt_tokens_mean is not None else None,
+            'completion_tokens_mean': float(row.completion_tokens_mean) if row.completion_tokens_mean is not None else None,
+            'parse_failure_rate': ratio(row.parse_failures, row.generations),
+            'provider_error_rate': ratio(row.provider_errors, row.generations),
+            'repair_rate': ratio(row.repaired, row.successes),
+            'regeneration_rate': ratio(row.regenerations, row.successes)
+        })
+
+    # Include configured variants that have no traffic yet
+    for prompt in prompts.values():
+        if prompt.id not in seen and prompt.is_active:
+            variants.append({
+                'system_prompt_id': prompt.id,
+                'variant': prompt.name,
+                'is_active': prompt.is_active,
+                'traffic_weight': prompt.traffic_weight,
+                'generations': 0,
+                'users': 0
+            })
+
+    return {
+        'experiment': experiment,
+        'since': since,
+        'regeneration_window_hours': settings.REGENERATION_WINDOW_HOURS,
+        'variants': variants
+    }
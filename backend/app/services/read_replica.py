@@ -0,0 +1,202 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import text
+from ..core import metrics
+from ..core.config import get_settings
+from ..database import AsyncSessionLocal, ReplicaSessionLocal, async_engine, replica_engine
+
+settings = get_settings()
+
+# Read routing between the primary and the optional read replica.
+#
+# Endpoints that only read take their session from get_read_db, which hands
+# out a replica session unless one of these holds:
+# - the replica is unreachable, or further behind than REPLICA_MAX_LAG_SECONDS;
+# - the caller wrote recently and the replica has not replayed that write yet.
+#
+# For the second check, track_writes_middleware records the primary's WAL
+# position (pg_current_wal_lsn) after each successful write request of a user,
+# and a background task samples the replica's replay position every
+# REPLICA_STATUS_INTERVAL_SECONDS. A stand-in replica that reports no replay
+# position (a second connection to the primary, or SQLite locally) keeps the
+# writer on the primary for the whole pin window instead.
+#
+# Pins live in the worker process; the deployment runs a single worker. With
+# several workers, a read served by another worker can still be stale for up
+# to REPLICA_MAX_LAG_SECONDS.
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Bounds the pin table; expired pins are dropped when it fills up
+MAX_PINS = 50_000
+# A status older than this many intervals means the checker stopped; reads use the primary
+STALE_STATUS_INTERVALS = 3
+_UNKNOWN = object()
+
+REPLICA_STATUS_QUERY = text("""
+    SELECT pg_last_wal_replay_lsn()::text,
+           CASE WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END
+""")
+
+read_routing_total = metrics.counter("db_read_routing_total", "Read-only requests by database and reason", ("target", "reason"))
+replica_lag_seconds = metrics.gauge("db_replica_lag_seconds", "Replication lag of the read replica at the last check")
+replica_available = metrics.gauge("db_replica_available", "1 while the read replica answers status checks")
+replica_pins = metrics.gauge("db_replica_pinned_users", "Users whose reads wait for the replica to catch up")
+replica_pins.set_function(lambda: len(_pins))
+
+class ReplicaStatus:
+    """Last sampled state of the replica"""
+
+    def __init__(self):
+        self.checked_at = float("-inf")
+        self.available = False
+        self.replay_lsn: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            "available": self.available,
+            "lag_seconds": self.lag_seconds,
+            "replay_lsn": format_lsn(self.replay_lsn) if self.replay_lsn is not None else None,
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 3) if self.available else None
+        }
+
+_status = ReplicaStatus()
+# user id -> (primary WAL position after their last write, or None; monotonic time the pin ends)
+_pins: Dict[int, Tuple[Optional[int], float]] = {}
+
+def parse_lsn(value: str) -> int:
+    """PostgreSQL LSN text ('16/B374D848') as a comparable integer"""
+    high, low = value.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+def format_lsn(value: int) -> str:
+    return f"{value >> 32:X}/{value & 0xFFFFFFFF:X}"
+
+def pin_seconds() -> float:
+    # Beyond REPLICA_MAX_LAG_SECONDS the replica is not used at all, so a pin never needs to last longer
+    # (plus one status interval, since the measured lag can be that old)
+    return settings.REPLICA_MAX_LAG_SECONDS + settings.REPLICA_STATUS_INTERVAL_SECONDS
+
+def token_user_id(request: Request) -> Optional[int]:
+    """User id from the bearer token, without a database lookup; None for anonymous or invalid tokens"""
+    user_id = getattr(request.state, "token_user_id", _UNKNOWN)
+    if user_id is not _UNKNOWN:
+        return user_id
+    user_id = None
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_id = int(jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])["sub"])
+        except (JWTError, KeyError, TypeError, ValueError):
+            user_id = None
+    request.state.token_user_id = user_id
+    return user_id
+
+async def check_replica() -> ReplicaStatus:
+    """Sample the replica's replay position and lag"""
+    try:
+        async with replica_engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                replay_lsn, lag = (await connection.execute(REPLICA_STATUS_QUERY)).one()
+                _status.replay_lsn = parse_lsn(replay_lsn) if replay_lsn else None
+                _status.lag_seconds = float(lag or 0)
+            else:
+                await connection.execute(text("SELECT 1"))
+                _status.replay_lsn, _status.lag_seconds = None, 0.0
+        if not _status.available:
+            print("[Read replica] Replica available")
+        _status.available = True
+    except Exception as e:
+        if _status.available:
+            print(f"[Read replica] Replica unavailable, reading from the primary: {str(e)}")
+        _status.available = False
+    _status.checked_at = time.monotonic()
+    replica_available.set(1 if _status.available else 0)
+    if _status.lag_seconds is not None:
+        replica_lag_seconds.set(_status.lag_seconds)
+    return _status
+
+async def run_status_checks(interval_seconds: float) -> None:
+    """Background task started by the API when READ_REPLICA_URL is set"""
+    while True:
+        try:
+            await asyncio.wait_for(check_replica(), timeout=max(interval_seconds, 1))
+        except asyncio.TimeoutError:
+            _status.available = False
+            replica_available.set(0)
+        await asyncio.sleep(interval_seconds)
+
+def choose_target(user_id: Optional[int]) -> Tuple[str, str]:
+    """("replica" or "primary", reason) for a read by the given user"""
+    if ReplicaSessionLocal is None:
+        return "primary", "no_replica"
+    now = time.monotonic()
+    if not _status.available or now - _status.checked_at > STALE_STATUS_INTERVALS * settings.REPLICA_STATUS_INTERVAL_SECONDS:
+        return "primary", "unavailable"
+    if _status.lag_seconds > settings.REPLICA_MAX_LAG_SECONDS:
+        return "primary", "lagging"
+    pin = _pins.get(user_id) if user_id is not None else None
+    if pin is not None:
+        write_lsn, pinned_until = pin
+        if now >= pinned_until:
+            _pins.pop(user_id, None)
+        elif write_lsn is None or _status.replay_lsn is None or _status.replay_lsn < write_lsn:
+            return "primary", "recent_write"
+        else:
+            return "replica", "caught_up"
+    return "replica", "ok"
+
+async def note_write(user_id: int) -> None:
+    """Keep the user's reads on the primary until the replica has their write"""
+    write_lsn = None
+    if async_engine.dialect.name == "postgresql":
+        try:
+            async with async_engine.connect() as connection:
+                write_lsn = parse_lsn(await connection.scalar(text("SELECT pg_current_wal_lsn()::text")))
+        except Exception:
+            # Without a position the pin simply lasts its full window
+            write_lsn = None
+    now = time.monotonic()
+    if len(_pins) >= MAX_PINS:
+        for pinned_user_id, (_, pinned_until) in list(_pins.items()):
+            if pinned_until <= now:
+                del _pins[pinned_user_id]
+    _pins[user_id] = (write_lsn, now + pin_seconds())
+
+async def get_read_db(request: Request):
+    """Session for endpoints that only read: the replica when it is safe for this caller, else the primary"""
+    target, reason = choose_target(token_user_id(request))
+    read_routing_total.inc(target=target, reason=reason)
+    request.state.read_target = target
+    session_factory = ReplicaSessionLocal if target == "replica" else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+def is_replica_session(db) -> bool:
+    return ReplicaSessionLocal is not None and db.bind is replica_engine
+
+async def track_writes_middleware(request: Request, call_next):
+    """Pin writers to the primary; in DEBUG, report which database served a read"""
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        user_id = token_user_id(request)
+        if user_id is not None:
+            await note_write(user_id)
+    read_target = getattr(request.state, "read_target", None)
+    if settings.DEBUG and read_target:
+        response.headers["X-Read-Source"] = read_target
+    return response
+
+def routing_stats() -> Dict:
+    """Replica state and routing counters for the admin metrics endpoint"""
+    return {
+        "configured": ReplicaSessionLocal is not None,
+        "status": _status.as_dict(),
+        "pinned_users": len(_pins),
+        "routed": read_routing_total.snapshot()
+    }
@@ -0,0 +1,209 @@
+from collections import Counter as Tally
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event, func, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.models import User, Question, UserResponse, MealPlan, StatCounter, QuestionResponseDaily
+
+# Precomputed admin statistics.
+#
+# stat_counters holds one row per count shown on the admin dashboard. The counts
+# are adjusted in the same transaction as the write that changes them: ORM writes
+# through the after_flush listener below, bulk response upserts through
+# record_new_responses, and Core bulk writes (plan retirement and retention)
+# through apply_counter_deltas. question_response_daily buckets new responses per
+# question and day for the 7d/30d/90d views. reconcile() recomputes everything
+# from the base tables and reports (and by default repairs) any drift.
+
+# Counter name -> (model, flag that must be true, or None to count every row)
+COUNTERS = {
+    "users_total": (User, None),
+    "users_active": (User, "is_active"),
+    "users_admin": (User, "is_admin"),
+    "questions_total": (Question, None),
+    "questions_active": (Question, "is_active"),
+    "meal_plans_total": (MealPlan, None),
+    "meal_plans_active": (MealPlan, "is_active"),
+}
+USERS_WITH_PLANS = "users_with_plans"
+COUNTER_NAMES = list(COUNTERS) + [USERS_WITH_PLANS]
+
+TIME_RANGES = {"7d": 7, "30d": 30, "90d": 90}
+
+def _flag(obj, name: str) -> bool:
+    """Current value of a boolean column, falling back to the column default"""
+    value = getattr(obj, name)
+    if value is None:
+        default = obj.__table__.c[name].default
+        value = default.arg if default is not None else False
+    return bool(value)
+
+def _previous_flag(obj, name: str) -> bool:
+    history = inspect(obj).attrs[name].history
+    if history.deleted:
+        return bool(history.deleted[0])
+    return _flag(obj, name)
+
+def _counter_deltas(session: Session) -> Tally:
+    deltas = Tally()
+    for name, (model, flag) in COUNTERS.items():
+        for obj in session.new:
+            if isinstance(obj, model) and (flag is None or _flag(obj, flag)):
+                deltas[name] += 1
+        for obj in session.deleted:
+            if isinstance(obj, model) and (flag is None or _previous_flag(obj, flag)):
+                deltas[name] -= 1
+        if flag is None:
+            continue
+        for obj in session.dirty:
+            if isinstance(obj, model) and session.is_modified(obj) and inspect(obj).attrs[flag].history.has_changes():
+                deltas[name] += int(_flag(obj, flag)) - int(_previous_flag(obj, flag))
+    return deltas
+
+def _users_with_plans_delta(session: Session, connection) -> int:
+    """Users whose first plan was added or last plan removed in this flush (indexed per-user counts)"""
+    added = Tally(obj.user_id for obj in session.new if isinstance(obj, MealPlan))
+    removed = {obj.user_id for obj in session.deleted if isinstance(obj, MealPlan)}
+    delta = 0
+    for user_id in set(added) | removed:
+        remaining = connection.scalar(select(func.count()).select_from(MealPlan).where(MealPlan.user_id == user_id))
+        if user_id in added and remaining == added[user_id]:
+            delta += 1
+        elif user_id in removed and user_id not in added and remaining == 0:
+            delta -= 1
+    return delta
+
+def apply_counter_deltas(connection, deltas: Dict[str, int]) -> None:
+    """Adjust counters by the given amounts; also used by bulk writes that bypass the ORM"""
+    for name, delta in deltas.items():
+        if delta:
+            connection.execute(
+                update(StatCounter)
+                .where(StatCounter.name == name)
+                .values(value=StatCounter.value + delta, updated_at=datetime.utcnow())
+            )
+
+@event.listens_for(Session, "after_flush")
+def maintain_counters(session: Session, flush_context) -> None:
+    """Adjust the counters for users, questions and meal plans written in this flush"""
+    tracked = (User, Question, MealPlan)
+    if not any(isinstance(obj, tracked) for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+    connection = session.connection()
+    deltas = _counter_deltas(session)
+    deltas[USERS_WITH_PLANS] += _users_with_plans_delta(session, connection)
+    apply_counter_deltas(connection, deltas)
+
+async def record_new_responses(db: AsyncSession, question_ids: Iterable[int], day: Optional[date] = None) -> None:
+    """Count newly inserted responses in today's per-question bucket"""
+    counts = Tally(question_ids)
+    if not counts:
+        return
+    stmt = insert(QuestionResponseDaily).values([
+        {"question_id": question_id, "day": day or datetime.utcnow().date(), "response_count": count}
+        for question_id, count in counts.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[QuestionResponseDaily.question_id, QuestionResponseDaily.day],
+        set_={"response_count": QuestionResponseDaily.response_count + stmt.excluded.response_count}
+    ))
+
+async def get_counters(db: AsyncSession) -> Dict[str, int]:
+    """All dashboard counters in one query"""
+    rows = (await db.execute(select(StatCounter.name, StatCounter.value))).all()
+    values = {name: 0 for name in COUNTER_NAMES}
+    values.update({name: value for name, value in rows})
+    return values
+
+def range_start(time_range: str) -> date:
+    """First bucket day of a 7d/30d/90d view (unknown ranges fall back to 7 days)"""
+    return datetime.utcnow().date() - timedelta(days=TIME_RANGES.get(time_range, 7))
+
+async def get_question_response_counts(db: AsyncSession, since: date) -> List:
+    """(question_id, question text, responses) from the daily buckets since the given day"""
+    return (await db.execute(
+        select(
+            QuestionResponseDaily.question_id,
+            Question.text,
+            func.sum(QuestionResponseDaily.response_count).label("response_count")
+        )
+        .join(Question, Question.id == QuestionResponseDaily.question_id)
+        .where(QuestionResponseDaily.day >= since)
+        .group_by(QuestionResponseDaily.question_id, Question.text)
+    )).all()
+
+async def compute_counters(db: AsyncSession) -> Dict[str, int]:
+    """Recompute every counter from the base tables"""
+    values = {}
+    for name, (model, flag) in COUNTERS.items():
+        query = select(func.count()).select_from(model)
+        if flag is not None:
+            query = query.where(getattr(model, flag) == True)
+        values[name] = await db.scalar(query)
+    values[USERS_WITH_PLANS] = await db.scalar(select(func.count(func.distinct(MealPlan.user_id))))
+    return values
+
+async def compute_daily_buckets(db: AsyncSession) -> Dict[tuple, int]:
+    """Recompute the per-question daily response counts from user_responses"""
+    day = func.date(UserResponse.created_at)
+    rows = (await db.execute(
+        select(UserResponse.question_id, day.label("day"), func.count())
+        .where(UserResponse.created_at.is_not(None))
+        .group_by(UserResponse.question_id, day)
+    )).all()
+    return {(question_id, str(bucket_day)): count for question_id, bucket_day, count in rows}
+
+async def reconcile(db: AsyncSession, fix: bool = True) -> Dict:
+    """
+    Recompute all statistics from scratch and compare with the stored rollups.
+    The rollup tables are locked against concurrent writers while this runs, so
+    the comparison is exact. With fix=True the stored values are replaced.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE stat_counters, question_response_daily IN SHARE ROW EXCLUSIVE MODE"))
+
+    stored_counters = await get_counters(db)
+    actual_counters = await compute_counters(db)
+    counter_drift = {
+        name: {"stored": stored_counters.get(name, 0), "actual": actual}
+        for name, actual in actual_counters.items()
+        if stored_counters.get(name, 0) != actual
+    }
+
+    stored_buckets = {
+        (question_id, str(day)): count
+        for question_id, day, count in (await db.execute(select(
+            QuestionResponseDaily.question_id, QuestionResponseDaily.day, QuestionResponseDaily.response_count
+        ))).all()
+    }
+    actual_buckets = await compute_daily_buckets(db)
+    bucket_drift = [
+        {"question_id": question_id, "day": day, "stored": stored_buckets.get((question_id, day), 0), "actual": actual_buckets.get((question_id, day), 0)}
+        for question_id, day in sorted(set(stored_buckets) | set(actual_buckets))
+        if stored_buckets.get((question_id, day), 0) != actual_buckets.get((question_id, day), 0)
+    ]
+
+    if fix and (counter_drift or bucket_drift):
+        now = datetime.utcnow()
+        await db.execute(StatCounter.__table__.delete())
+        await db.execute(StatCounter.__table__.insert(), [
+            {"name": name, "value": value, "updated_at": now} for name, value in actual_counters.items()
+        ])
+        await db.execute(QuestionResponseDaily.__table__.delete())
+        if actual_buckets:
+            await db.execute(QuestionResponseDaily.__table__.insert(), [
+                {"question_id": question_id, "day": date.fromisoformat(day), "response_count": count}
+                for (question_id, day), count in actual_buckets.items()
+            ])
+    await db.commit()
+
+    return {
+        "checked_at": datetime.utcnow(),
+        "fixed": fix and bool(counter_drift or bucket_drift),
+        "counters": actual_counters,
+        "counter_drift": counter_drift,
+        "bucket_drift": bucket_drift[:100],
+        "bucket_drift_count": len(bucket_drift)
+    }
@@ -0,0 +1,23 @@
+import math
+import re
+
+# Offline token estimate for prompt text. Uses tiktoken when it is installed,
+# otherwise approximates BPE tokenization: punctuation is one token and words
+# cost roughly one token per four characters.
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken not installed or encoding unavailable offline
+    _encoding = None
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in the text"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum(max(1, math.ceil(len(piece) / 4)) if piece[0].isalnum() or piece[0] == '_' else 1
+               for piece in _TOKEN_PATTERN.findall(text))
@@ -0,0 +1,215 @@
+import copy
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core import metrics
+from ..database import AsyncSessionLocal
+from ..models.models import Question, UserProfile, UserResponse
+from .profile_serializer import compile_profile_template
+
+# Materialized questionnaire profiles.
+#
+# user_profiles holds each user's answers as the nested document generation
+# sends to the model ({"personalInfo": {"age": 34, ...}, ...}), so generating a
+# plan reads one row by primary key instead of joining every response to its
+# question and rebuilding the tree. save_user_responses applies the answers it
+# wrote to the stored document through the path index, which maps question ids
+# to their split field_key once per questionnaire version. A document built
+# with an older index (a field_key was changed) or answers to questions whose
+# paths overlap are rebuilt from user_responses instead. version counts the
+# document's changes and content_hash identifies its content for caches.
+
+PATH_INDEX_TTL_SECONDS = 60
+# pg_advisory_xact_lock class key; the second key is the user id, so saves of one user are serialized
+PROFILE_LOCK_ID = 7_311_042
+
+profile_writes_total = metrics.counter(
+    "user_profile_writes_total", "Profile documents written on response saves", ("kind",)  # incremental, rebuild, unchanged
+)
+profile_reads_total = metrics.counter(
+    "user_profile_reads_total", "Profile documents read for generation", ("result",)  # stored, rebuilt, missing
+)
+
+@dataclass(frozen=True)
+class PathIndex:
+    version: str
+    paths: Dict[int, Tuple[str, ...]]  # question id -> field_key split on dots
+    overlapping: FrozenSet[int]  # questions writing a path that another question writes, or a parent or child of it
+    template: Tuple  # Text template over every question; rendering skips unanswered ones
+
+_index: Optional[PathIndex] = None
+_index_loaded_at = float("-inf")
+
+def canonical_hash(document: Dict) -> str:
+    return hashlib.sha256(
+        json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+def set_path(document: Dict, parts: Tuple[str, ...], value: Any) -> None:
+    """Set document[parts[0]][parts[1]]... = value, creating the intermediate dicts"""
+    current = document
+    for part in parts[:-1]:
+        if part not in current:
+            current[part] = {}
+        current = current[part]
+    current[parts[-1]] = value
+
+def compile_path_index(questions: List) -> PathIndex:
+    paths = {question.id: tuple(question.field_key.split(".")) for question in questions}
+    writers = {}
+    for question_id, path in paths.items():
+        writers.setdefault(path, []).append(question_id)
+    parents = {path[:length] for path in paths.values() for length in range(1, len(path))}
+    overlapping = frozenset(
+        question_id for question_id, path in paths.items()
+        if len(writers[path]) > 1 or path in parents or any(path[:length] in writers for length in range(1, len(path)))
+    )
+    version = hashlib.sha1(repr(sorted(paths.items())).encode("utf-8")).hexdigest()[:16]
+    return PathIndex(
+        version=version,
+        paths=paths,
+        overlapping=overlapping,
+        template=compile_profile_template(questions)
+    )
+
+async def get_path_index(db: AsyncSession, refresh: bool = False) -> PathIndex:
+    """The compiled path index of every question (inactive ones keep their answers), cached for a minute"""
+    global _index, _index_loaded_at
+    if refresh or _index is None or time.monotonic() - _index_loaded_at > PATH_INDEX_TTL_SECONDS:
+        questions = (await db.execute(
+            select(Question.id, Question.field_key, Question.category, Question.order, Question.text)
+        )).all()
+        _index = compile_path_index(questions)
+        _index_loaded_at = time.monotonic()
+    return _index
+
+def invalidate_path_index(*args) -> None:
+    """Recompile the index on next use; the TTL covers changes made by other processes"""
+    global _index
+    _index = None
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Question, _event, invalidate_path_index)
+
+async def lock_profile(db: AsyncSession, user_id: int) -> None:
+    """Serialize profile updates of one user until the transaction ends (PostgreSQL)"""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key, :user_id)"), {"key": PROFILE_LOCK_ID, "user_id": user_id})
+
+async def build_document(db: AsyncSession, user_id: int, index: PathIndex) -> Tuple[Optional[Dict], PathIndex]:
+    """The user's document rebuilt from user_responses (None without responses) and the index used"""
+    rows = (await db.execute(
+        select(UserResponse.question_id, UserResponse.response_value)
+        .join(Question, Question.id == UserResponse.question_id)
+        .where(UserResponse.user_id == user_id)
+        .order_by(Question.order)
+    )).all()
+    if not rows:
+        return None, index
+    if any(row.question_id not in index.paths for row in rows):
+        index = await get_path_index(db, refresh=True)
+    document = {}
+    for question_id, value in rows:
+        set_path(document, index.paths[question_id], value)
+    return document, index
+
+def store_document(db: AsyncSession, profile: Optional[UserProfile], user_id: int, document: Dict, index: PathIndex) -> Tuple[UserProfile, bool]:
+    """Write the document into the user's profile row; returns the profile and whether it changed"""
+    content_hash = canonical_hash(document)
+    if profile is None:
+        profile = UserProfile(user_id=user_id, document=document, version=1, content_hash=content_hash, path_index_version=index.version)
+        db.add(profile)
+        return profile, True
+    if profile.content_hash == content_hash and profile.path_index_version == index.version:
+        return profile, False
+    if profile.content_hash != content_hash:
+        profile.version += 1
+    profile.document = document
+    profile.content_hash = content_hash
+    profile.path_index_version = index.version
+    return profile, True
+
+async def rebuild_profile(db: AsyncSession, user_id: int) -> Optional[UserProfile]:
+    """Rebuild the user's profile from user_responses; the caller commits"""
+    await lock_profile(db, user_id)
+    document, index = await build_document(db, user_id, await get_path_index(db))
+    profile = await db.get(UserProfile, user_id, populate_existing=True)
+    if document is None:
+        if profile is not None:
+            await db.delete(profile)
+        return None
+    profile, _ = store_document(db, profile, user_id, document, index)
+    await db.flush()
+    return profile
+
+async def rebuild_profiles(user_ids: Iterable[int], batch_size: int = 100) -> int:
+    """Build or rebuild the profiles of many users in batches, e.g. after a bulk load that bypassed save_user_responses"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        async with AsyncSessionLocal() as db:
+            for user_id in user_ids[start:start + batch_size]:
+                await rebuild_profile(db, user_id)
+            await db.commit()
+    return len(user_ids)
+
+async def update_profile(db: AsyncSession, user_id: int, answers: Dict[int, Any]) -> None:
+    """
+    Apply answers written by save_user_responses to the stored document, in the
+    same transaction. The caller holds lock_profile for the user.
+    """
+    if not answers:
+        return
+    index = await get_path_index(db)
+    if any(question_id not in index.paths for question_id in answers):
+        index = await get_path_index(db, refresh=True)
+    profile = await db.get(UserProfile, user_id, populate_existing=True)
+    if profile is None or profile.path_index_version != index.version or not index.overlapping.isdisjoint(answers):
+        await rebuild_profile(db, user_id)
+        profile_writes_total.inc(kind="rebuild")
+        return
+
+    # No two of these answers write overlapping paths, so they apply in any order
+    document = copy.deepcopy(profile.document)
+    for question_id, value in answers.items():
+        set_path(document, index.paths[question_id], value)
+    _, changed = store_document(db, profile, user_id, document, index)
+    profile_writes_total.inc(kind="incremental" if changed else "unchanged")
+    await db.flush()
+
+async def load_profile(db: AsyncSession, user_id: int) -> Optional[UserProfile]:
+    """
+    The user's profile by primary key. A missing or outdated one is rebuilt and
+    committed in a separate short transaction, so the caller's transaction
+    holds no lock while it waits on the model.
+    """
+    index = await get_path_index(db)
+    profile = await db.get(UserProfile, user_id)
+    if profile is not None and profile.path_index_version == index.version:
+        profile_reads_total.inc(result="stored")
+        return profile
+
+    async with AsyncSessionLocal() as session:
+        profile = await rebuild_profile(session, user_id)
+        await session.commit()
+    profile_reads_total.inc(result="rebuilt" if profile is not None else "missing")
+    return profile
+
+async def load_profiles(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, UserProfile]:
+    """Profiles of several users in one query, rebuilding missing or outdated ones; users without responses are left out"""
+    user_ids = list(user_ids)
+    index = await get_path_index(db)
+    profiles = {
+        profile.user_id: profile
+        for profile in (await db.scalars(select(UserProfile).where(UserProfile.user_id.in_(user_ids)))).all()
+        if profile.path_index_version == index.version
+    }
+    for user_id in user_ids:
+        if user_id not in profiles:
+            profile = await load_profile(db, user_id)
+            if profile is not None:
+                profiles[user_id] = profile
+    return profiles
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, load_only
+from ..models.models import Question, UserResponse
+from .stats import record_new_responses
+from .user_profiles import lock_profile, update_profile
+
+# Rows per upsert call, sent as one multi-row INSERT (5 parameters per row, well below PostgreSQL's limit)
+UPSERT_BATCH_SIZE = 500
+
+def responses_with_questions(*criteria):
+    """
+    Select responses joined to their question, loading only the columns the API
+    uses, so response.question never triggers a lazy load.
+    """
+    return (
+        select(UserResponse)
+        .join(UserResponse.question)
+        .options(
+            load_only(
+                UserResponse.id, UserResponse.user_id, UserResponse.question_id,
+                UserResponse.response_value, UserResponse.created_at
+            ),
+            contains_eager(UserResponse.question).load_only(
+                Question.id, Question.text, Question.category, Question.order, Question.field_key
+            )
+        )
+        .where(*criteria)
+        .order_by(UserResponse.user_id, Question.order)
+    )
+
+async def load_user_responses(db: AsyncSession, user_id: int) -> List[UserResponse]:
+    """A user's responses with their question metadata, in one query"""
+    return (await db.scalars(responses_with_questions(UserResponse.user_id == user_id))).all()
+
+async def save_user_responses(db: AsyncSession, user_id: int, answers: Dict[int, Any]) -> int:
+    """
+    Upsert the user's answers, keyed by question id, with INSERT ... ON CONFLICT.
+    Answers that did not change are not rewritten and created_at keeps the time
+    of the first answer. Newly answered questions are counted in the daily
+    response stats and the written answers are applied to the user's profile
+    document. Returns the number of rows inserted or updated.
+    """
+    if not answers:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "question_id": question_id,
+            "response_value": value,
+            "created_at": now,
+            "updated_at": now
+        }
+        for question_id, value in answers.items()
+    ]
+
+    # Built without values and executed with the rows as parameters, so the compiled
+    # statement is cached instead of compiling a multi-row VALUES clause per save
+    stmt = insert(UserResponse)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_responses_user_question",
+        set_={
+            "response_value": stmt.excluded.response_value,
+            "updated_at": stmt.excluded.updated_at
+        },
+        where=UserResponse.response_value.is_distinct_from(stmt.excluded.response_value)
+    ).returning(
+        UserResponse.question_id,
+        # xmax is 0 for freshly inserted rows and set for updated ones
+        literal_column("(xmax = 0)").label("inserted")
+    )
+
+    await lock_profile(db, user_id)
+    written_question_ids = []
+    inserted_question_ids = []
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        written_rows = (await db.execute(stmt, rows[start:start + UPSERT_BATCH_SIZE])).all()
+        written_question_ids.extend(row.question_id for row in written_rows)
+        inserted_question_ids.extend(row.question_id for row in written_rows if row.inserted)
+
+    await record_new_responses(db, inserted_question_ids, now.date())
+    await update_profile(db, user_id, {question_id: answers[question_id] for question_id in written_question_ids})
+    return len(written_question_ids)
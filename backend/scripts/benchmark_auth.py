@@ -0,0 +1,127 @@
+"""
+Measure per-request authentication cost: user read from the database, from
+the auth user cache, and signed token claims checked against the revocation
+map.
+
+Resolves bearer tokens of --users scratch users the way every authenticated
+request does (get_current_user), --requests times per mode. Reports statements
+sent per request and latency. Then checks that admin actions take effect on
+the next request with claim tokens: rejecting a user and deactivating one
+through the API must turn their next request into a 401.
+
+    python scripts/benchmark_auth.py --users 50 --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import delete, event
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.main import app
+from app.models.models import User
+from app.services.auth import create_access_token, get_current_user, token_claims
+from app.services.auth_cache import cache_stats, reload_revocations, revocations, user_cache
+from app.services.prompt_evaluation import mean, percentile
+
+statements = 0
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+def create_scratch_users(count):
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:8]
+        users = [User(email=f"auth-bench-{tag}-{index}@example.com", hashed_password="!", is_approved=True) for index in range(count)]
+        users.append(User(email=f"auth-bench-{tag}-admin@example.com", hashed_password="!", is_approved=True, is_admin=True))
+        db.add_all(users)
+        db.commit()
+        return [user.id for user in users], [token_claims(user) for user in users]
+    finally:
+        db.close()
+
+def remove_scratch_users(user_ids):
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+async def resolve(tokens, requests, rng):
+    global statements
+    latencies = []
+    statements = 0
+    for _ in range(requests):
+        token = rng.choice(tokens)
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await get_current_user(token, db)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, statements / requests
+
+async def check_invalidation(admin_token, user_tokens, user_ids):
+    """Reject one user and deactivate another through the API; their next requests must fail"""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://auth-check") as client:
+        admin_headers = {"Authorization": f"Bearer {admin_token}"}
+        actions = (
+            ("reject", lambda user_id: client.post(f"/api/admin/users/{user_id}/reject", headers=admin_headers)),
+            ("deactivate", lambda user_id: client.put(f"/api/users/toggle-active/{user_id}", headers=admin_headers))
+        )
+        results = {}
+        for (label, action), token, user_id in zip(actions, user_tokens, user_ids):
+            user_headers = {"Authorization": f"Bearer {token}"}
+            before = await client.get("/api/questions/user-responses", headers=user_headers)
+            done = await action(user_id)
+            after = await client.get("/api/questions/user-responses", headers=user_headers)
+            results[label] = (before.status_code, done.status_code, after.status_code)
+    return results
+
+async def run(users, requests):
+    user_ids, claims = create_scratch_users(users)
+    legacy_tokens = [create_access_token(data={"sub": str(user_id)}) for user_id in user_ids]
+    claim_tokens = [create_access_token(data=user_claims) for user_claims in claims]
+    cache_size = user_cache.max_size or 10000
+    results = {}
+    try:
+        for label, tokens, size in (("database", legacy_tokens, 0), ("user cache", legacy_tokens, cache_size), ("claims", claim_tokens, 0)):
+            user_cache.max_size = size
+            user_cache.clear()
+            if tokens is claim_tokens:
+                await reload_revocations()
+            results[label] = await resolve(tokens, requests, random.Random(0))
+        invalidation = await check_invalidation(claim_tokens[-1], claim_tokens[:2], user_ids[:2])
+    finally:
+        remove_scratch_users(user_ids)
+        await async_engine.dispose()
+    return results, invalidation
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark authentication with and without the user cache")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    results, invalidation = asyncio.run(run(args.users, args.requests))
+    header = f"{'mode':<12}{'statements/request':>20}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for label, (latencies, per_request) in results.items():
+        print(f"{label:<12}{per_request:>20.2f}{mean(latencies):>10.3f}{percentile(latencies, 50):>9.3f}{percentile(latencies, 95):>9.3f}")
+    print(f"\nCache: {cache_stats()}")
+    for label, (before, done, after) in invalidation.items():
+        print(f"{label}: request before {before}, {label} {done}, request after {after} (expected 200, 200, 401)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Load test the main read endpoints of a running API.
+
+Each endpoint is hit by --concurrency workers for --duration seconds while a
+separate probe measures the latency of the health check, which shows whether
+the event loop stays responsive under database load. Run it against the server
+before and after a change and compare requests/second and the percentiles.
+
+Usage:
+    python scripts/benchmark_endpoints.py --base-url http://localhost:8000 --email admin@example.com --password secret
+    python scripts/benchmark_endpoints.py --token <jwt> --concurrency 50 --duration 20 --output after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+USER_ENDPOINTS = [
+    "/api/users/me",
+    "/api/questions/",
+    "/api/questions/user-responses",
+    "/api/meal-plans/",
+]
+
+ADMIN_ENDPOINTS = [
+    "/api/admin/stats",
+    "/api/admin/questions",
+    "/api/admin/meal-plans/stats",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of the read endpoints under concurrency")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", help="Bearer token (otherwise --email/--password are used to log in)")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--admin", action="store_true", help="Include the admin endpoints")
+    parser.add_argument("--endpoint", action="append", default=[], help="Benchmark only these paths (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    return parser.parse_args()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of the given values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+def mean(values):
+    return sum(values) / len(values) if values else None
+
+async def login(client, email, password):
+    response = await client.post("/api/users/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def worker(client, path, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def health_probe(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            await client.get("/")
+        except httpx.HTTPError:
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.05)
+
+async def benchmark_endpoint(client, path, concurrency, duration):
+    latencies, errors, health = [], [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        health_probe(client, deadline, health),
+        *(worker(client, path, deadline, latencies, errors) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": path,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": len(latencies) / elapsed,
+        "latency_ms": {
+            "mean": mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99)
+        },
+        "health_latency_ms": {
+            "p50": percentile(health, 50),
+            "p99": percentile(health, 99)
+        }
+    }
+
+def print_results(results, concurrency, duration):
+    print(f"\nConcurrency: {concurrency}  duration: {duration:.0f}s per endpoint\n")
+    header = f"{'endpoint':<34}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'health p99':>12}"
+    print(header)
+    print("-" * len(header))
+
+    def fmt(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    for result in results:
+        print(
+            f"{result['endpoint'][:33]:<34}"
+            f"{result['requests_per_second']:>9.1f}"
+            f"{fmt(result['latency_ms']['p50']):>9}"
+            f"{fmt(result['latency_ms']['p95']):>9}"
+            f"{fmt(result['latency_ms']['p99']):>9}"
+            f"{result['errors']:>8}"
+            f"{fmt(result['health_latency_ms']['p99']):>12}"
+        )
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = args.token
+        if not token:
+            if not (args.email and args.password):
+                print("Provide --token or --email and --password")
+                sys.exit(1)
+            token = await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        endpoints = args.endpoint or USER_ENDPOINTS + (ADMIN_ENDPOINTS if args.admin else [])
+        results = []
+        for path in endpoints:
+            results.append(await benchmark_endpoint(client, path, args.concurrency, args.duration))
+        return results
+
+def main():
+    args = parse_args()
+    results = asyncio.run(run(args))
+    print_results(results, args.concurrency, args.duration)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Measure bytes on the wire and response times for typical page loads with
+and without compression and conditional GET.
+
+Seeds --users synthetic users with --plans-per-user plans each (use a scratch
+database), then loads each page --runs times:
+
+    questionnaire  GET /api/questions/
+    my plans       GET /api/meal-plans/ and GET /api/meal-plans/{id}
+    admin          the admin question, pending user, user and prompt listings
+
+as a client without compression (identity), with gzip, with brotli (when the
+brotli package is installed), and as a browser revalidating its cached copy
+with If-None-Match. Body and header bytes are what the server sent; the time
+is server time through the ASGI stack, plus the transfer time on a
+--mbps link.
+
+    python scripts/benchmark_http_cache.py --users 200 --plans-per-user 3
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(Path(__file__).parent))
+
+import httpx
+from sqlalchemy import select
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.middleware.compression import brotli
+from app.models.models import MealPlan, User
+from app.services.auth import create_access_token, token_claims
+from seed_dataset import seed_dataset
+
+def page_requests(plan_id):
+    return {
+        "questionnaire": [("user", "/api/questions/")],
+        "my plans": [("user", "/api/meal-plans/"), ("user", f"/api/meal-plans/{plan_id}")],
+        "admin": [
+            ("admin", "/api/admin/questions"),
+            ("admin", "/api/admin/users/pending"),
+            ("admin", "/api/users/all"),
+            ("admin", "/api/admin/system-prompts")
+        ]
+    }
+
+def tokens(ids):
+    db = SessionLocal()
+    try:
+        admin = db.get(User, ids["admin_id"])
+        # Seeded users have between zero and twice --plans-per-user plans; take one who has some
+        plan = db.scalars(
+            select(MealPlan).join(User, User.id == MealPlan.user_id)
+            .where(User.id > ids["admin_id"], User.is_approved == True, User.is_admin == False)
+            .order_by(MealPlan.user_id, MealPlan.created_at.desc()).limit(1)
+        ).first()
+        user, plan_id = db.get(User, plan.user_id), plan.id
+        return {
+            "admin": create_access_token(data=token_claims(admin)),
+            "user": create_access_token(data=token_claims(user))
+        }, plan_id
+    finally:
+        db.close()
+
+def header_bytes(response):
+    return len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n") + sum(
+        len(name) + len(value) + 4 for name, value in response.headers.raw
+    ) + 2
+
+async def load_page(client, requests, auth_tokens, encoding, etags):
+    """One page load; returns body bytes, header bytes, server seconds and 304 count"""
+    body = headers = not_modified = 0
+    started = time.perf_counter()
+    for role, url in requests:
+        request_headers = {"Authorization": f"Bearer {auth_tokens[role]}", "Accept-Encoding": encoding}
+        if etags is not None and url in etags:
+            request_headers["If-None-Match"] = etags[url]
+        response = await client.get(url, headers=request_headers)
+        response.raise_for_status() if response.status_code != 304 else None
+        body += response.num_bytes_downloaded
+        headers += header_bytes(response)
+        not_modified += response.status_code == 304
+        if etags is not None and "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+    return body, headers, time.perf_counter() - started, not_modified
+
+async def measure(pages, auth_tokens, runs):
+    modes = [("identity", "identity", False), ("gzip", "gzip", False)]
+    if brotli is not None:
+        modes.append(("br", "br", False))
+    modes.append(("revalidate", "br, gzip" if brotli is not None else "gzip", True))
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://http-cache") as client:
+        for page, requests in pages.items():
+            for label, encoding, revalidate in modes:
+                etags = {} if revalidate else None
+                if revalidate:
+                    # The browser's first visit fills its cache
+                    await load_page(client, requests, auth_tokens, encoding, etags)
+                samples = [await load_page(client, requests, auth_tokens, encoding, etags) for _ in range(runs)]
+                results.append((page, label, *(sum(sample[index] for sample in samples) / runs for index in range(4))))
+    return results
+
+async def run(runs, plan_count_ids):
+    try:
+        auth_tokens, plan_id = tokens(plan_count_ids)
+        return await measure(page_requests(plan_id), auth_tokens, runs)
+    finally:
+        await async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compression and conditional GET on typical page loads")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--plans-per-user", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=10, help="Link speed for the transfer time estimate")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    ids = seed_dataset(args.users, args.plans_per_user)
+    results = asyncio.run(run(args.runs, ids))
+    header = f"{'page':<15}{'client':<12}{'body B':>10}{'headers B':>11}{'304s':>6}{'server ms':>11}{'+ transfer ms':>15}"
+    print(header)
+    print("-" * len(header))
+    for page, label, body, headers, seconds, not_modified in results:
+        transfer = (body + headers) * 8 / (args.mbps * 1_000_000)
+        print(f"{page:<15}{label:<12}{body:>10.0f}{headers:>11.0f}{not_modified:>6.0f}{seconds * 1000:>11.2f}{(seconds + transfer) * 1000:>15.2f}")
+
+if __name__ == "__main__":
+    main()
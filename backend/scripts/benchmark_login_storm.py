@@ -0,0 +1,125 @@
+"""
+Measure what a burst of logins does to the rest of the worker, with bcrypt run
+inline on the event loop (the previous behaviour) and on the bounded pool.
+
+Sends --logins login requests for a scratch user, --concurrency at a time,
+while a probe requests GET / every 10 ms. Reports login throughput, how many
+logins were refused with 503, and the probe's latency: with bcrypt on the loop
+every probe waits behind the hashing. Run with a small --max-queue to see the
+pool shed load.
+
+    python scripts/benchmark_login_storm.py --logins 40 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import delete
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models.models import User
+from app.services import auth
+from app.services.password_hashing import PasswordHashPool
+from app.services.prompt_evaluation import percentile
+
+PASSWORD = "storm-password"
+PROBE_INTERVAL_SECONDS = 0.01
+
+def create_scratch_user():
+    db = SessionLocal()
+    try:
+        user = User(
+            email=f"login-storm-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password=auth.get_password_hash(PASSWORD), is_approved=True
+        )
+        db.add(user)
+        db.commit()
+        return user.id, user.email
+    finally:
+        db.close()
+
+def remove_scratch_user(user_id):
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+async def verify_inline(plain_password, hashed_password):
+    """The previous behaviour: bcrypt on the event loop thread"""
+    return auth.pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def storm(email, logins, concurrency):
+    statuses = []
+    probe_latencies = []
+    done = asyncio.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://storm", timeout=120) as client:
+        async def login():
+            async with semaphore:
+                response = await client.post("/api/users/login", data={"username": email, "password": PASSWORD})
+                statuses.append(response.status_code)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                (await client.get("/")).raise_for_status()
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+    return statuses, elapsed, probe_latencies
+
+async def run(logins, concurrency, workers, max_queue):
+    user_id, email = create_scratch_user()
+    results = {}
+    try:
+        pooled = auth.verify_and_update_password
+        auth.verify_and_update_password = verify_inline
+        results["inline"] = await storm(email, logins, concurrency)
+        auth.verify_and_update_password = pooled
+        auth.password_pool = PasswordHashPool(workers, max_queue)
+        results["pool"] = await storm(email, logins, concurrency)
+    finally:
+        remove_scratch_user(user_id)
+        await async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unrelated request latency during a login storm")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=auth.settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-queue", type=int, default=auth.settings.PASSWORD_HASH_MAX_QUEUE)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args.logins, args.concurrency, args.workers, args.max_queue))
+    print(f"{args.logins} logins, {args.concurrency} concurrent, pool of {args.workers} threads, queue {args.max_queue}\n")
+    header = f"{'bcrypt':<8}{'ok':>5}{'503':>5}{'logins/s':>10}{'probes':>8}{'probe p50 ms':>14}{'probe p99 ms':>14}{'probe max ms':>14}"
+    print(header)
+    print("-" * len(header))
+    for label, (statuses, elapsed, probes) in results.items():
+        print(
+            f"{label:<8}{statuses.count(200):>5}{statuses.count(503):>5}{statuses.count(200) / elapsed:>10.1f}{len(probes):>8}"
+            f"{percentile(probes, 50):>14.1f}{percentile(probes, 99):>14.1f}{max(probes):>14.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Compare the full and summary meal plan listings for a user with a long history.
+
+Creates a user with --plans generated meal plans, then requests every page of
+GET /api/meal-plans/ in both views and reports the response bytes and the
+latency per listing. The requests go through the ASGI app in-process, so the
+numbers cover query, serialization and transfer size without network noise.
+
+Usage (against a development or scratch database, it inserts a user and plans):
+    python scripts/benchmark_meal_plan_listing.py --plans 300 --repeat 20
+"""
+import argparse
+import asyncio
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import insert
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models.models import User, MealPlan
+from app.services.auth import create_access_token
+from app.services.local_provider import build_meal_plan
+from app.services.meal_plan_summary import plan_headline
+
+def percentile(values, pct):
+    """Nearest-rank percentile of the given values"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+def create_user_with_history(plans: int) -> int:
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        user = User(email=f"listing-bench-{now:%Y%m%d%H%M%S}@example.com", hashed_password="-", is_approved=True)
+        db.add(user)
+        db.flush()
+        rows = []
+        for index in range(plans):
+            plan_data = build_meal_plan(f"{user.id}:{index}")
+            created_at = now - timedelta(days=index)
+            rows.append({
+                "user_id": user.id,
+                "plan_data": plan_data,
+                **plan_headline(plan_data),
+                "created_at": created_at,
+                "updated_at": created_at,
+                "is_active": True,
+                "start_date": created_at
+            })
+        db.execute(insert(MealPlan), rows)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+async def fetch_listing(client, headers, view, page_size):
+    """Fetch every page of the listing; returns (bytes, plans)"""
+    total_bytes = 0
+    plans = 0
+    cursor = None
+    while True:
+        params = {"view": view, "limit": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/meal-plans/", params=params, headers=headers)
+        response.raise_for_status()
+        total_bytes += len(response.content)
+        body = response.json()
+        plans += len(body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return total_bytes, plans
+
+async def run(user_id, repeat, page_size):
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for view in ("full", "summary"):
+            await fetch_listing(client, headers, view, page_size)  # warm up
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                total_bytes, plans = await fetch_listing(client, headers, view, page_size)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[view] = {"bytes": total_bytes, "plans": plans, "p50_ms": percentile(timings, 50), "p95_ms": percentile(timings, 95)}
+    await async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure payload size and latency of the full and summary meal plan listings")
+    parser.add_argument("--plans", type=int, default=200, help="Meal plans in the user's history")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    user_id = create_user_with_history(args.plans)
+    results = asyncio.run(run(user_id, args.repeat, args.page_size))
+
+    print(f"{'view':<10}{'plans':>7}{'bytes':>12}{'bytes/plan':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for view, result in results.items():
+        print(
+            f"{view:<10}{result['plans']:>7}{result['bytes']:>12}{result['bytes'] // max(result['plans'], 1):>12}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+        )
+    full, summary = results["full"], results["summary"]
+    print(f"summary is {full['bytes'] / summary['bytes']:.1f}x smaller and {full['p50_ms'] / summary['p50_ms']:.1f}x faster at p50")
+
+if __name__ == "__main__":
+    main()
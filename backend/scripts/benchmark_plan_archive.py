@@ -0,0 +1,119 @@
+"""
+Measure storage size and read latency of meal plans before and after compaction.
+
+Seeds a synthetic dataset (see seed_dataset.py), samples plans that the
+compaction job will archive, and times GET /api/meal-plans/{id} and the one-day
+endpoint for them through the ASGI app. Then it compacts and measures again.
+Sizes are the stored bytes of the document columns (pg_column_size on
+PostgreSQL, which already includes TOAST compression; length() elsewhere) and,
+on PostgreSQL, the total size of the meal_plans table after VACUUM FULL.
+
+Only run this against a database you can throw away.
+
+Usage:
+    python scripts/benchmark_plan_archive.py --users 2000 --plans-per-user 4 --sample 200
+"""
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import func, select, text
+from app.core.config import get_settings
+from app.database import engine, async_engine, AsyncSessionLocal
+from app.main import app
+from app.models.models import MealPlan, User
+from app.services.auth import create_access_token
+from app.services.plan_archive import archive_candidates, compact_meal_plans
+from seed_dataset import seed_dataset
+
+settings = get_settings()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of the given values"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+def storage_size(vacuum_full: bool) -> dict:
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            if vacuum_full:
+                connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM FULL meal_plans"))
+            size = func.pg_column_size
+            table_bytes = connection.scalar(text("SELECT pg_total_relation_size('meal_plans')"))
+        else:
+            size = func.length
+            table_bytes = None
+        plan_bytes, archived_bytes = connection.execute(
+            select(func.coalesce(func.sum(size(MealPlan.plan_data)), 0), func.coalesce(func.sum(size(MealPlan.archived_data)), 0))
+        ).one()
+    return {"document_bytes": int(plan_bytes) + int(archived_bytes), "table_bytes": table_bytes}
+
+async def sample_plans(count: int, seed: int):
+    cutoff = datetime.utcnow() - timedelta(days=settings.PLAN_ARCHIVE_AFTER_DAYS)
+    async with AsyncSessionLocal() as db:
+        # Plans of approved users, others cannot read their plans
+        ids = (await db.scalars(
+            archive_candidates(cutoff).with_only_columns(MealPlan.id)
+            .join(User, User.id == MealPlan.user_id).where(User.is_approved == True)
+        )).all()
+        chosen = random.Random(seed).sample(ids, min(count, len(ids)))
+        owners = dict((await db.execute(select(MealPlan.id, MealPlan.user_id).where(MealPlan.id.in_(chosen)))).all())
+    return [(plan_id, owners[plan_id]) for plan_id in chosen]
+
+async def read_latency(plans):
+    timings = {"full": [], "day": []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for plan_id, user_id in plans:
+            headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+            for kind, path in (("full", f"/api/meal-plans/{plan_id}"), ("day", f"/api/meal-plans/{plan_id}/weeks/week1/days/monday")):
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                timings[kind].append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+    return {kind: {"p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95)} for kind, values in timings.items()}
+
+async def compact():
+    async with AsyncSessionLocal() as db:
+        return await compact_meal_plans(db)
+
+async def measure(plans, label, vacuum_full):
+    latency = await read_latency(plans)
+    await async_engine.dispose()
+    size = storage_size(vacuum_full)
+    table = f", table {size['table_bytes']} bytes" if size["table_bytes"] is not None else ""
+    print(f"{label:<7} documents {size['document_bytes']} bytes{table}")
+    for kind, result in latency.items():
+        print(f"        GET {kind:<4} p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms")
+    return size, latency
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare meal plan storage size and read latency before and after archival")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--plans-per-user", type=int, default=4)
+    parser.add_argument("--sample", type=int, default=200, help="Archived plans to time reads for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vacuum-full", action="store_true", help="VACUUM FULL meal_plans before measuring table size (PostgreSQL)")
+    args = parser.parse_args()
+
+    seed_dataset(args.users, args.plans_per_user, seed=args.seed)
+    plans = asyncio.run(sample_plans(args.sample, args.seed))
+
+    before, _ = asyncio.run(measure(plans, "before", args.vacuum_full))
+    report = asyncio.run(compact())
+    ratio = report["bytes_before"] / report["bytes_after"] if report["bytes_after"] else 0
+    print(f"Archived {report['archived']} plans (dictionary {report['dictionary_id']}): {report['bytes_before']} -> {report['bytes_after']} bytes, {ratio:.1f}x")
+    after, _ = asyncio.run(measure(plans, "after", args.vacuum_full))
+    print(f"Document storage {before['document_bytes'] / max(after['document_bytes'], 1):.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
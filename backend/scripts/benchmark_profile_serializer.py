@@ -0,0 +1,68 @@
+"""
+Benchmark profile serialization formats over stored user profiles.
+
+Reports the estimated prompt tokens of the generation user message for each
+format, the reduction relative to the original pretty-printed JSON and the
+serialization time per profile.
+
+Usage:
+    python scripts/benchmark_profile_serializer.py --sample-size 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.database import AsyncSessionLocal
+from app.services.profile_serializer import PROFILE_FORMATS, serialize_profile
+from app.services.prompt_evaluation import load_profile_sample, mean, percentile
+from app.services.token_estimator import estimate_tokens
+
+async def load_profiles(sample_size, seed):
+    async with AsyncSessionLocal() as db:
+        return await load_profile_sample(db, sample_size, seed=seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt token usage of profile serialization formats")
+    parser.add_argument("--sample-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", choices=PROFILE_FORMATS, help="Print one serialized profile in this format")
+    args = parser.parse_args()
+
+    profiles = asyncio.run(load_profiles(args.sample_size, args.seed))
+
+    if not profiles:
+        print("No stored user profiles found")
+        sys.exit(1)
+
+    results = {}
+    for profile_format in PROFILE_FORMATS:
+        tokens = []
+        started = time.perf_counter()
+        for profile in profiles:
+            text = serialize_profile(profile['structured_data'], profile_format, profile['template'])
+            tokens.append(estimate_tokens(text))
+        elapsed_us = (time.perf_counter() - started) / len(profiles) * 1_000_000
+        results[profile_format] = (tokens, elapsed_us)
+
+    baseline = sum(results["json"][0])
+    print(f"\nProfiles: {len(profiles)}\n")
+    print(f"{'format':<14}{'mean tok':>10}{'p50 tok':>10}{'p90 tok':>10}{'total tok':>12}{'reduction':>11}{'us/profile':>12}")
+    for profile_format, (tokens, elapsed_us) in results.items():
+        reduction = 1 - sum(tokens) / baseline if baseline else 0
+        print(
+            f"{profile_format:<14}{mean(tokens):>10.0f}{percentile(tokens, 50):>10}{percentile(tokens, 90):>10}"
+            f"{sum(tokens):>12}{reduction:>11.1%}{elapsed_us:>12.0f}"
+        )
+
+    if args.show:
+        print(f"\nExample ({args.show}):\n")
+        print(serialize_profile(profiles[0]['structured_data'], args.show, profiles[0]['template']))
+
+if __name__ == "__main__":
+    main()
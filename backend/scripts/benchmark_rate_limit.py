@@ -0,0 +1,103 @@
+"""
+Measure the rate limiter's overhead and check its behaviour.
+
+Overhead: --requests calls through RateLimitMiddleware around a bare ASGI app
+that answers immediately, compared with calling that app directly, for a
+route without a policy and for a limited route (memory backend; with a
+PostgreSQL DATABASE_URL the shared backend is measured too). Behaviour:
+sends --attempts logins for an unknown email from one client through the
+real app and prints the status and rate limit headers of each response.
+
+    python scripts/benchmark_rate_limit.py --requests 20000 --attempts 12
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from app.database import async_engine
+from app.main import app
+from app.middleware import rate_limit
+from app.middleware.rate_limit import MemoryBackend, Policy, PostgresBackend, RateLimitMiddleware
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+def scope(path, client):
+    return {"type": "http", "method": "POST", "path": path, "headers": [], "client": (client, 50000)}
+
+async def per_request_us(handler, scopes):
+    started = time.perf_counter()
+    for request_scope in scopes:
+        await handler(request_scope, receive, send)
+    return (time.perf_counter() - started) / len(scopes) * 1_000_000
+
+async def overhead(requests):
+    # Generous limit, so every measured request is allowed and takes the full path
+    policies = {("POST", "/limited"): Policy("benchmark", 10 ** 9, 60, "ip")}
+    middleware = RateLimitMiddleware(bare_app, policies=policies)
+    clients = [f"10.0.{index // 256}.{index % 256}" for index in range(1000)]
+    unlimited = [scope("/unlimited", clients[index % len(clients)]) for index in range(requests)]
+    limited = [scope("/limited", clients[index % len(clients)]) for index in range(requests)]
+
+    backends = [MemoryBackend()]
+    if async_engine.dialect.name == "postgresql":
+        backends.append(PostgresBackend())
+    baseline = await per_request_us(bare_app, unlimited)
+    rows = [("no middleware", "-", baseline), ("unlimited route", "-", await per_request_us(middleware, unlimited))]
+    for backend in backends:
+        rate_limit.backend = backend
+        sample = limited if backend.name == "memory" else limited[:min(requests, 2000)]
+        rows.append(("limited route", backend.name, await per_request_us(middleware, sample)))
+    rate_limit.backend = MemoryBackend()
+    return baseline, rows
+
+async def login_attempts(attempts):
+    responses = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=("203.0.113.7", 50000)), base_url="http://limits") as client:
+        for _ in range(attempts):
+            response = await client.post("/api/users/login", data={"username": "nobody@example.com", "password": "wrong"})
+            responses.append(response)
+    return responses
+
+async def run(requests, attempts):
+    try:
+        return await overhead(requests), await login_attempts(attempts)
+    finally:
+        await async_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate limiter overhead and check its responses")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--attempts", type=int, default=12)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    (baseline, rows), responses = asyncio.run(run(args.requests, args.attempts))
+    header = f"{'path':<18}{'backend':<10}{'us/request':>12}{'overhead us':>13}"
+    print(header)
+    print("-" * len(header))
+    for label, backend, micros in rows:
+        print(f"{label:<18}{backend:<10}{micros:>12.2f}{micros - baseline:>13.2f}")
+
+    print(f"\n{args.attempts} logins from one client ({rate_limit.settings.RATE_LIMIT_LOGIN}):")
+    for index, response in enumerate(responses, 1):
+        headers = {name: response.headers.get(name) for name in ("RateLimit-Remaining", "RateLimit-Reset", "Retry-After")}
+        print(f"  {index:>2}: {response.status_code} {headers}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare the old delete-and-reinsert save of questionnaire answers with the upsert.
+
+For each strategy a full questionnaire submission is saved for fresh users, then
+resubmitted unchanged and with 10% of the answers changed. Reports database
+round trips (statements sent), rows written and latency per submission.
+
+Run it against a migrated PostgreSQL database you can throw away:
+    python scripts/benchmark_save_responses.py --iterations 50
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete, event, select
+from app.database import AsyncSessionLocal, async_engine
+from app.models.models import Question, User, UserResponse
+from app.services.prompt_evaluation import mean, percentile
+from app.services.user_responses import save_user_responses
+
+statements = 0
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+async def legacy_save(db, user_id, answers):
+    """The previous implementation: delete the answered questions, then add one row per answer"""
+    await db.execute(delete(UserResponse).where(
+        UserResponse.user_id == user_id,
+        UserResponse.question_id.in_(list(answers))
+    ))
+    for question_id, value in answers.items():
+        db.add(UserResponse(user_id=user_id, question_id=question_id, response_value=value))
+    return len(answers)
+
+STRATEGIES = {"delete+insert": legacy_save, "upsert": save_user_responses}
+
+async def timed_save(strategy, user_id, answers):
+    global statements
+    async with AsyncSessionLocal() as db:
+        statements = 0
+        started = time.perf_counter()
+        written = await STRATEGIES[strategy](db, user_id, answers)
+        await db.commit()
+        return (time.perf_counter() - started) * 1000, statements, written
+
+async def run(iterations):
+    async with AsyncSessionLocal() as db:
+        question_ids = (await db.scalars(select(Question.id).where(Question.is_active == True))).all()
+        tag = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        users = [
+            User(email=f"bench-{tag}-{index}@example.com", hashed_password="-", is_approved=True)
+            for index in range(iterations * len(STRATEGIES))
+        ]
+        db.add_all(users)
+        await db.commit()
+        user_ids = [user.id for user in users]
+
+    rng = random.Random(0)
+    results = {}
+    for index, strategy in enumerate(STRATEGIES):
+        samples = {"first submission": [], "unchanged resubmission": [], "10% changed": []}
+        for user_id in user_ids[index * iterations:(index + 1) * iterations]:
+            answers = {question_id: f"answer {rng.randint(1, 50)}" for question_id in question_ids}
+            samples["first submission"].append(await timed_save(strategy, user_id, answers))
+            samples["unchanged resubmission"].append(await timed_save(strategy, user_id, answers))
+            for question_id in rng.sample(question_ids, max(len(question_ids) // 10, 1)):
+                answers[question_id] = f"changed {rng.randint(1, 50)}"
+            samples["10% changed"].append(await timed_save(strategy, user_id, answers))
+        results[strategy] = samples
+
+    await async_engine.dispose()
+    return len(question_ids), results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark saving a full questionnaire submission")
+    parser.add_argument("--iterations", type=int, default=20, help="Users per strategy")
+    args = parser.parse_args()
+
+    question_count, results = asyncio.run(run(args.iterations))
+    print(f"\nQuestions per submission: {question_count}  users per strategy: {args.iterations}\n")
+    header = f"{'strategy':<16}{'scenario':<26}{'statements':>11}{'rows written':>14}{'mean ms':>10}{'p95 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for strategy, samples in results.items():
+        for scenario, values in samples.items():
+            latencies = [latency for latency, _, _ in values]
+            print(
+                f"{strategy:<16}{scenario:<26}"
+                f"{mean([count for _, count, _ in values]):>11.1f}"
+                f"{mean([written for _, _, written in values]):>14.1f}"
+                f"{mean(latencies):>10.2f}{percentile(latencies, 95):>9.2f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure how long the API takes to serve its first request, with the question
+seed run the previous way (at import, one ORM object per question, before the
+app exists) and the current way (bulk upsert in a background task after
+startup).
+
+Each measurement runs in a fresh interpreter. By default every run gets a
+scratch SQLite database, either empty ("fresh") or already seeded ("seeded");
+with --database-url the runs use that database as it is.
+
+    python scripts/benchmark_startup.py --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+started = time.perf_counter()
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+def legacy_seed():
+    """The previous import-time seeding: count, then add the seed one question at a time"""
+    from app.database import SessionLocal
+    from app.models.models import Question
+    from app.seeds.questions import QUESTIONS_SEED
+    db = SessionLocal()
+    try:
+        if db.query(Question).count() == 0:
+            for question_data in QUESTIONS_SEED:
+                db.add(Question(**question_data))
+            db.commit()
+            db.query(Question).count()
+    finally:
+        db.close()
+
+async def first_request(app):
+    import httpx
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as client:
+        (await client.get("/")).raise_for_status()
+
+async def child(mode):
+    timings = {}
+    if mode == "seed at import":
+        legacy_seed()
+    from app.main import app, background_tasks
+    timings["imported"] = time.perf_counter() - started
+    async with app.router.lifespan_context(app):
+        await first_request(app)
+        timings["first request"] = time.perf_counter() - started
+        # Only the seeding task is enabled in these runs
+        await asyncio.gather(*background_tasks)
+        timings["seeded"] = timings["imported"] if mode == "seed at import" else time.perf_counter() - started
+    print(json.dumps(timings))
+
+def scratch_database(seeded):
+    path = Path(tempfile.mkdtemp()) / "startup.db"
+    url = f"sqlite:///{path}"
+    env = {**os.environ, "DATABASE_URL": url}
+    code = (
+        "from sqlalchemy import create_engine; from app.database import Base; import app.models.models; "
+        f"Base.metadata.create_all(create_engine({url!r}))"
+    )
+    if seeded:
+        code += "; from app.seeds.run_seeds import run_all_seeds; run_all_seeds()"
+    subprocess.run([sys.executable, "-c", code], cwd=project_root, env=env, check=True, capture_output=True)
+    return url
+
+def measure(mode, database_url):
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "DEBUG": "true" if mode == "background seed" else "false",
+        "PLAN_MAINTENANCE_INTERVAL_MINUTES": "0",
+        "PYTHONPATH": str(project_root)
+    }
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", mode], cwd=project_root, env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API startup with and without import-time seeding")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="Use this database instead of scratch SQLite databases")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.child))
+        return
+
+    states = ["current"] if args.database_url else ["fresh", "seeded"]
+    header = f"{'database':<10}{'seeding':<18}{'import s':>10}{'first request s':>17}{'seeded s':>10}"
+    print(header)
+    print("-" * len(header))
+    for state in states:
+        for mode in ("seed at import", "background seed"):
+            samples = [
+                measure(mode, args.database_url or scratch_database(seeded=state == "seeded"))
+                for _ in range(args.runs)
+            ]
+            average = {key: sum(sample[key] for sample in samples) / len(samples) for key in samples[0]}
+            print(f"{state:<10}{mode:<18}{average['imported']:>10.3f}{average['first request']:>17.3f}{average['seeded']:>10.3f}")
+
+if __name__ == "__main__":
+    main()
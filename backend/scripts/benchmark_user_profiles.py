@@ -0,0 +1,108 @@
+"""
+Compare how generation loads a user's questionnaire data: the previous join of
+every response to its question plus tree building, against the materialized
+profile document read by primary key.
+
+For a sample of users with responses, both paths are timed and the documents
+they produce are compared; any mismatch is reported. Reports statements sent
+and latency per load. --build first builds (or rebuilds) the profile of every
+user with responses, which is also how existing users are backfilled after the
+migration.
+
+    python scripts/benchmark_user_profiles.py --build --sample 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from sqlalchemy import event, select
+from app.database import AsyncSessionLocal, async_engine
+from app.models.models import UserResponse
+from app.services.profile_serializer import compile_profile_template
+from app.services.prompt_evaluation import mean, percentile
+from app.services.user_profiles import get_path_index, load_profile, rebuild_profiles, set_path
+from app.services.user_responses import load_user_responses
+
+statements = 0
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+async def legacy_load(db, user_id):
+    """The previous implementation: join the responses to their questions and build the tree"""
+    responses = await load_user_responses(db, user_id)
+    structured_data = {}
+    for response in responses:
+        set_path(structured_data, tuple(response.question.field_key.split(".")), response.response_value)
+    compile_profile_template([response.question for response in responses])
+    return structured_data
+
+async def profile_load(db, user_id):
+    profile = await load_profile(db, user_id)
+    (await get_path_index(db)).template
+    return profile.document
+
+STRATEGIES = {"responses join": legacy_load, "profile document": profile_load}
+
+async def build_all(user_ids):
+    started = time.perf_counter()
+    await rebuild_profiles(user_ids)
+    print(f"Built {len(user_ids)} profiles in {time.perf_counter() - started:.1f}s")
+
+async def timed_load(strategy, user_id):
+    global statements
+    async with AsyncSessionLocal() as db:
+        # Warm the path index as a running worker would have it
+        await get_path_index(db)
+        statements = 0
+        started = time.perf_counter()
+        document = await STRATEGIES[strategy](db, user_id)
+        return (time.perf_counter() - started) * 1000, statements, document
+
+async def run(sample, build):
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.scalars(select(UserResponse.user_id).distinct().order_by(UserResponse.user_id))).all()
+    if build:
+        await build_all(user_ids)
+
+    results = {strategy: [] for strategy in STRATEGIES}
+    mismatches = 0
+    for user_id in user_ids[:sample]:
+        documents = []
+        for strategy in STRATEGIES:
+            latency, count, document = await timed_load(strategy, user_id)
+            results[strategy].append((latency, count))
+            documents.append(document)
+        mismatches += documents[0] != documents[1]
+
+    await async_engine.dispose()
+    return min(sample, len(user_ids)), results, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading questionnaire data for generation")
+    parser.add_argument("--sample", type=int, default=100, help="Users to load")
+    parser.add_argument("--build", action="store_true", help="Build every user's profile first")
+    args = parser.parse_args()
+
+    users, results, mismatches = asyncio.run(run(args.sample, args.build))
+    print(f"\nUsers: {users}  documents that differ: {mismatches}\n")
+    header = f"{'strategy':<20}{'statements':>11}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for strategy, values in results.items():
+        latencies = [latency for latency, _ in values]
+        print(
+            f"{strategy:<20}{mean([count for _, count in values]):>11.1f}"
+            f"{mean(latencies):>10.2f}{percentile(latencies, 50):>9.2f}{percentile(latencies, 95):>9.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Pick the bcrypt cost for this machine.
+
+Times bcrypt at each cost from --min-rounds up, prints how many verifications
+per second one thread and the login pool (PASSWORD_HASH_WORKERS threads)
+sustain, and selects the highest cost whose median hash time stays within
+PASSWORD_HASH_TARGET_MS (or --target-ms). Costs below MINIMUM_ROUNDS are never
+selected. With --write the choice is stored as BCRYPT_ROUNDS in the env file
+the settings read (.env); on platforms configured through environment
+variables, set the printed value there instead. Existing users with a lower
+cost are moved to the new one as they log in; a lower choice only applies to
+new hashes.
+
+Run it on the deployment machine, with the API's CPU allowance:
+
+    python scripts/calibrate_password_hash.py --write
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from passlib.hash import bcrypt
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# OWASP's floor for bcrypt; a slow machine gets slower logins rather than weaker hashes
+MINIMUM_ROUNDS = 10
+PASSWORD = "calibration-password"
+
+def hash_seconds(rounds, samples):
+    """Median time to hash one password at this cost"""
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.hash(PASSWORD)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def pool_verifications_per_second(rounds, workers, count):
+    stored = bcrypt.using(rounds=rounds).hash(PASSWORD)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        started = time.perf_counter()
+        list(executor.map(lambda _: bcrypt.verify(PASSWORD, stored), range(count)))
+        return count / (time.perf_counter() - started)
+
+def choose_rounds(timings, target_seconds):
+    within = [rounds for rounds, seconds in timings.items() if seconds <= target_seconds and rounds >= MINIMUM_ROUNDS]
+    return max(within) if within else MINIMUM_ROUNDS
+
+def write_setting(env_file, rounds):
+    line = f"BCRYPT_ROUNDS={rounds}"
+    content = env_file.read_text() if env_file.exists() else ""
+    if re.search(r"^BCRYPT_ROUNDS=.*$", content, flags=re.MULTILINE):
+        content = re.sub(r"^BCRYPT_ROUNDS=.*$", line, content, flags=re.MULTILINE)
+    else:
+        content += ("" if not content or content.endswith("\n") else "\n") + line + "\n"
+    env_file.write_text(content)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bcrypt cost on this machine and choose BCRYPT_ROUNDS")
+    parser.add_argument("--target-ms", type=float, default=settings.PASSWORD_HASH_TARGET_MS)
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--write", action="store_true", help="Store the chosen cost in the env file")
+    parser.add_argument("--env-file", type=Path, default=project_root / ".env")
+    args = parser.parse_args()
+
+    target_seconds = args.target_ms / 1000
+    timings = {}
+    header = f"{'rounds':>6}{'ms/hash':>10}{'verify/s (1 thread)':>22}{f'verify/s ({args.workers} threads)':>22}"
+    print(header)
+    print("-" * len(header))
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        seconds = hash_seconds(rounds, args.samples)
+        timings[rounds] = seconds
+        pooled = pool_verifications_per_second(rounds, args.workers, max(args.workers * 2, args.samples))
+        print(f"{rounds:>6}{seconds * 1000:>10.1f}{1 / seconds:>22.1f}{pooled:>22.1f}")
+        # Every extra round doubles the cost; no point timing costs far past the target
+        if seconds > target_seconds * 2:
+            break
+
+    rounds = choose_rounds(timings, target_seconds)
+    print(f"\nTarget {args.target_ms:.0f} ms per hash: BCRYPT_ROUNDS={rounds} (currently {settings.BCRYPT_ROUNDS})")
+    if timings.get(rounds, 0) > target_seconds:
+        print(f"Warning: even the minimum cost of {MINIMUM_ROUNDS} rounds takes longer than the target on this machine")
+    if rounds < settings.BCRYPT_ROUNDS:
+        print(f"Note: hashes stored with {settings.BCRYPT_ROUNDS} rounds keep that cost; only new hashes use {rounds}")
+    if args.write:
+        write_setting(args.env_file, rounds)
+        print(f"Stored in {args.env_file}; restart the API to apply it")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Drive the main routes with the event loop monitor on and list what blocked the loop.
+
+Starts the app with LOOP_MONITOR_ENABLED, sends --rounds rounds of requests
+(health, questions, meal plan listing, admin stats, registration and login)
+and prints GET /api/admin/event-loop. With --inline-bcrypt, login verifies
+passwords on the loop as it used to, which should show up as the top offender.
+
+    python scripts/check_event_loop.py --rounds 3 --inline-bcrypt
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+os.environ["LOOP_MONITOR_ENABLED"] = "true"
+os.environ.setdefault("PLAN_MAINTENANCE_INTERVAL_MINUTES", "0")
+
+import httpx
+from sqlalchemy import delete
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models.models import User
+from app.services import auth
+
+PASSWORD = "loop-check-password"
+
+def create_scratch_users():
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:8]
+        user = User(email=f"loop-{tag}@example.com", hashed_password=auth.get_password_hash(PASSWORD), is_approved=True)
+        admin = User(email=f"loop-{tag}-admin@example.com", hashed_password="!", is_approved=True, is_admin=True)
+        db.add_all([user, admin])
+        db.commit()
+        return user.email, auth.create_access_token(data=auth.token_claims(user)), auth.create_access_token(data=auth.token_claims(admin))
+    finally:
+        db.close()
+
+def remove_scratch_users(emails):
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.email.in_(emails)))
+        db.commit()
+    finally:
+        db.close()
+
+async def verify_inline(plain_password, hashed_password):
+    """The behaviour before the bcrypt pool: hashing on the event loop thread"""
+    return auth.pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def drive(rounds, email, user_token, admin_token):
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    registered = []
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loop-check", timeout=60) as client:
+            for _ in range(rounds):
+                await client.get("/")
+                await client.get("/api/questions/", headers=user_headers)
+                await client.get("/api/meal-plans/", headers=user_headers)
+                await client.get("/api/admin/stats", headers=admin_headers)
+                new_email = f"loop-{uuid.uuid4().hex[:8]}@example.com"
+                registered.append(new_email)
+                await client.post("/api/users/register", json={"email": new_email, "password": PASSWORD})
+                await client.post("/api/users/login", data={"username": email, "password": PASSWORD})
+            # Let the heartbeat record the last block before reading the report
+            await asyncio.sleep(0.1)
+            report = (await client.get("/api/admin/event-loop", headers=admin_headers)).json()
+    return report, registered
+
+async def run(rounds, inline_bcrypt):
+    email, user_token, admin_token = create_scratch_users()
+    if inline_bcrypt:
+        auth.verify_and_update_password = verify_inline
+    registered = []
+    try:
+        report, registered = await drive(rounds, email, user_token, admin_token)
+    finally:
+        remove_scratch_users([email, email.replace("@", "-admin@"), *registered])
+        await async_engine.dispose()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="List the code that blocks the event loop on the main routes")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--inline-bcrypt", action="store_true", help="Verify passwords on the loop, as before the bcrypt pool")
+    parser.add_argument("--stacks", action="store_true", help="Print the captured stacks")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args.rounds, args.inline_bcrypt))
+    print(f"\nThreshold {report['threshold_ms']} ms, max lag {report['max_lag_ms']} ms")
+    print(f"Blocked ms by route: {json.dumps(report['blocked_ms_by_route'])}\n")
+    header = f"{'route':<28}{'count':>6}{'total ms':>10}{'max ms':>9}  location"
+    print(header)
+    print("-" * len(header))
+    for offender in report["offenders"]:
+        print(f"{offender['route']:<28}{offender['count']:>6}{offender['total_ms']:>10.1f}{offender['max_ms']:>9.1f}  {offender['location']}")
+        if args.stacks:
+            print("".join(offender["stack"][-8:]))
+
+if __name__ == "__main__":
+    main()
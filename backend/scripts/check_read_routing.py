@@ -0,0 +1,124 @@
+"""
+Check read-replica routing and read-your-writes behaviour.
+
+Creates a scratch user, then repeatedly creates a meal plan and immediately
+reads it back (GET /api/meal-plans/{id}) and lists the user's plans. Every read
+must see the write; the report shows which database served the reads and the
+replication lag observed. After the pin window it checks that reads move to
+the replica. The requests go through the ASGI app in-process.
+
+Works with a real streaming replica or with a stand-in: point READ_REPLICA_URL
+at the primary itself (or at the same SQLite file) to exercise the routing
+without replication.
+
+Usage:
+    READ_REPLICA_URL=postgresql://... python scripts/check_read_routing.py --rounds 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import delete
+from app.core.config import get_settings
+from app.database import SessionLocal, async_engine, replica_engine
+from app.main import app
+from app.models.models import User, MealPlan
+from app.services import read_replica
+from app.services.auth import create_access_token
+
+settings = get_settings()
+
+def create_scratch_user() -> int:
+    db = SessionLocal()
+    try:
+        user = User(
+            email=f"routing-check-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password="!", is_active=True, is_approved=True
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+def remove_scratch_user(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        for meal_plan in db.query(MealPlan).filter(MealPlan.user_id == user_id):
+            db.delete(meal_plan)
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+def routed_since(before: dict) -> Counter:
+    after = read_replica.read_routing_total.snapshot()
+    return Counter({key: value - before.get(key, 0) for key, value in after.items() if value - before.get(key, 0)})
+
+async def run(rounds: int):
+    user_id = create_scratch_user()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+    status_task = asyncio.create_task(read_replica.run_status_checks(settings.REPLICA_STATUS_INTERVAL_SECONDS))
+    stale_reads = 0
+    lags = []
+    try:
+        # Wait for the first status check
+        await asyncio.sleep(0.1)
+        before = read_replica.read_routing_total.snapshot()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://routing-check") as client:
+            for _ in range(rounds):
+                created = await client.post("/api/meal-plans/", headers=headers, json={
+                    "plan_data": {"daily_calories": 2000, "weekly_plan": {}},
+                    "start_date": "2026-01-01T00:00:00"
+                })
+                created.raise_for_status()
+                meal_plan_id = created.json()["id"]
+                read = await client.get(f"/api/meal-plans/{meal_plan_id}", headers=headers)
+                listing = await client.get("/api/meal-plans/", params={"view": "summary"}, headers=headers)
+                if read.status_code != 200 or meal_plan_id not in [item["id"] for item in listing.json()["items"]]:
+                    stale_reads += 1
+                if read_replica._status.lag_seconds is not None:
+                    lags.append(read_replica._status.lag_seconds)
+            after_writes = routed_since(before)
+
+            # Once the pin window has passed, the same user's reads should go to the replica
+            await asyncio.sleep(read_replica.pin_seconds() + 0.1)
+            before = read_replica.read_routing_total.snapshot()
+            await client.get("/api/meal-plans/", headers=headers)
+            after_pin = routed_since(before)
+    finally:
+        status_task.cancel()
+        remove_scratch_user(user_id)
+        await async_engine.dispose()
+        await replica_engine.dispose()
+
+    print(f"Replica: {read_replica._status.as_dict()}")
+    print(f"{rounds} write/read rounds, {stale_reads} stale reads")
+    print(f"Reads right after writes: {dict(after_writes)}")
+    print(f"Reads after the {read_replica.pin_seconds():.1f}s pin window: {dict(after_pin)}")
+    if lags:
+        print(f"Replication lag seen: max {max(lags):.3f}s, last {lags[-1]:.3f}s")
+    return stale_reads
+
+def main():
+    parser = argparse.ArgumentParser(description="Check read-replica routing and read-your-writes")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    if not settings.READ_REPLICA_URL:
+        sys.exit("READ_REPLICA_URL is not set")
+    started = time.perf_counter()
+    stale_reads = asyncio.run(run(args.rounds))
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    sys.exit(1 if stale_reads else 0)
+
+if __name__ == "__main__":
+    main()
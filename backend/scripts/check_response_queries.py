@@ -0,0 +1,111 @@
+"""
+Check that loading questionnaire responses costs a constant number of queries.
+
+Creates users with a few, some and all questions answered, calls the endpoints
+that load responses (the user's responses, the admin view and meal plan
+generation) and counts the SQL statements each call issues. Exits with status 1
+if the count changes with the number of answers, i.e. if an N+1 query pattern
+creeps back in. A warm-up user is requested first, so the per-process caches
+are as a running worker has them and only steady-state calls are compared.
+
+Usage (against a development or scratch database, it inserts users):
+    python scripts/check_response_queries.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Generation runs against the local provider so no API key is needed
+os.environ.setdefault("MEAL_PLAN_PROVIDER", "local")
+os.environ.setdefault("LOCAL_PROVIDER_LATENCY_MS", "0")
+os.environ.setdefault("LOCAL_PROVIDER_MS_PER_TOKEN", "0")
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import event, insert, select
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models.models import Question, User, UserResponse
+from app.seeds.run_seeds import run_all_seeds
+from app.services.auth import create_access_token
+from app.services.user_profiles import rebuild_profiles
+
+statements = 0
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+async def build_profiles(user_ids):
+    await rebuild_profiles(user_ids)
+    # The requests run in another event loop
+    await async_engine.dispose()
+
+def create_users(answer_counts):
+    """
+    An admin plus one user per answer count, with their profile documents built
+    as saving answers builds them; returns (admin id, {answer count: user id})
+    """
+    run_all_seeds()
+    tag = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    db = SessionLocal()
+    try:
+        question_ids = db.scalars(select(Question.id).where(Question.is_active == True).order_by(Question.order)).all()
+        admin = User(email=f"query-check-{tag}-admin@example.com", hashed_password="-", is_admin=True, is_approved=True)
+        users = {count: User(email=f"query-check-{tag}-{count}@example.com", hashed_password="-", is_approved=True) for count in answer_counts}
+        db.add_all([admin, *users.values()])
+        db.flush()
+        for count, user in users.items():
+            db.execute(insert(UserResponse), [
+                {"user_id": user.id, "question_id": question_id, "response_value": f"answer {question_id}"}
+                for question_id in question_ids[:count or len(question_ids)]
+            ])
+        db.commit()
+        asyncio.run(build_profiles([user.id for user in users.values()]))
+        return admin.id, {count or len(question_ids): user.id for count, user in users.items()}
+    finally:
+        db.close()
+
+async def count_requests(admin_id, user_ids, warmup_id):
+    global statements
+    admin_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(admin_id)})}"}
+    counts = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+        for answers, user_id in [(None, warmup_id), *sorted(user_ids.items())]:
+            user_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+            calls = {
+                "GET /api/questions/user-responses": ("GET", "/api/questions/user-responses", None, user_headers),
+                "GET /api/admin/users/{id}/responses": ("GET", f"/api/admin/users/{user_id}/responses", None, admin_headers),
+                "POST /api/meal-plans/generate": ("POST", "/api/meal-plans/generate", {"responses": [1]}, user_headers),
+            }
+            for label, (method, path, body, headers) in calls.items():
+                statements = 0
+                response = await client.request(method, path, json=body, headers=headers)
+                response.raise_for_status()
+                if answers is not None:
+                    counts.setdefault(label, {})[answers] = statements
+    await async_engine.dispose()
+    return counts
+
+def main():
+    admin_id, user_ids = create_users([1, 10, 0, 5])
+    # The first requests fill the per-process caches (the path index, the admin's auth cache entry); they are not counted
+    warmup_id = user_ids.pop(5)
+    counts = asyncio.run(count_requests(admin_id, user_ids, warmup_id))
+
+    failed = False
+    for label, by_answers in counts.items():
+        constant = len(set(by_answers.values())) == 1
+        failed = failed or not constant
+        details = ", ".join(f"{answers} answers: {count}" for answers, count in by_answers.items())
+        print(f"{'ok  ' if constant else 'FAIL'}  {label:<38} statements per call ({details})")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
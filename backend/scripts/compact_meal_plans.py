@@ -0,0 +1,60 @@
+"""
+Move historical meal plans into compressed archival storage.
+
+Compresses plans older than --older-than-days (default PLAN_ARCHIVE_AFTER_DAYS)
+that the user has since replaced with a newer plan. The zstd dictionary is
+trained on recent plans the first time, or again with --retrain. Archived
+plans are decompressed transparently when read through the API. --restore
+moves every archived plan back to plain plan_data (needed before downgrading
+the migration).
+
+Usage:
+    python scripts/compact_meal_plans.py [--older-than-days 30] [--retrain] [--limit 10000]
+    python scripts/compact_meal_plans.py --restore
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.database import AsyncSessionLocal, async_engine
+from app.services.plan_archive import compact_meal_plans, restore_meal_plans
+
+async def run(args):
+    async with AsyncSessionLocal() as db:
+        if args.restore:
+            result = await restore_meal_plans(db, batch_size=args.batch_size)
+        else:
+            result = await compact_meal_plans(
+                db, older_than_days=args.older_than_days, batch_size=args.batch_size,
+                retrain=args.retrain, limit=args.limit
+            )
+    await async_engine.dispose()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact historical meal plans into archival storage")
+    parser.add_argument("--older-than-days", type=int, help="Archive plans created before this many days ago")
+    parser.add_argument("--batch-size", type=int, help="Plans per committed batch")
+    parser.add_argument("--limit", type=int, help="Archive at most this many plans")
+    parser.add_argument("--retrain", action="store_true", help="Train a new compression dictionary first")
+    parser.add_argument("--restore", action="store_true", help="Decompress every archived plan back into plan_data")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.restore:
+        print(f"Restored {result} plans")
+        return
+    if result["skipped_locked"]:
+        print("Another compaction is running")
+    if result["dictionary_id"] is None:
+        print("Too few plans to train a dictionary, compressed without one")
+    ratio = result["bytes_before"] / result["bytes_after"] if result["bytes_after"] else 0
+    print(f"Archived {result['archived']} plans: {result['bytes_before']} -> {result['bytes_after']} bytes ({ratio:.1f}x)")
+
+if __name__ == "__main__":
+    main()
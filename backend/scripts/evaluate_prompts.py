@@ -0,0 +1,92 @@
+"""
+Evaluate candidate meal plan prompts offline.
+
+Replays a sample of stored user profiles against the active prompt, stored prompt
+versions and/or prompt drafts read from files, and prints a per-prompt report of
+latency percentiles, token usage, parse/normalization repair rates and plan stats.
+
+Usage:
+    python scripts/evaluate_prompts.py --provider local --sample-size 50 --prompt-id 3 --prompt-file draft.txt
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.database import AsyncSessionLocal
+from app.services.prompt_evaluation import build_candidates, load_profile_sample, evaluate_prompts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate meal plan system prompts against stored profiles")
+    parser.add_argument("--prompt-id", type=int, action="append", default=[], help="Stored system prompt id (repeatable)")
+    parser.add_argument("--prompt-file", action="append", default=[], help="File containing a draft prompt (repeatable)")
+    parser.add_argument("--no-active", action="store_true", help="Do not include the currently active prompt")
+    parser.add_argument("--sample-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--provider", choices=["openai", "local"], default=None)
+    parser.add_argument("--profile-format", choices=["json", "compact_json", "text"], default=None)
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the profile sample")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    return parser.parse_args()
+
+def print_report(report):
+    print(f"\nProvider: {report['provider']}  profile format: {report['profile_format']}  "
+          f"profiles: {report['profiles']}  concurrency: {report['concurrency']}\n")
+    header = f"{'prompt':<24}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'compl tok':>11}{'parse fail':>12}{'repairs':>9}{'kcal err%':>11}{'variety':>9}"
+    print(header)
+    print("-" * len(header))
+
+    def fmt(value, pattern="{:.0f}"):
+        return pattern.format(value) if value is not None else "-"
+
+    for prompt in report['prompts']:
+        print(
+            f"{prompt['label'][:23]:<24}"
+            f"{fmt(prompt['latency_ms']['p50']):>10}"
+            f"{fmt(prompt['latency_ms']['p90']):>10}"
+            f"{fmt(prompt['latency_ms']['p99']):>10}"
+            f"{fmt(prompt['completion_tokens']['mean']):>11}"
+            f"{fmt(prompt['parse_failure_rate'], '{:.1%}'):>12}"
+            f"{fmt(prompt['normalization_repair_rate'], '{:.1%}'):>9}"
+            f"{fmt(prompt['calorie_error_pct'], '{:.1f}'):>11}"
+            f"{fmt(prompt['meal_variety'], '{:.2f}'):>9}"
+        )
+
+async def load_inputs(args, drafts):
+    async with AsyncSessionLocal() as db:
+        candidates = await build_candidates(db, args.prompt_id, drafts, include_active=not args.no_active)
+        profiles = await load_profile_sample(db, args.sample_size, seed=args.seed)
+    return candidates, profiles
+
+async def run(args):
+    drafts = [{'label': Path(path).stem, 'prompt_text': Path(path).read_text()} for path in args.prompt_file]
+    candidates, profiles = await load_inputs(args, drafts)
+
+    if not candidates or not profiles:
+        print("Nothing to evaluate: need at least one prompt and one stored user profile")
+        sys.exit(1)
+
+    return await evaluate_prompts(
+        candidates,
+        profiles,
+        provider=args.provider,
+        concurrency=args.concurrency,
+        profile_format=args.profile_format
+    )
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
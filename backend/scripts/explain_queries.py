@@ -0,0 +1,179 @@
+"""
+Check the query plans of every ORM query the routers issue.
+
+Seeds a scratch PostgreSQL database with a synthetic dataset, calls each API
+endpoint in-process, captures the SELECT statements they run and EXPLAINs them
+with the same parameters. Exits with status 1 if any plan does a sequential scan
+over a table with at least --min-rows rows, unless the endpoint is listed in
+FULL_SCAN_ALLOWED.
+
+Run it against a migrated database you can throw away:
+    DATABASE_URL=postgresql://localhost/smartfuel_explain alembic upgrade head
+    DATABASE_URL=postgresql://localhost/smartfuel_explain python scripts/explain_queries.py --users 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Generation runs against the local provider so no API key is needed
+os.environ.setdefault("MEAL_PLAN_PROVIDER", "local")
+os.environ.setdefault("LOCAL_PROVIDER_LATENCY_MS", "0")
+os.environ.setdefault("LOCAL_PROVIDER_MS_PER_TOKEN", "0")
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import httpx
+from sqlalchemy import event, select, text
+from app.database import async_engine, SessionLocal
+from app.main import app
+from app.models.models import Question, MealPlan
+from app.services.auth import create_access_token
+from seed_dataset import seed_dataset
+
+# Endpoints that read whole tables by design
+FULL_SCAN_ALLOWED = {
+    "GET /api/admin/stats": "whole-table counts",
+    "GET /api/admin/meal-plans/stats": "whole-table counts",
+    "GET /api/users/all": "lists every user",
+}
+
+captured = []
+current_endpoint = None
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def capture_statement(conn, cursor, statement, parameters, context, executemany):
+    if current_endpoint and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        captured.append((current_endpoint, statement, parameters))
+
+def build_requests(ids):
+    """(endpoint label, method, path, json body, as admin) for every route worth checking"""
+    user_id, admin_id = ids["user_id"], ids["admin_id"]
+    question_id, plan_id = ids["question_id"], ids["meal_plan_id"]
+    answers = {"responses": [{"question_id": qid, "answer": "updated"} for qid in ids["question_ids"][:10]]}
+    return [
+        ("GET /api/users/me", "GET", "/api/users/me", None, False),
+        ("GET /api/questions/", "GET", "/api/questions/", None, False),
+        ("GET /api/questions/{id}", "GET", f"/api/questions/{question_id}", None, False),
+        ("GET /api/questions/user-responses", "GET", "/api/questions/user-responses", None, False),
+        ("POST /api/questions/responses", "POST", "/api/questions/responses", answers, False),
+        ("GET /api/meal-plans/", "GET", "/api/meal-plans/", None, False),
+        ("GET /api/meal-plans/{id}", "GET", f"/api/meal-plans/{plan_id}", None, False),
+        ("POST /api/meal-plans/generate", "POST", "/api/meal-plans/generate", {"responses": [1]}, False),
+        ("GET /api/users/all", "GET", "/api/users/all", None, True),
+        ("GET /api/admin/stats", "GET", "/api/admin/stats", None, True),
+        ("GET /api/admin/meal-plans/stats", "GET", "/api/admin/meal-plans/stats", None, True),
+        ("GET /api/admin/questions/stats", "GET", "/api/admin/questions/stats?time_range=7d", None, True),
+        ("GET /api/admin/users/{id}/responses", "GET", f"/api/admin/users/{user_id}/responses", None, True),
+        ("GET /api/admin/questions", "GET", "/api/admin/questions", None, True),
+        ("GET /api/admin/users/pending", "GET", "/api/admin/users/pending", None, True),
+        ("GET /api/admin/system-prompts", "GET", "/api/admin/system-prompts", None, True),
+        ("GET /api/admin/prompt-experiments/{experiment}", "GET", "/api/admin/prompt-experiments/meal_plan", None, True),
+    ]
+
+def dataset_ids(seeded):
+    db = SessionLocal()
+    try:
+        question_ids = db.scalars(select(Question.id).where(Question.is_active == True).order_by(Question.order)).all()
+        meal_plan_id = db.scalar(select(MealPlan.id).where(MealPlan.user_id == seeded["user_id"]).limit(1))
+    finally:
+        db.close()
+    return {**seeded, "question_ids": question_ids, "question_id": question_ids[0], "meal_plan_id": meal_plan_id or 0}
+
+def sequential_scans(plan):
+    """Yield the relation names of Seq Scan nodes in an EXPLAIN (FORMAT JSON) plan"""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from sequential_scans(child)
+
+async def call_endpoints(requests, tokens):
+    global current_endpoint
+    statuses = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://explain") as client:
+        for label, method, path, body, as_admin in requests:
+            current_endpoint = label
+            headers = {"Authorization": f"Bearer {tokens['admin' if as_admin else 'user']}"}
+            response = await client.request(method, path, json=body, headers=headers)
+            statuses[label] = response.status_code
+    current_endpoint = None
+    return statuses
+
+async def explain_captured(min_rows):
+    async with async_engine.connect() as conn:
+        table_rows = {
+            row.relname: row.reltuples
+            for row in await conn.execute(text(
+                "SELECT relname, reltuples FROM pg_class "
+                "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+            ))
+        }
+        results = []
+        seen = set()
+        for endpoint, statement, parameters in captured:
+            if (endpoint, statement) in seen:
+                continue
+            seen.add((endpoint, statement))
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = sorted({
+                table for table in sequential_scans(plan[0]["Plan"])
+                if table_rows.get(table, 0) >= min_rows
+            })
+            results.append({"endpoint": endpoint, "statement": statement, "seq_scans": scans})
+    return results
+
+def print_report(results, statuses):
+    failures = 0
+    for endpoint, status_code in statuses.items():
+        queries = [result for result in results if result["endpoint"] == endpoint]
+        print(f"\n{endpoint}  -> {status_code}, {len(queries)} queries")
+        for result in queries:
+            summary = " ".join(result["statement"].split())[:110]
+            if not result["seq_scans"]:
+                print(f"    ok    {summary}")
+                continue
+            allowed = FULL_SCAN_ALLOWED.get(endpoint)
+            if allowed:
+                print(f"    allow {summary}\n          seq scan on {', '.join(result['seq_scans'])} ({allowed})")
+            else:
+                failures += 1
+                print(f"    FAIL  {summary}\n          seq scan on {', '.join(result['seq_scans'])}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query issued by the API routers")
+    parser.add_argument("--users", type=int, default=2000, help="Synthetic users to seed")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Tables with at least this many rows count as large")
+    args = parser.parse_args()
+
+    if async_engine.dialect.name != "postgresql":
+        print("explain_queries.py needs a PostgreSQL DATABASE_URL")
+        sys.exit(2)
+
+    ids = dataset_ids(seed_dataset(args.users))
+    tokens = {
+        "admin": create_access_token(data={"sub": str(ids["admin_id"])}),
+        "user": create_access_token(data={"sub": str(ids["user_id"])})
+    }
+
+    async def run():
+        statuses = await call_endpoints(build_requests(ids), tokens)
+        results = await explain_captured(args.min_rows)
+        await async_engine.dispose()
+        return statuses, results
+
+    statuses, results = asyncio.run(run())
+    failures = print_report(results, statuses)
+
+    print(f"\n{len(results)} distinct queries checked, {failures} sequential scans over large tables")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
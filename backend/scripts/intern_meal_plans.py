@@ -0,0 +1,43 @@
+"""
+Move the meals of existing plans into the content-addressed meal store.
+
+Plans written since the meal store was added are interned when saved; this
+converts the older ones in committed batches and prints how far the store
+deduplicates (distinct meals vs meal references). Archived plans are skipped.
+
+Usage:
+    python scripts/intern_meal_plans.py [--batch-size 200] [--limit 10000]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.database import AsyncSessionLocal, async_engine
+from app.services.meal_store import intern_existing_plans, store_stats
+
+async def run(batch_size, limit):
+    async with AsyncSessionLocal() as db:
+        processed = await intern_existing_plans(db, batch_size=batch_size, limit=limit)
+        stats = await store_stats(db)
+    await async_engine.dispose()
+    return processed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Intern the meals of existing plans into the meal store")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--limit", type=int, help="Process at most this many plans")
+    args = parser.parse_args()
+
+    processed, stats = asyncio.run(run(args.batch_size, args.limit))
+    print(f"Processed {processed} plans")
+    print(f"{stats['interned_plans']} of {stats['plans']} plans use the meal store")
+    ratio = stats["meal_references"] / stats["distinct_meals"] if stats["distinct_meals"] else 0
+    print(f"{stats['meal_references']} meal references to {stats['distinct_meals']} distinct meals ({ratio:.1f} uses per meal)")
+
+if __name__ == "__main__":
+    main()
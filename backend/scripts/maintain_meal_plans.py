@@ -0,0 +1,83 @@
+"""
+Maintain the partitioned meal_plans table.
+
+Lists the monthly partitions (PostgreSQL), creates the upcoming ones and
+applies the retention policy: inactive plans older than --retention-days
+(default PLAN_RETENTION_DAYS) that the user has since replaced are exported to
+a zstd-compressed JSON Lines file under PLAN_EXPORT_DIR and deleted, and
+emptied partitions are dropped. The API runs the same maintenance every
+PLAN_MAINTENANCE_INTERVAL_MINUTES.
+
+Usage:
+    python scripts/maintain_meal_plans.py --status
+    python scripts/maintain_meal_plans.py [--retention-days 365] [--limit 10000] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.core.config import get_settings
+from app.database import AsyncSessionLocal, async_engine
+from app.services.plan_partitions import ensure_partitions, list_partitions
+from app.services.plan_retention import apply_retention
+
+settings = get_settings()
+
+def print_partitions(partitions):
+    if not partitions:
+        print("meal_plans is not partitioned")
+        return
+    for partition in partitions:
+        print(f"{partition['name']:<24} {str(partition['from'] or 'MINVALUE'):<20} {str(partition['to'] or 'MAXVALUE'):<20} "
+              f"~{partition['rows_estimate']} rows, {partition['bytes'] / 1024 / 1024:.1f} MB")
+
+async def run(args):
+    async with AsyncSessionLocal() as db:
+        if args.status:
+            result = await list_partitions(db)
+        else:
+            created = [] if args.dry_run else await ensure_partitions(db, settings.PLAN_PARTITION_PREMAKE_MONTHS)
+            retention = await apply_retention(
+                db, retention_days=args.retention_days, export_dir=args.export_dir,
+                limit=args.limit, dry_run=args.dry_run
+            )
+            result = {"created_partitions": created, "retention": retention}
+    await async_engine.dispose()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Create meal plan partitions and apply the retention policy")
+    parser.add_argument("--status", action="store_true", help="List the partitions and exit")
+    parser.add_argument("--retention-days", type=int, help="Export and delete replaced plans created before this many days ago")
+    parser.add_argument("--export-dir", help="Directory for the export files")
+    parser.add_argument("--limit", type=int, help="Export at most this many plans")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the plans the retention policy would remove")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.status:
+        print_partitions(result)
+        return
+    if result["created_partitions"]:
+        print(f"Partitions ensured: {', '.join(result['created_partitions'])}")
+    retention = result["retention"]
+    if not retention["enabled"]:
+        print("Retention is disabled (PLAN_RETENTION_DAYS=0)")
+        return
+    if args.dry_run:
+        print(f"{retention['candidates']} plans created before {retention['cutoff']:%Y-%m-%d} would be exported and deleted")
+        return
+    if retention["skipped_locked"]:
+        print("Another retention run is in progress")
+    print(f"Exported and deleted {retention['exported']} plans"
+          + (f" to {retention['export_file']} ({retention['export_bytes']} bytes)" if retention["export_file"] else ""))
+    if retention["dropped_partitions"]:
+        print(f"Dropped partitions: {', '.join(retention['dropped_partitions'])}")
+
+if __name__ == "__main__":
+    main()
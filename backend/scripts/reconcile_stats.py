@@ -0,0 +1,50 @@
+"""
+Recompute the admin statistics rollups from scratch and report drift.
+
+Compares stat_counters and question_response_daily with counts taken from the
+base tables. Drift is repaired unless --dry-run is given. Exits with status 1
+when drift was found, so it can run from cron and alert.
+
+Usage:
+    python scripts/reconcile_stats.py [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.database import AsyncSessionLocal, async_engine
+from app.services.stats import reconcile
+
+async def run(fix):
+    async with AsyncSessionLocal() as db:
+        report = await reconcile(db, fix=fix)
+    await async_engine.dispose()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the admin statistics rollups")
+    parser.add_argument("--dry-run", action="store_true", help="Only report drift")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(fix=not args.dry_run))
+    for name, drift in report["counter_drift"].items():
+        print(f"counter {name}: stored {drift['stored']}, actual {drift['actual']}")
+    for drift in report["bucket_drift"]:
+        print(f"responses question {drift['question_id']} on {drift['day']}: stored {drift['stored']}, actual {drift['actual']}")
+    if report["bucket_drift_count"] > len(report["bucket_drift"]):
+        print(f"... {report['bucket_drift_count'] - len(report['bucket_drift'])} more daily buckets differ")
+
+    drifted = bool(report["counter_drift"] or report["bucket_drift_count"])
+    if not drifted:
+        print("No drift")
+    elif report["fixed"]:
+        print("Rollups rebuilt from the base tables")
+    sys.exit(1 if drifted else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Fill a scratch database with a synthetic dataset for benchmarks and query plan checks.
+
+Creates users (a share of them pending approval), a questionnaire answer from
+every user for every active question and a few meal plans per user, with
+timestamps spread over the past year, then builds the users' profile
+documents and ANALYZEs the tables.
+
+Only run this against a database you can throw away.
+
+Usage:
+    python scripts/seed_dataset.py --users 5000 --plans-per-user 3
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root directory to Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from sqlalchemy import insert, select, text
+from app.database import SessionLocal, AsyncSessionLocal, async_engine
+from app.models.models import User, Question, UserResponse, MealPlan
+from app.seeds.run_seeds import run_all_seeds
+from app.services.auth import get_password_hash
+from app.services.local_provider import build_meal_plan
+from app.services.meal_plan_summary import plan_headline
+from app.services.stats import reconcile
+from app.services.user_profiles import rebuild_profiles
+
+SEED_PASSWORD = "seed-password"
+BATCH_SIZE = 5000
+
+def random_answer(question: Question, rng: random.Random):
+    if question.options:
+        return rng.choice(question.options)
+    validation = question.validation or {}
+    if "min" in validation and "max" in validation:
+        low, high = validation["min"], validation["max"]
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return round(rng.uniform(low, high), 1)
+    return f"answer {rng.randint(1, 50)}"
+
+def insert_batches(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+async def rebuild_derived(user_ids):
+    """Bulk inserts bypass the profile documents and stats counters, so rebuild them afterwards"""
+    await rebuild_profiles(user_ids)
+    async with AsyncSessionLocal() as db:
+        await reconcile(db, fix=True)
+    await async_engine.dispose()
+
+def seed_dataset(users: int, plans_per_user: int = 2, pending_share: float = 0.05, seed: int = 0) -> dict:
+    """Insert the synthetic dataset and return the ids of an admin and a regular user"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    run_all_seeds()
+
+    db = SessionLocal()
+    try:
+        questions = db.scalars(select(Question).where(Question.is_active == True)).all()
+        hashed_password = get_password_hash(SEED_PASSWORD)
+        tag = now.strftime("%Y%m%d%H%M%S")
+
+        def created_at():
+            return now - timedelta(days=rng.random() * 365)
+
+        user_rows = [
+            {
+                "email": f"seed-{tag}-{index}@example.com",
+                "hashed_password": hashed_password,
+                "is_admin": index == 0,
+                "is_active": True,
+                "is_approved": index == 0 or rng.random() >= pending_share,
+                "created_at": created_at()
+            }
+            for index in range(users)
+        ]
+        insert_batches(db, User, user_rows)
+        user_ids = db.scalars(select(User.id).where(User.email.like(f"seed-{tag}-%")).order_by(User.id)).all()
+
+        response_rows = []
+        plan_rows = []
+        for user_id in user_ids:
+            answered_at = created_at()
+            for question in questions:
+                response_rows.append({
+                    "user_id": user_id,
+                    "question_id": question.id,
+                    "response_value": random_answer(question, rng),
+                    "created_at": answered_at,
+                    "updated_at": answered_at
+                })
+            for plan_index in range(rng.randint(0, plans_per_user * 2)):
+                plan_created_at = created_at()
+                plan_data = build_meal_plan(f"{user_id}:{plan_index}")
+                plan_rows.append({
+                    "user_id": user_id,
+                    "plan_data": plan_data,
+                    **plan_headline(plan_data),
+                    "created_at": plan_created_at,
+                    "updated_at": plan_created_at,
+                    "is_active": True,
+                    "start_date": plan_created_at
+                })
+
+        insert_batches(db, UserResponse, response_rows)
+        insert_batches(db, MealPlan, plan_rows)
+        db.commit()
+
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+            db.commit()
+
+        asyncio.run(rebuild_derived(user_ids))
+
+        print(f"Seeded {len(user_ids)} users, {len(response_rows)} responses and {len(plan_rows)} meal plans")
+        return {"admin_id": user_ids[0], "user_id": user_ids[1] if len(user_ids) > 1 else user_ids[0]}
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch database with synthetic users, responses and meal plans")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--plans-per-user", type=int, default=2, help="Average meal plans per user")
+    parser.add_argument("--pending-share", type=float, default=0.05, help="Share of users pending approval")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    seed_dataset(args.users, args.plans_per_user, args.pending_share, args.seed)
+
+if __name__ == "__main__":
+    main()
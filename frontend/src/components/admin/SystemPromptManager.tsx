@@ -66,8 +66,8 @@ const SystemPromptManager = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await adminApi.getAllSystemPrompts();
-      setPrompts(response.data);
+      const prompts = await adminApi.getAllSystemPrompts<SystemPrompt>();
+      setPrompts(prompts);
     } catch (error: any) {
       const errorMsg = error.response?.data?.detail || 'Failed to fetch system prompts';
       setError(errorMsg);
@@ -12,7 +12,7 @@ import {
   Typography,
   Alert,
 } from '@mui/material';
-import api from '../../services/api';
+import api, { adminApi } from '../../services/api';
 
 interface PendingUser {
   id: string;
@@ -25,13 +25,19 @@ const UserApproval = () => {
   const [pendingUsers, setPendingUsers] = useState<PendingUser[]>([]);
   const [error, setError] = useState<string>('');
   const [successMessage, setSuccessMessage] = useState<string>('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(false);
 
-  const fetchPendingUsers = async () => {
+  const fetchPendingUsers = async (cursor: string | null = null) => {
     try {
-      const response = await api.get('/admin/users/pending');
-      setPendingUsers(response.data);
+      setLoading(true);
+      const page = await adminApi.getPendingUsersPage<PendingUser>(cursor);
+      setPendingUsers(previous => cursor ? [...previous, ...page.items] : page.items);
+      setNextCursor(page.next_cursor);
     } catch (err) {
       setError('Failed to fetch pending users');
+    } finally {
+      setLoading(false);
     }
   };
 
@@ -126,6 +132,14 @@ const UserApproval = () => {
           </TableBody>
         </Table>
       </TableContainer>
+
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => fetchPendingUsers(nextCursor)} disabled={loading}>
+            Load more
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
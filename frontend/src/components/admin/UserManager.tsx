@@ -18,6 +18,7 @@ import {
   TextField,
   InputAdornment,
   Tooltip,
+  Button,
 } from '@mui/material';
 import {
   Search as SearchIcon,
@@ -38,27 +39,32 @@ const UserManager = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchQuery, setSearchQuery] = useState('');
+  // Cursor of the next page of users; null once every user is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   useEffect(() => {
     fetchUsers();
   }, []);
 
   useEffect(() => {
-    // Filter users based on search query only
+    // Filter the loaded users based on search query only
     const filtered = users.filter(user =>
       user.email.toLowerCase().includes(searchQuery.toLowerCase())
     );
     setFilteredUsers(filtered);
-    setPage(0);
   }, [searchQuery, users]);
 
-  const fetchUsers = async () => {
+  useEffect(() => {
+    setPage(0);
+  }, [searchQuery]);
+
+  const fetchUsers = async (cursor: string | null = null) => {
     try {
       setLoading(true);
       setError(null);
-      const response = await adminApi.getAllUsers();
+      const response = await adminApi.getUsersPage(cursor);
       console.log('Raw response from backend:', response);
-      response.forEach(user => {
+      response.items.forEach(user => {
         console.log('User data:', {
           id: user.id,
           email: user.email,
@@ -68,8 +74,8 @@ const UserManager = () => {
           type: typeof user.is_approved
         });
       });
-      setUsers(response);
-      setFilteredUsers(response);
+      setUsers(previous => cursor ? [...previous, ...response.items] : response.items);
+      setNextCursor(response.next_cursor);
     } catch (error: any) {
       const errorMsg = error.response?.data?.detail || 'Failed to fetch users';
       setError(errorMsg);
@@ -79,12 +85,16 @@ const UserManager = () => {
     }
   };
 
+  // Update the toggled row in place rather than reloading every page loaded so far
+  const replaceUser = (updated: User) => {
+    setUsers(previous => previous.map(user => user.id === updated.id ? { ...user, ...updated } : user));
+  };
+
   const handleToggleAdmin = async (userId: number, currentStatus: boolean) => {
     try {
       setLoading(true);
       setError(null);
-      await adminApi.toggleUserAdmin(userId);
-      await fetchUsers();
+      replaceUser(await adminApi.toggleUserAdmin(userId));
     } catch (error: any) {
       const errorMsg = error.response?.data?.detail || 'Failed to update user status';
       setError(errorMsg);
@@ -98,8 +108,7 @@ const UserManager = () => {
     try {
       setLoading(true);
       setError(null);
-      await adminApi.toggleUserActive(userId);
-      await fetchUsers();
+      replaceUser(await adminApi.toggleUserActive(userId));
     } catch (error: any) {
       const errorMsg = error.response?.data?.detail || 'Failed to update user activation status';
       setError(errorMsg);
@@ -164,7 +173,7 @@ const UserManager = () => {
         <TextField
           fullWidth
           variant="outlined"
-          placeholder="Search users by email..."
+          placeholder="Search loaded users by email..."
           value={searchQuery}
           onChange={(e) => setSearchQuery(e.target.value)}
           InputProps={{
@@ -262,6 +271,14 @@ const UserManager = () => {
           rowsPerPageOptions={[5, 10, 25, 50]}
         />
       </TableContainer>
+
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => fetchUsers(nextCursor)} disabled={loading}>
+            Load more users
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
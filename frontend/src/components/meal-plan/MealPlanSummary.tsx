@@ -1,13 +1,13 @@
 import { Paper, Typography, Box, Button, IconButton, Dialog, DialogTitle, DialogContent, DialogActions } from '@mui/material';
 import { Link as RouterLink } from 'react-router-dom';
 import { Delete as DeleteIcon } from '@mui/icons-material';
-import { MealPlan } from '../../types';
+import { MealPlanListItem } from '../../types';
 import { mealPlanApi } from '../../services/api';
 import { useState } from 'react';
 import MacroPieChart from './MacroPieChart';
 
 interface MealPlanSummaryProps {
-  mealPlan: MealPlan;
+  mealPlan: MealPlanListItem;
   onDelete?: () => void;
 }
 
@@ -16,15 +16,17 @@ const MealPlanSummary = ({ mealPlan, onDelete }: MealPlanSummaryProps) => {
   const [isDeleting, setIsDeleting] = useState(false);
 
   // Early validation
-  if (!mealPlan?.plan_data) {
+  if (!mealPlan) {
     return null;
   }
 
-  // Safely extract data with default values
-  const {
-    daily_calories = 0,
-    macros = { protein: 0, carbs: 0, fats: 0 },
-  } = mealPlan.plan_data;
+  // Safely extract the headline figures with default values
+  const daily_calories = mealPlan.daily_calories ?? 0;
+  const macros = {
+    protein: mealPlan.macros?.protein ?? 0,
+    carbs: mealPlan.macros?.carbs ?? 0,
+    fats: mealPlan.macros?.fats ?? 0,
+  };
 
   // Calculate macro percentages safely
   const totalMacros = (macros.protein * 4) + (macros.carbs * 4) + (macros.fats * 9);
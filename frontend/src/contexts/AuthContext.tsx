@@ -30,7 +30,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
         setUser(userData);
       }
     } catch (error) {
-      localStorage.removeItem('token');
+      authApi.logout();
     } finally {
       setLoading(false);
     }
@@ -68,7 +68,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   };
 
   const logout = () => {
-    localStorage.removeItem('token');
+    authApi.logout();
     setUser(null);
     setError(null);
   };
@@ -3,13 +3,13 @@ import { useLocation, useParams } from 'react-router-dom';
 import { Box, Container, Typography, CircularProgress, Alert } from '@mui/material';
 import MealPlanDisplay from '../components/meal-plan/MealPlanDisplay';
 import MealPlanSummary from '../components/meal-plan/MealPlanSummary';
-import { MealPlan as MealPlanType } from '../types';
+import { MealPlan as MealPlanType, MealPlanListItem } from '../types';
 import { mealPlanApi } from '../services/api';
 
 const MealPlan = () => {
   const location = useLocation();
   const { id } = useParams();
-  const [mealPlans, setMealPlans] = useState<MealPlanType[]>([]);
+  const [mealPlans, setMealPlans] = useState<MealPlanListItem[]>([]);
   const [currentMealPlan, setCurrentMealPlan] = useState<MealPlanType | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
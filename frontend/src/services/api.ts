@@ -1,5 +1,5 @@
 import axios, { AxiosError } from 'axios';
-import { User, Question, MealPlan, UserInfo, QuestionResponse } from '../types';
+import { User, Question, MealPlan, MealPlanListItem, UserInfo, QuestionResponse } from '../types';
 
 const API_URL = 'http://localhost:8000/api';
 
@@ -19,21 +19,79 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Access tokens are short-lived: on a 401, trade the refresh token for new tokens once and retry
+let refreshing: Promise<string> | null = null;
+
+const refreshAccessToken = async (): Promise<string> => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) {
+    throw new Error('No refresh token');
+  }
+  const response = await axios.post<{ access_token: string; refresh_token: string }>(
+    `${API_URL}/users/refresh`, { refresh_token: refreshToken }
+  );
+  localStorage.setItem('token', response.data.access_token);
+  localStorage.setItem('refreshToken', response.data.refresh_token);
+  return response.data.access_token;
+};
+
 // Add response interceptor to handle token expiration
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      // Clear token and redirect to login if unauthorized
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retried && !original.url?.startsWith('/users/login')) {
+      original._retried = true;
+      try {
+        // Concurrent 401s share one refresh
+        refreshing = refreshing ?? refreshAccessToken().finally(() => { refreshing = null; });
+        const token = await refreshing;
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch {
+        // Fall through to the login redirect
+      }
+    }
+    if (error.response?.status === 401 && !original?.url?.startsWith('/users/login')) {
+      // Clear tokens and redirect to login if unauthorized
       localStorage.removeItem('token');
+      localStorage.removeItem('refreshToken');
       window.location.href = '/login';
     }
     return Promise.reject(error);
   }
 );
 
+// Envelope returned by cursor-paginated listings
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+  limit: number;
+  total_estimate: number | null;
+}
+
+// One page of a listing; pass the previous page's next_cursor to continue
+const fetchPage = async <T,>(url: string, cursor: string | null, limit: number): Promise<Page<T>> => {
+  const response = await api.get<Page<T>>(url, { params: { limit, cursor: cursor ?? undefined } });
+  return response.data;
+};
+
+// Follow next_cursor until the listing is exhausted. Only for listings that stay
+// small (questions, prompts); user listings are loaded a page at a time.
+const fetchAllPages = async <T,>(url: string, params: Record<string, unknown> = {}): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const response: { data: Page<T> } = await api.get(url, { params: { ...params, cursor: cursor ?? undefined } });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
 interface LoginResponse {
   access_token: string;
+  refresh_token: string;
   token_type: string;
   user: User;
 }
@@ -52,9 +110,10 @@ export const authApi = {
         },
       });
       
-      // Store the token
+      // Store the tokens
       if (response.data.access_token) {
         localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refreshToken', response.data.refresh_token);
       }
       
       return response.data;
@@ -73,6 +132,7 @@ export const authApi = {
   
   logout: () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
   },
 
   register: async (email: string, password: string): Promise<User> => {
@@ -153,9 +213,12 @@ export const questionsApi = {
 // Admin endpoints
 export const adminApi = {
   // User management
-  getAllUsers: async (): Promise<User[]> => {
-    const response = await api.get('/users/all');
-    return response.data;
+  getUsersPage: async (cursor: string | null = null, limit = 50): Promise<Page<User>> => {
+    return fetchPage<User>('/users/all', cursor, limit);
+  },
+
+  getPendingUsersPage: async <T,>(cursor: string | null = null, limit = 50): Promise<Page<T>> => {
+    return fetchPage<T>('/admin/users/pending', cursor, limit);
   },
 
   toggleUserAdmin: async (userId: number): Promise<User> => {
@@ -163,10 +226,14 @@ export const adminApi = {
     return response.data;
   },
 
+  toggleUserActive: async (userId: number): Promise<User> => {
+    const response = await api.put(`/users/toggle-active/${userId}`);
+    return response.data;
+  },
+
   // Question management
   getQuestions: async (): Promise<Question[]> => {
-    const response = await api.get('/admin/questions');
-    return response.data;
+    return fetchAllPages<Question>('/admin/questions', { limit: 200 });
   },
 
   createQuestion: async (question: Omit<Question, 'id'>): Promise<Question> => {
@@ -216,7 +283,7 @@ export const adminApi = {
   },
 
   // System Prompts
-  getAllSystemPrompts: () => api.get('/admin/system-prompts'),
+  getAllSystemPrompts: async <T,>(): Promise<T[]> => fetchAllPages<T>('/admin/system-prompts', { limit: 200 }),
   getSystemPrompt: (id: number) => api.get(`/admin/system-prompts/${id}`),
   createSystemPrompt: (data: {
     name: string;
@@ -239,16 +306,16 @@ export const adminApi = {
 export const mealPlanApi = {
   getMealPlans: async () => {
     try {
-      const response = await api.get('/meal-plans');
-      console.log('Get Meal Plans Response:', response.data); // Debug log
-      return response.data;
+      const mealPlans = await fetchAllPages<MealPlanListItem>('/meal-plans/', { view: 'summary', limit: 200 });
+      console.log('Get Meal Plans Response:', mealPlans); // Debug log
+      return mealPlans;
     } catch (error) {
       console.error('Error fetching meal plans:', error);
       throw error;
     }
   },
 
-  getMealPlan: async (id: string) => {
+  getMealPlan: async (id: string): Promise<MealPlan> => {
     try {
       const response = await api.get(`/meal-plans/${id}`);
       console.log('Get Single Meal Plan Response:', response.data); // Debug log
@@ -259,6 +326,17 @@ export const mealPlanApi = {
     }
   },
 
+  // One day of a plan, extracted server-side (a few KB instead of the whole plan)
+  getMealPlanDay: async (id: number, week: string, day: string) => {
+    try {
+      const response = await api.get(`/meal-plans/${id}/weeks/${week}/days/${day}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching meal plan day:', error);
+      throw error;
+    }
+  },
+
   generateMealPlan: async (data: any) => {
     try {
       const response = await api.post('/meal-plans/generate', data);
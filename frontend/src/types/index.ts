@@ -178,6 +178,25 @@ export interface MealPlan {
   };
 }
 
+// Meal plan history entry (GET /meal-plans/?view=summary), without plan_data
+export interface MealPlanListItem {
+  id: number;
+  user_id: number;
+  created_at: string;
+  updated_at: string;
+  is_active: boolean;
+  start_date: string;
+  end_date?: string;
+  daily_calories: number | null;
+  macros: {
+    protein: number | null;
+    carbs: number | null;
+    fats: number | null;
+  };
+  day_count: number | null;
+  meal_count: number | null;
+}
+
 // Add these enums for strict typing
 export enum ActivityLevel {
   Sedentary = 'Sedentary',